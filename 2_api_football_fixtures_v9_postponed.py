@@ -1,5 +1,4 @@
-import network
-import urequests
+import api_client
 import time
 import os
 import machine
@@ -8,15 +7,26 @@ from machine import Pin, SPI
 from picographics import PicoGraphics, DISPLAY_INKY_FRAME_7
 from pngdec import PNG
 import uasyncio as asyncio
-import gc
 import battery_smol
+import battery
+import perf
+import memory
+import wifi_manager
+import time_sync
+import results_archive
+import form_guide
+import layout
+from footy_data import compact_fixture, compact_event
 
 # Import Wi-Fi credentials and API key
 from WIFI_CONFIG import SSID, PASSWORD
 from API_KEY import API_KEY
 
+# Grab the receive buffers before anything else fragments the heap
+memory.init()
+
 # Initialize the display for Inky Frame 7.3"
-display = PicoGraphics(display=DISPLAY_INKY_FRAME_7)
+display = PicoGraphics(display=DISPLAY_INKY_FRAME_7)  # DISPLAY_INKY_FRAME_4 for the 4.0", DISPLAY_INKY_FRAME for the 5.7"
 png = PNG(display)  # Initialize the PNG decoder
 
 # Set colors
@@ -33,6 +43,13 @@ sd_spi = SPI(0, sck=Pin(18, Pin.OUT), mosi=Pin(19, Pin.OUT), miso=Pin(16, Pin.OU
 sd = sdcard.SDCard(sd_spi, machine.Pin(22))
 os.mount(sd, "/sd")
 
+# Finished results are kept on the SD card for history views (none if it can't be opened)
+try:
+    archive = results_archive.ResultsArchive()
+except OSError as e:
+    print(f"Failed to open the results archive: {e}")
+    archive = None
+
 # Clear the display with a white background before drawing anything
 display.set_pen(WHITE)
 display.clear()
@@ -46,8 +63,15 @@ display.set_font("bitmap8")
 # Define league ID globally (Premier League ID: 39)
 LEAGUE_ID = 291  # Premier League ID
 
+# Team IDs to follow (same as the crest filenames), leave empty for the whole league.
+# Fixture requests are narrowed with team= (so events are only fetched for their matches)
+# and the standings are trimmed to the rows around them.
+FAVOURITE_TEAMS = []
+STANDINGS_WINDOW = 2  # Table rows kept either side of each followed team
+REFRESH_BUDGET_MS = 90000  # Requests still going after this give up, the page is drawn with what arrived
+
 # Automatically get the current year for the season
-SEASON = time.localtime()[0]  # Use the current year from the system
+SEASON = time.localtime()[0]  # Use the current year from the system (checked again after time sync)
 
 # Function to convert UTC time string (HH:MM) to local time (considering BST/GMT)
 def convert_utc_to_local(utc_time_str):
@@ -70,46 +94,52 @@ def is_bst(date_tuple):
     return start_bst_ts <= current_ts < end_bst_ts
 
 # Async function to connect to Wi-Fi with retry mechanism
-async def connect_wifi(timeout=30, retry_delay=5, max_retries=3):
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-    retries = 0
-    
-    while retries < max_retries:
-        print(f"Attempting to connect to Wi-Fi (Attempt {retries + 1}/{max_retries})")
-        wlan.connect(SSID, PASSWORD)
-        start_time = time.time()
-
-        while not wlan.isconnected():
-            if time.time() - start_time > timeout:
-                print(f"Failed to connect to Wi-Fi on attempt {retries + 1}. Retrying in {retry_delay} seconds...")
-                retries += 1
-                await asyncio.sleep(retry_delay)
-                break
-            await asyncio.sleep(1)
-
-        if wlan.isconnected():
-            print("Connected to Wi-Fi")
-            return True
-    
-    print("Exceeded maximum retry attempts. Exiting.")
-    return False
+async def connect_wifi():
+    global SEASON
+    if not wifi_manager.connect(SSID, PASSWORD):  # Cached access point/IP first, full scan if that fails
+        return False
+    # The RTC is only trusted once it's been checked (NTP only if it's unset or drifted too far)
+    time_sync.sync_if_needed()
+    SEASON = time.localtime()[0]
+    return True
+
+
+# Function to keep only the standings rows around the followed teams (all rows if none are followed)
+def trim_standings(standings):
+    if not FAVOURITE_TEAMS:
+        return standings
+    keep = set()
+    for i, team in enumerate(standings):
+        if team['team']['id'] in FAVOURITE_TEAMS:
+            keep.update(range(max(0, i - STANDINGS_WINDOW), i + STANDINGS_WINDOW + 1))
+    return [team for i, team in enumerate(standings) if i in keep]
+
+
+# Function to get the query string narrowing fixture requests to each followed team ("" = whole league)
+def team_filters():
+    return [f"&team={team_id}" for team_id in FAVOURITE_TEAMS] or [""]
 
 
 # Async function to fetch the current league standings
 async def fetch_standings():
-    gc.collect()  # Free memory before making the request
+    memory.checkpoint()  # Collect and check the heap before making the request
     url = f'https://v3.football.api-sports.io/standings?league={LEAGUE_ID}&season={SEASON}'
     headers = {'x-apisports-key': API_KEY}
     
+    response = None
     try:
-        response = urequests.get(url, headers=headers)
+        response = api_client.get(url, headers=headers)
         
         # Debugging: Print the status code and the response
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            try:
+                with perf.span("parse"):
+                    data = response.json()
+            except MemoryError:
+                memory.on_memory_error("standings")
+                return {}  # No positions, the fixtures still draw
             
             # Debugging: Print the raw data received from the API
             print("Received data:", data)
@@ -118,7 +148,7 @@ async def fetch_standings():
             if 'response' in data and len(data['response']) > 0:
                 league_data = data['response'][0]
                 if 'league' in league_data and 'standings' in league_data['league'] and len(league_data['league']['standings']) > 0:
-                    standings = league_data['league']['standings'][0]
+                    standings = trim_standings(league_data['league']['standings'][0])
                     positions = {team['team']['id']: team['rank'] for team in standings}
                 else:
                     print("Unexpected data structure or no standings available.")
@@ -129,34 +159,54 @@ async def fetch_standings():
         else:
             print(f"Failed to fetch standings: {response.status_code}")
             positions = {}
+    except OSError as e:  # Timed out, out of retries or past the refresh deadline
+        print(f"Failed to fetch standings: {e}")
+        positions = {}
     finally:
-        response.close()
-        gc.collect()  # Free memory after handling the response
+        if response:
+            response.close()
+        memory.checkpoint()
     
     return positions
 
 
 
 # Async function to fetch fixture events like goals and cards
+# (returns the display strings and the compact events kept in the results archive,
+# None when the events couldn't be fetched)
 async def fetch_fixture_events(fixture_id):
-    gc.collect()  # Collect garbage to free up memory before the request
+    memory.checkpoint()  # Collect and check the heap before the request
     url = f'https://v3.football.api-sports.io/fixtures/events?fixture={fixture_id}'
     headers = {'x-apisports-key': API_KEY}
-    response = urequests.get(url, headers=headers)
     details = []
+    archived_events = []
+    events = []
+    try:
+        response = api_client.get(url, headers=headers)
+    except OSError as e:
+        print("Failed to fetch events:", e)
+        return details, None
     if response.status_code == 200:
-        events = response.json()['response']
+        try:
+            with perf.span("parse"):
+                events = response.json()['response']
+        except MemoryError:
+            memory.on_memory_error("events")
+            archived_events = None
         for event in events:
             if event['type'] == 'Goal':
                 scorer = event['player']['name']
                 details.append(f"Goal: {scorer} ({event['time']['elapsed']}')")
+                archived_events.append(compact_event(event))
             elif event['type'] == 'Card':
                 card_type = 'Yellow' if event['detail'] == 'Yellow Card' else 'Red'
                 details.append(f"{card_type}: {event['player']['name']} ({event['time']['elapsed']}')")
+                archived_events.append(compact_event(event))
     else:
         print("Failed to fetch events:", response.status_code)
+        archived_events = None
     response.close()
-    return details
+    return details, archived_events
 
 
 # Function to wrap text based on a maximum character count per line
@@ -180,36 +230,62 @@ def wrap_text(text, max_length):
     return lines
 
 
-# Function to load and display team crests
-def load_and_display_crest(team_id, x, y):
-    gc.collect()  # Clean up memory before loading images
-    
-    crest_filename = f"/sd/{team_id}.png"
-    try:
-        os.stat(crest_filename)  # Check if the file exists
-        png.open_file(crest_filename)  # Open the PNG file
-        png.decode(x, y)  # Decode and display at the given coordinates
-    except OSError:
-        # If the file does not exist, draw a black square as a fallback
-        display.set_pen(BLACK)
-        display.rectangle(x, y, 20, 20)
+# Function to load and display team crests (pre-scaled to `size`, see tools/scale_crests.py)
+def load_and_display_crest(team_id, x, y, size=layout.CREST_NATIVE):
+    crest_filename = layout.crest_file(team_id, size)
+    if memory.crests_allowed():  # Too little memory left to decode PNGs: just the square
+        try:
+            os.stat(crest_filename)  # Check if the file exists
+            with perf.span("png"):
+                png.open_file(crest_filename)  # Open the PNG file
+                png.decode(x, y)  # Decode and display at the given coordinates
+            return
+        except OSError:
+            pass
+    # If the file does not exist, draw a black square as a fallback
+    display.set_pen(BLACK)
+    display.rectangle(x, y, size, size)
+
+
+# Function to draw a team name in its fixture column, with the league position as a
+# superscript hugging it (left of the right-aligned home name, right of the away name)
+def draw_team_name(row, column, name, team_id, positions, y_position):
+    x, width, chars, scale, align = row[column]
+    league_position = str(positions[team_id]) if team_id in positions else ""
+    position_width = display.measure_text(league_position, scale=1) + 3 if league_position else 0
+    name = layout.fit(display, name[:chars], width - position_width, scale)
+    name_width = display.measure_text(name, scale=scale)
+    name_x = x + width - name_width if align == "r" else x
+
+    display.set_pen(BLACK)
+    display.text(name, name_x, y_position + 5, scale=scale)
+    if league_position:
+        superscript_x = name_x - position_width if align == "r" else name_x + name_width + 3
+        display.set_pen(RED)
+        display.text(league_position, superscript_x, y_position - 3, scale=1)
 
 # Function to fetch fixtures for today
-async def fetch_today_fixtures():
+async def fetch_today_fixtures(team_filter=""):
     today_date = "{:04d}-{:02d}-{:02d}".format(*time.localtime()[:3])  # Get today's date
-    url = f'https://v3.football.api-sports.io/fixtures?league={LEAGUE_ID}&season={SEASON}&date={today_date}'
+    url = f'https://v3.football.api-sports.io/fixtures?league={LEAGUE_ID}&season={SEASON}&date={today_date}{team_filter}'
     headers = {'x-apisports-key': API_KEY}
 
-    gc.collect()  # Clean up memory before making the request
+    memory.checkpoint()  # Collect and check the heap before making the request
+    response = None
     try:
-        response = urequests.get(url, headers=headers)
+        response = api_client.get(url, headers=headers)
 
         # Debugging: Print status and response
         print(f"Fetching fixtures for: {today_date}")
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            try:
+                with perf.span("parse"):
+                    data = response.json()
+            except MemoryError:
+                memory.on_memory_error("fixtures")
+                return []
             
             # Debugging: Print the raw data received
             print("Received data:", data)
@@ -224,27 +300,37 @@ async def fetch_today_fixtures():
         else:
             print(f"Failed to fetch today's fixtures: {response.status_code}")
             return []
+    except OSError as e:  # Timed out, out of retries or past the refresh deadline
+        print(f"Failed to fetch today's fixtures: {e}")
+        return []
     finally:
-        response.close()
-        gc.collect()  # Run garbage collection to free up memory after the request
+        if response:
+            response.close()
+        memory.checkpoint()
 
 
 
 # Function to fetch the next 10 upcoming fixtures
-async def fetch_next_10_fixtures():
-    url = f'https://v3.football.api-sports.io/fixtures?league={LEAGUE_ID}&season={SEASON}&next=10'
+async def fetch_next_10_fixtures(team_filter=""):
+    url = f'https://v3.football.api-sports.io/fixtures?league={LEAGUE_ID}&season={SEASON}&next=10{team_filter}'
     headers = {'x-apisports-key': API_KEY}
     
-    gc.collect()  # Clean up memory before making the request
+    memory.checkpoint()  # Collect and check the heap before making the request
+    response = None
     try:
-        response = urequests.get(url, headers=headers)
+        response = api_client.get(url, headers=headers)
 
         # Debugging: Print status and response
         print(f"Fetching the next 10 fixtures")
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            try:
+                with perf.span("parse"):
+                    data = response.json()
+            except MemoryError:
+                memory.on_memory_error("fixtures")
+                return []
             
             # Debugging: Print the raw data received
             print("Received data:", data)
@@ -259,9 +345,13 @@ async def fetch_next_10_fixtures():
         else:
             print(f"Failed to fetch the next 10 fixtures: {response.status_code}")
             return []
+    except OSError as e:  # Timed out, out of retries or past the refresh deadline
+        print(f"Failed to fetch the next 10 fixtures: {e}")
+        return []
     finally:
-        response.close()
-        gc.collect()  # Run garbage collection after the request
+        if response:
+            response.close()
+        memory.checkpoint()
 
 
 # Function to get the day name from a date (YYYY-MM-DD format)
@@ -275,32 +365,36 @@ def get_day_name(date_str):
 
 # Function to fetch and display fixtures (both today and the next 10)
 async def fetch_and_display_fixtures(positions):
-    gc.collect()  # Free memory before fetching fixtures
+    memory.checkpoint()
     y_position = 10  # Starting y-position for the first fixture display
     base_line_height = 40  # Base space between rows to fit more fixtures
 
-    # Fetch today's fixtures
-    today_fixtures = await fetch_today_fixtures()
+    # Use a set to keep track of already added fixture IDs to avoid duplicates
+    # (two followed teams playing each other come back once per team)
+    today_fixtures = []
+    fixture_ids = set()
+
+    # Fetch today's fixtures, once per followed team when narrowing by team
+    for team_filter in team_filters():
+        for fixture in await fetch_today_fixtures(team_filter):
+            if fixture['fixture']['id'] not in fixture_ids:
+                today_fixtures.append(fixture)
+                fixture_ids.add(fixture['fixture']['id'])
 
     # If fewer than 10 fixtures today, fetch the next 10
     next_fixtures = []
     if len(today_fixtures) < 10:
-        next_fixtures = await fetch_next_10_fixtures()
+        for team_filter in team_filters():
+            next_fixtures += await fetch_next_10_fixtures(team_filter)
 
-    # Use a set to keep track of already added fixture IDs to avoid duplicates
-    fixture_ids = set(fixture['fixture']['id'] for fixture in today_fixtures)
-    
     # Add only new fixtures from the next_fixtures
     for fixture in next_fixtures:
         if fixture['fixture']['id'] not in fixture_ids:
             today_fixtures.append(fixture)
             fixture_ids.add(fixture['fixture']['id'])
 
-    # Combine today's fixtures and next fixtures, limit to 10 fixtures
-    displayed_fixtures = today_fixtures[:10]
-
-    # Sort fixtures by timestamp to ensure proper time order
-    displayed_fixtures = sorted(displayed_fixtures, key=lambda fixture: fixture['fixture']['timestamp'])
+    # Sort fixtures by timestamp to ensure proper time order, then limit to 10 fixtures (5 if memory is short)
+    displayed_fixtures = sorted(today_fixtures, key=lambda fixture: fixture['fixture']['timestamp'])[:memory.fixture_limit(10)]
 
     # Display the fixtures
     if len(displayed_fixtures) == 0:
@@ -341,7 +435,7 @@ async def fetch_and_display_fixtures(positions):
             status = fixture['fixture']['status']['short']
 
             # Determine how to display the score and status
-            if status == 'FT':  # Full Time
+            if status in results_archive.STATUSES:  # Full Time, after extra time or on penalties
                 score_display = f"{home_score}-{away_score}"
                 pen_color = BLACK
             elif status in ['LIVE', '1H', '2H', 'HT']:  # Match in progress
@@ -357,65 +451,66 @@ async def fetch_and_display_fixtures(positions):
                 score_display = "P-P"
                 pen_color = RED
 
-            # Fetch match events only if the status is 'FT' or 'LIVE' (or other applicable statuses)
-            if status in ['FT', 'LIVE', '1H', '2H', 'HT']:
-                details = await fetch_fixture_events(fixture_id)
+            # Fetch match events only if the match is finished or live
+            if status in ['FT', 'AET', 'PEN', 'LIVE', '1H', '2H', 'HT'] and memory.events_allowed():
+                details, events = await fetch_fixture_events(fixture_id)
             else:
-                details = []  # No events to display if the match hasn't started
+                details, events = [], None  # No events to display if the match hasn't started
+
+            # Keep finished results on the SD card so history never needs another API call. The
+            # archive takes each fixture once, so one whose events weren't fetched waits for a
+            # later refresh.
+            if archive is not None and status in results_archive.STATUSES and events is not None:
+                try:
+                    archive.add(compact_fixture(fixture), events, LEAGUE_ID, SEASON)
+                except OSError as e:
+                    print(f"Failed to archive fixture {fixture_id}: {e}")
+
+            # Head to head and form from the results archive for matches yet to be played
+            if archive is not None and status == 'NS':
+                try:
+                    strip = form_guide.h2h_strip(archive, home_team_id, away_team_id)
+                    if strip:
+                        details = [strip]
+                except OSError as e:
+                    print(f"Failed to read head to head: {e}")
 
             print(f"Score display: {score_display}")
 
-            score_x = 245
-            score_width = display.measure_text(score_display, scale=2)
-            #home_crest_x = score_x - score_width // 2 - 27 # Disable dynamic positioning
-            home_crest_x = score_x - 48
-            home_team_name_x = home_crest_x - display.measure_text(home_team[:17], scale=2) - 5
-
-            # Display home team
-            if home_team_id in positions:
-                league_position = str(positions[home_team_id])
-                superscript_x_home = home_team_name_x - display.measure_text(league_position, scale=1) - 3
-                display.set_pen(RED)
-                display.text(league_position, superscript_x_home, y_position - 3, scale=1)
+            # Column positions for this display size come from the layout plan
+            row = layout.plan(display)['fixture']
 
-            display.set_pen(BLACK)
-            display.text(f"{home_team[:17]}", home_team_name_x, y_position + 5, scale=2)
-            load_and_display_crest(home_team_id, home_crest_x, y_position + 2)
+            # Display home team, crest, time/score, then the away team
+            draw_team_name(row, 'home', home_team, home_team_id, positions, y_position)
+            load_and_display_crest(home_team_id, row['home_crest'][0], y_position + 2, row['home_crest'][1])
 
-            # Display time/score
             display.set_pen(pen_color)
-            display.text(score_display, score_x - score_width // 2, y_position + 5, scale=2)
+            layout.cell(display, row, 'score', score_display, y_position + 5)
 
-            # Display away team
-            #away_crest_x = score_x + score_width // 2 + 5 # Disable dynamic positioning
-            away_crest_x = score_x + 27
-            away_team_name_x = away_crest_x + 20 + 10
-
-            load_and_display_crest(away_team_id, away_crest_x, y_position + 2)
-            display.set_pen(BLACK)
-            display.text(f"{away_team[:17]}", away_team_name_x, y_position + 5, scale=2)
-
-            if away_team_id in positions:
-                league_position = str(positions[away_team_id])
-                superscript_x_away = away_team_name_x + display.measure_text(away_team[:17], scale=2) + 3
-                display.set_pen(RED)
-                display.text(league_position, superscript_x_away, y_position - 3, scale=1)
+            load_and_display_crest(away_team_id, row['away_crest'][0], y_position + 2, row['away_crest'][1])
+            draw_team_name(row, 'away', away_team, away_team_id, positions, y_position)
 
             # Fetch and display match details like goal scorers and cards only for played or live matches
-            detail_x_offset = 515  # X-position for details
-            wrapped_lines = wrap_text("; ".join(details), 63)
+            # (the details column is left out on panels too narrow for it)
+            line_spacing = base_line_height
+            if 'details' in row:
+                detail_x_offset, _, detail_chars, detail_scale, _ = row['details']
+                wrapped_lines = wrap_text("; ".join(details), detail_chars)
+
+                # Centre the wrapped lines on the row, but never above it
+                total_lines = len(wrapped_lines)
+                detail_y = max(y_position - 3, y_position + 8 - (total_lines - 1) * 5)
 
-            # Calculate vertical offset for centering the wrapped lines
-            total_lines = len(wrapped_lines)
-            vertical_offset = ((total_lines - 1) * 10) // 2 - 8
+                # Display each wrapped line
+                for i, line in enumerate(wrapped_lines):
+                    display.set_pen(BLACK)
+                    display.text(line, detail_x_offset, detail_y + (i * 10), scale=detail_scale)
 
-            # Display each wrapped line
-            for i, line in enumerate(wrapped_lines):
-                display.set_pen(BLACK)
-                display.text(line, detail_x_offset, y_position - vertical_offset + (i * 10), scale=1)
+                # Long details push the next fixture down
+                line_spacing = max(base_line_height, detail_y - y_position + total_lines * 10 + 3)
 
             # Adjust y_position for the next fixture, considering the number of wrapped lines
-            y_position += base_line_height + (total_lines - 2) * 2
+            y_position += line_spacing
 
         y_position += 5  # Extra space after finishing a day's fixtures
 
@@ -423,20 +518,27 @@ async def fetch_and_display_fixtures(positions):
 
 # Main function to run all tasks
 async def main():
-    gc.collect()  # Clean memory before starting the main process
+    memory.checkpoint()
     wifi_connected = await connect_wifi()  # Attempt to connect to Wi-Fi
     if not wifi_connected:
         print("Exiting due to Wi-Fi failure.")
         return  # Exit if Wi-Fi couldn't be connected
     
+    # Bound the whole refresh: requests past this give up and whatever was fetched is drawn
+    api_client.start_refresh(REFRESH_BUDGET_MS)
     positions = await fetch_standings()  # Fetch the league standings
     await fetch_and_display_fixtures(positions)  # Fetch and display fixtures with league positions
     
+    api_client.close()  # Done with the API for this refresh, drop the TLS session
+
     # Update the display after drawing everything
-    display.update()
-    
-    # Final garbage collection
-    gc.collect()
+    with perf.span("update"):
+        display.update()
+    battery.log("network")  # battery_smol took this wake's reading before Wi-Fi came up
+
+    # Log where this refresh's time and memory went (peak usage and fragmentation included)
+    memory.stats()
+    perf.write("fixtures_v9")
 
 
 # Run the main function
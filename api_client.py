@@ -0,0 +1,526 @@
+import socket
+import ssl
+import json
+import gc
+import time
+import random
+import perf
+import time_sync
+
+# Minimal HTTP/1.1 keep-alive client for the api-sports.io API.
+#
+# urequests opens a fresh TCP connection and does a full TLS handshake for every
+# get(), and a single fixtures refresh makes anywhere from 3 to 13 requests. This
+# keeps one TLS session per host open for the whole refresh cycle instead, and
+# reads every response body into one pooled receive buffer. With the buffers
+# preallocated at boot (memory.init) that pool is never replaced: a body too big for
+# it gets a buffer of its own, up to MAX_BODY_SIZE, freed again with the response.
+#
+# get() is a drop-in for urequests.get(url, headers=headers). The returned
+# response's content lives in the pooled buffer, so use it (json()/text/content)
+# before making the next request. Call close() once the refresh is done.
+#
+# Nothing is allowed to hang: every socket has a timeout, and start_refresh() sets
+# an overall deadline for the refresh's requests, after which they raise
+# DeadlineExceeded so the caller can fall back to cached data. 429s, 5xxs and
+# network errors are retried with jittered exponential backoff, but only while the
+# daily quota (from api-football's rate limit headers) and the deadline allow it.
+
+RECV_CHUNK = 1024  # Size of the line/header read-ahead buffer
+BUFFER_STEP = 4096  # Body buffers grow in multiples of this
+MAX_BODY_SIZE = 96 * 1024  # Bigger bodies raise MemoryError rather than trying for the heap
+
+SOCKET_TIMEOUT_MS = 10000  # Longest any single connect/read/write may block
+REFRESH_BUDGET_MS = 60000  # Default deadline for all the requests of one refresh
+MAX_ATTEMPTS = 3  # Tries per request, including the first
+BACKOFF_BASE_MS = 500  # Backoff before retry n is up to BASE * 2^n, at least half of it
+BACKOFF_MAX_MS = 8000
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+QUOTA_RESERVE = 10  # Daily requests kept back, no retries once the quota is down to this
+
+# Handshakes and requests made since boot, handy for checking reuse is working
+stats = {"handshakes": 0, "requests": 0, "reused": 0, "retries": 0, "timeouts": 0}
+# Requests left as of the last response's rate limit headers (None until seen)
+quota = {"day": None, "minute": None}
+
+
+# The refresh ran out of time, use cached data instead
+class DeadlineExceeded(OSError):
+    pass
+
+
+_deadline_start = None
+_deadline_budget = None
+
+
+# Start the clock on a refresh: requests after `budget_ms` raise DeadlineExceeded
+def start_refresh(budget_ms=REFRESH_BUDGET_MS):
+    global _deadline_start, _deadline_budget
+    _deadline_start = perf.ticks_ms()
+    _deadline_budget = budget_ms
+
+
+# Milliseconds left before the deadline (None if there isn't one)
+def remaining_ms():
+    if _deadline_start is None:
+        return None
+    return _deadline_budget - perf.ticks_diff(perf.ticks_ms(), _deadline_start)
+
+
+# Socket timeout in seconds for the next operation, never past the deadline
+def _timeout():
+    left = remaining_ms()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("refresh deadline passed")
+    timeout = SOCKET_TIMEOUT_MS if left is None else min(SOCKET_TIMEOUT_MS, left)
+    return timeout / 1000
+
+_connections = {}  # (host, port) -> _Connection
+_body_buf = bytearray(BUFFER_STEP)  # Pooled receive buffer shared by every response
+_line_buf = bytearray(RECV_CHUNK)  # Read-ahead buffer shared by every connection
+_fixed = False  # The pool was preallocated (use_buffers) and is kept as it is
+_spill = None  # One-off buffer for the current body when it doesn't fit the fixed pool
+
+
+# Hand over preallocated receive buffers (see memory.init), instead of growing our own
+def use_buffers(body_buf, line_buf=None):
+    global _body_buf, _line_buf, _fixed
+    _body_buf = body_buf
+    _fixed = True
+    if line_buf is not None:
+        _line_buf = line_buf
+
+
+# The buffer holding the current response's body
+def _current():
+    return _body_buf if _spill is None else _spill
+
+
+# Drop the current body's one-off buffer, if it needed one
+def _release():
+    global _spill
+    _spill = None
+
+
+# Make sure the body buffer can hold at least `size` bytes, keeping its first `keep` bytes.
+# A MemoryError never costs the pooled buffer, so the next request still has it.
+def _reserve(size, keep=0):
+    global _body_buf, _spill
+    buf = _current()
+    if size <= len(buf):
+        return buf
+    if size > MAX_BODY_SIZE:
+        raise MemoryError(f"response body over {MAX_BODY_SIZE} bytes")
+    new_size = ((size + BUFFER_STEP - 1) // BUFFER_STEP) * BUFFER_STEP
+    if _fixed:
+        if not keep:
+            _spill = buf = None  # Nothing to copy, free the last one-off first
+        new = bytearray(new_size)
+        if keep:
+            new[:keep] = buf[:keep]
+        _spill = new
+        return new
+    try:
+        new = bytearray(new_size)  # With the old buffer still there, so a failure keeps it
+    except MemoryError:
+        if keep:
+            raise
+        old_size = len(buf)
+        _body_buf = buf = None
+        gc.collect()  # Give the old buffer back before asking for a bigger one
+        try:
+            new = bytearray(new_size)
+        except MemoryError:
+            _body_buf = bytearray(old_size)  # Fits in the space the old one just gave back
+            raise
+    if keep:
+        new[:keep] = buf[:keep]
+    _body_buf = new
+    return new
+
+
+# Wrap a connected socket in TLS, on both MicroPython and CPython (for the host tools)
+def _wrap_tls(sock, host, context):
+    if context is None and hasattr(ssl, "SSLContext"):
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        try:
+            context.check_hostname = False  # CPython only, urequests doesn't verify either
+        except AttributeError:
+            pass
+        context.verify_mode = ssl.CERT_NONE
+    if context is not None:
+        return context.wrap_socket(sock, server_hostname=host)
+    return ssl.wrap_socket(sock, server_hostname=host)
+
+
+class _Connection:
+    def __init__(self, host, port, use_tls, context=None):
+        self.host = host
+        self.port = port
+        # Only one response is read at a time and a pooled connection has always read its
+        # whole response, so every connection can share the one read-ahead buffer
+        self.rbuf = _line_buf
+        self.rmv = memoryview(self.rbuf)
+        self.pos = 0
+        self.end = 0
+
+        with perf.span("tls"):
+            addr = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)[0][-1]
+            sock = self.raw = socket.socket()
+            try:
+                sock.settimeout(_timeout())
+                sock.connect(addr)
+                if use_tls:
+                    sock = _wrap_tls(sock, host, context)
+            except Exception:
+                sock.close()
+                raise
+        self.sock = sock
+        stats["handshakes"] += 1
+
+        # MicroPython sockets have write/readinto, CPython ones sendall/recv_into
+        self._send = getattr(sock, "write", None) or sock.sendall
+        self._recv_into = getattr(sock, "readinto", None) or sock.recv_into
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    # Reapply the socket timeout, shrinking it as the deadline gets closer
+    def set_timeout(self):
+        timeout = _timeout()
+        try:
+            self.sock.settimeout(timeout)
+        except AttributeError:  # MicroPython's TLS socket, the timeout lives on the raw socket
+            self.raw.settimeout(timeout)
+
+    def send(self, data):
+        view = memoryview(data)
+        while view:
+            sent = self._send(view)
+            if sent is None:  # CPython sendall returns None once everything is written
+                break
+            view = view[sent:]
+
+    # Refill the read-ahead buffer, returns False if the server closed the connection
+    def _fill(self):
+        n = self._recv_into(self.rmv)
+        if not n:
+            return False
+        self.pos = 0
+        self.end = n
+        return True
+
+    def readline(self):
+        line = b""
+        while True:
+            if self.pos == self.end and not self._fill():
+                return line
+            # MicroPython's bytearray has no find(), header lines are short so just scan
+            rbuf = self.rbuf
+            for i in range(self.pos, self.end):
+                if rbuf[i] == 10:  # b"\n"
+                    line += rbuf[self.pos:i + 1]
+                    self.pos = i + 1
+                    return line
+            line += rbuf[self.pos:self.end]
+            self.pos = self.end
+
+    # Read exactly len(dest) bytes into the memoryview `dest`
+    def readinto(self, dest):
+        got = 0
+        want = len(dest)
+        buffered = self.end - self.pos
+        if buffered:
+            take = min(buffered, want)
+            dest[:take] = self.rmv[self.pos:self.pos + take]
+            self.pos += take
+            got = take
+        while got < want:
+            n = self._recv_into(dest[got:])
+            if n is None:
+                continue  # Non-blocking read with nothing ready yet
+            if not n:
+                raise OSError("connection closed mid-body")
+            got += n
+        return got
+
+    # Read until the server closes the connection (no Content-Length, no chunking)
+    def read_to_close(self, offset):
+        buf = _current()
+        if self.end > self.pos:
+            buf = _reserve(offset + self.end - self.pos, offset)
+            buf[offset:offset + self.end - self.pos] = self.rmv[self.pos:self.end]
+            offset += self.end - self.pos
+            self.pos = self.end
+        while True:
+            if offset == len(buf):
+                buf = _reserve(offset + BUFFER_STEP, offset)
+            n = self._recv_into(memoryview(buf)[offset:])
+            if not n:
+                return offset
+            offset += n
+
+
+class Response:
+    def __init__(self, status_code, reason, headers, length):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers  # Header names are lower-cased
+        self._length = length
+
+    # The body as a memoryview into the pooled buffer (valid until the next request)
+    @property
+    def raw(self):
+        return memoryview(_current())[:self._length]
+
+    @property
+    def content(self):
+        return bytes(self.raw)
+
+    @property
+    def text(self):
+        return str(self.content, "utf-8")
+
+    def json(self):
+        try:
+            return json.loads(self.raw)  # Newer MicroPython/CPython parse straight from the buffer
+        except TypeError:
+            return json.loads(self.content)
+
+    def close(self):
+        # The connection stays open for the next request, only drop our view of the buffer
+        # (and the body's own buffer if it was too big for the pool)
+        self._length = 0
+        _release()
+
+
+def _parse_url(url):
+    proto, _, rest = url.split("/", 2)
+    host, _, path = rest.partition("/")
+    use_tls = proto == "https:"
+    port = 443 if use_tls else 80
+    if ":" in host:
+        host, port = host.split(":", 1)
+        port = int(port)
+    return host, port, use_tls, "/" + path
+
+
+# Read a chunked body into the pooled buffer, returns its length
+def _read_chunked(conn):
+    length = 0
+    while True:
+        size_line = conn.readline()
+        if not size_line:
+            raise OSError("connection closed mid-chunk")
+        size = int(size_line.split(b";", 1)[0].strip(), 16)
+        if size == 0:
+            break
+        buf = _reserve(length + size, length)
+        conn.readinto(memoryview(buf)[length:length + size])
+        length += size
+        conn.readline()  # CRLF after each chunk
+    # Skip any trailers up to the blank line that ends the message
+    while conn.readline() not in (b"\r\n", b"\n", b""):
+        pass
+    return length
+
+
+# Send a request and read the status line and headers, leaving the body on the connection
+def _send_and_read_head(conn, method, path, headers, connection="keep-alive"):
+    request = f"{method} {path} HTTP/1.1\r\nHost: {conn.host}\r\nConnection: {connection}\r\n"
+    for name, value in headers.items():
+        request += f"{name}: {value}\r\n"
+    conn.send((request + "\r\n").encode())
+
+    status_line = conn.readline()
+    if not status_line:
+        raise OSError("connection closed before response")
+    parts = status_line.decode().rstrip().split(" ", 2)
+    status_code = int(parts[1])
+    reason = parts[2] if len(parts) > 2 else ""
+
+    response_headers = {}
+    while True:
+        line = conn.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        response_headers[name.strip().lower()] = value.strip()
+    time_sync.observe(response_headers.get("date"))  # Free clock check, see time_sync.py
+    return status_code, reason, response_headers
+
+
+def _request(conn, method, path, headers):
+    _release()  # The last response's body is finished with
+    status_code, reason, response_headers = _send_and_read_head(conn, method, path, headers)
+
+    keep_alive = response_headers.get("connection", "").lower() != "close"
+    if method == "HEAD" or status_code in (204, 304) or 100 <= status_code < 200:
+        length = 0
+    elif "chunked" in response_headers.get("transfer-encoding", "").lower():
+        length = _read_chunked(conn)
+    elif "content-length" in response_headers:
+        length = int(response_headers["content-length"])
+        buf = _reserve(length)
+        conn.readinto(memoryview(buf)[:length])
+    else:
+        length = conn.read_to_close(0)
+        keep_alive = False
+
+    return Response(status_code, reason, response_headers, length), keep_alive
+
+
+# Drop-in replacement for urequests.get that reuses the TLS session to the host
+def get(url, headers=None, context=None):
+    return request("GET", url, headers, context)
+
+
+def _update_quota(headers):
+    for key, header in (("day", "x-ratelimit-requests-remaining"), ("minute", "x-ratelimit-remaining")):
+        try:
+            quota[key] = int(headers[header])
+        except (KeyError, ValueError):
+            pass
+
+
+# Whether another try is worth it: tries left, quota to spare, and time to back off first
+def _retry_wait_ms(attempt, retry_after=None):
+    if attempt + 1 >= MAX_ATTEMPTS:
+        return None
+    if quota["day"] is not None and quota["day"] <= QUOTA_RESERVE:
+        return None
+    wait = min(BACKOFF_MAX_MS, BACKOFF_BASE_MS << attempt)
+    wait = wait // 2 + wait * random.getrandbits(8) // 512  # Jitter: somewhere in [wait/2, wait)
+    if retry_after:
+        wait = max(wait, retry_after * 1000)
+    left = remaining_ms()
+    if left is not None and wait >= left:
+        return None  # Not worth starting, the deadline would pass while waiting
+    return wait
+
+
+# Send a request, retrying on a 429/5xx or network error while quota and the deadline allow
+def request(method, url, headers=None, context=None):
+    host, port, use_tls, path = _parse_url(url)
+    headers = headers or {}
+    attempt = 0
+    while True:
+        try:
+            response = _request_once(method, host, port, use_tls, path, headers, context)
+        except DeadlineExceeded:
+            raise
+        except OSError as e:
+            if e.__class__.__name__ in ("timeout", "TimeoutError") or (e.args and e.args[0] == 110):
+                stats["timeouts"] += 1  # ETIMEDOUT
+            wait = _retry_wait_ms(attempt)
+            if wait is None:
+                raise
+            print(f"Request failed ({e}), retrying in {wait} ms")
+        else:
+            _update_quota(response.headers)
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            try:
+                retry_after = int(response.headers.get("retry-after", 0))
+            except ValueError:
+                retry_after = 0
+            wait = _retry_wait_ms(attempt, retry_after)
+            if wait is None:
+                return response
+            print(f"Got {response.status_code}, retrying in {wait} ms")
+        stats["retries"] += 1
+        attempt += 1
+        time.sleep(wait / 1000)
+
+
+def _request_once(method, host, port, use_tls, path, headers, context):
+    key = (host, port)
+    conn = _connections.pop(key, None)
+    reused = conn is not None
+    if conn is None:
+        conn = _Connection(host, port, use_tls, context)
+
+    try:
+        conn.set_timeout()
+        with perf.span("http"):
+            response, keep_alive = _request(conn, method, path, headers)
+    except DeadlineExceeded:
+        conn.close()
+        raise
+    except (OSError, ValueError, IndexError):
+        conn.close()
+        if not reused:
+            raise
+        # The server dropped the idle connection since last time, retry once on a fresh one
+        conn = _Connection(host, port, use_tls, context)
+        reused = False
+        try:
+            conn.set_timeout()
+            with perf.span("http"):
+                response, keep_alive = _request(conn, method, path, headers)
+        except BaseException:
+            conn.close()
+            raise
+    except BaseException:
+        conn.close()  # e.g. MemoryError mid-body, the connection is unusable now
+        raise
+
+    stats["requests"] += 1
+    if reused:
+        stats["reused"] += 1
+    if keep_alive:
+        _connections[key] = conn
+    else:
+        conn.close()
+    return response
+
+
+# Close every open connection, call this at the end of a refresh before sleeping
+def close():
+    for conn in _connections.values():
+        conn.close()
+    _connections.clear()
+
+
+# A response whose body is left on the socket for the caller to read piece by piece,
+# for bodies too big for the pooled buffer (e.g. a pre-rendered frame from frame_server)
+class StreamResponse:
+    def __init__(self, conn, status_code, reason, headers):
+        self.conn = conn
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.remaining = int(headers.get("content-length", -1))
+
+    # Fill as much of the memoryview `dest` as the body has left, returns the byte count
+    def readinto(self, dest):
+        if self.remaining == 0:
+            return 0
+        if 0 < self.remaining < len(dest):
+            dest = dest[:self.remaining]
+        n = self.conn.readinto(dest)
+        if self.remaining > 0:
+            self.remaining -= n
+        return n
+
+    def close(self):
+        self.conn.close()
+
+
+# GET a URL on its own connection without buffering the body (socket timeouts and
+# the deadline apply, but there are no retries)
+def open_stream(url, headers=None, context=None):
+    host, port, use_tls, path = _parse_url(url)
+    conn = _Connection(host, port, use_tls, context)
+    try:
+        conn.set_timeout()
+        with perf.span("http"):
+            status_code, reason, response_headers = _send_and_read_head(conn, "GET", path, headers or {}, "close")
+    except Exception:
+        conn.close()
+        raise
+    stats["requests"] += 1
+    return StreamResponse(conn, status_code, reason, response_headers)
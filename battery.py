@@ -0,0 +1,245 @@
+import time
+import json
+import perf
+
+# Battery telemetry: an averaged VSYS reading at every wake, logged to the SD card
+# with what the wake did, and a model fitted from that log of how much charge each
+# kind of wake costs. From the model: remaining runtime, and the shortest sleep
+# between refreshes that still lasts a target number of days.
+#
+#   battery.log   one JSON line per wake: time, volts, kind, awake ms, on usb
+#   battery.fit   the fitted costs, refitted from the log once a day
+#
+# Charge is in % of a full battery, read off a discharge curve (voltage is far from
+# linear in charge, especially for LiPo). Costs are % per wake of each kind plus %
+# per hour asleep, fitted by least squares over day long windows of the log.
+
+BATTERY_LOG = "/sd/battery.log"
+BATTERY_FIT = "/sd/battery.fit"
+BATTERY_LOG_MAX_BYTES = 64 * 1024  # Rotate to battery.log.1 past this (about 1000 wakes)
+REFIT_SECONDS = 24 * 3600
+
+CHEMISTRY = "aa"  # "aa" for 3 x AA alkaline, "lipo" for a single cell LiPo
+SAMPLES = 16  # ADC reads averaged per measurement (min and max dropped)
+WINDOW_HOURS = 24  # Log is cut into windows this long for the fit
+SMOOTH_READINGS = 8  # Readings averaged at each end of a window
+CONVERSION_FACTOR = 3 * 3.3 / 65535  # VSYS is divided by 3 before the ADC
+KINDS = ("network", "cached")  # Wake kinds the scripts log: fetched from the network, or drawn from the cache
+
+# Voltage at VSYS -> % charge left, highest voltage first
+CURVES = {
+    "lipo": ((4.20, 100), (4.10, 90), (4.00, 80), (3.92, 70), (3.85, 60), (3.79, 50),
+             (3.75, 40), (3.71, 30), (3.67, 20), (3.60, 10), (3.45, 5), (3.00, 0)),
+    "aa": ((4.65, 100), (4.45, 90), (4.30, 80), (4.18, 70), (4.08, 60), (3.98, 50),
+           (3.88, 40), (3.76, 30), (3.62, 20), (3.45, 10), (3.20, 5), (2.80, 0)),
+}
+
+_volts = None
+_usb = False
+
+
+# Averaged VSYS voltage. Must be read before Wi-Fi is up, GP25 is shared with the wireless chip.
+def read_voltage(samples=SAMPLES):
+    from machine import ADC, Pin
+    Pin(25, Pin.OUT).value(True)  # On a Pico W GP25 has to be high to read VSYS
+    vsys = ADC(3)
+    readings = sorted(vsys.read_u16() for _ in range(samples))
+    readings = readings[1:-1] if samples > 2 else readings
+    return sum(readings) / len(readings) * CONVERSION_FACTOR
+
+
+def on_usb():
+    from machine import Pin
+    return bool(Pin('WL_GPIO2', Pin.IN).value())
+
+
+# % charge for a voltage, interpolated along the discharge curve
+def percent(volts, curve=None):
+    curve = curve or CURVES[CHEMISTRY]
+    if volts >= curve[0][0]:
+        return 100.0
+    for (v_hi, p_hi), (v_lo, p_lo) in zip(curve, curve[1:]):
+        if volts >= v_lo:
+            return p_lo + (p_hi - p_lo) * (volts - v_lo) / (v_hi - v_lo)
+    return 0.0
+
+
+# Measure at boot, while the battery is rested and before Wi-Fi takes GP25
+def sample():
+    global _volts, _usb
+    try:
+        _volts = read_voltage()
+        _usb = on_usb()
+    except (ImportError, OSError, ValueError):
+        _volts = None
+    return _volts
+
+
+def charge():
+    return None if _volts is None else percent(_volts)
+
+
+# Append this wake to the log. `kind` is what it did, e.g. "network" (fetched and
+# updated) or "cached" (updated from the cache)
+def log(kind, path=BATTERY_LOG):
+    if _volts is None:
+        return
+    rec = {"t": time.time(), "v": round(_volts, 3), "k": kind, "ms": perf.ticks_ms(), "usb": _usb}
+    try:
+        try:
+            import os
+            if os.stat(path)[6] > BATTERY_LOG_MAX_BYTES:
+                try:
+                    os.remove(path + ".1")
+                except OSError:
+                    pass
+                os.rename(path, path + ".1")
+        except OSError:
+            pass
+        with open(path, "a") as f:
+            f.write(json.dumps(rec))
+            f.write("\n")
+    except OSError as e:
+        print(f"Failed to write battery log {path}: {e}")
+
+
+# Log records one at a time, oldest first (pass the rotated log before the current one)
+def read_log(paths):
+    for path in paths:
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        pass  # Truncated by a power cut
+        except OSError:
+            pass
+
+
+# Solve a small linear system (list of rows, right hand side) by Gaussian elimination
+def _solve(a, b):
+    n = len(b)
+    scale = max(abs(a[i][i]) for i in range(n)) or 1
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        if abs(a[pivot][col]) < 1e-9 * scale:
+            return None
+        a[col], a[pivot] = a[pivot], a[col]
+        b[col], b[pivot] = b[pivot], b[col]
+        for r in range(col + 1, n):
+            f = a[r][col] / a[col][col]
+            for c in range(col, n):
+                a[r][c] -= f * a[col][c]
+            b[r] -= f * b[col]
+    x = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        x[r] = (b[r] - sum(a[r][c] * x[c] for c in range(r + 1, n))) / a[r][r]
+    return x
+
+
+# Windows of consecutive battery powered wakes: (charge used, hours, {kind: wakes}).
+# The charge at each end is from the average of the last few readings, one reading
+# is too noisy next to a day's use.
+def windows(records, curve=None, hours=WINDOW_HOURS):
+    start = None
+    counts = {}
+    recent = []
+    for rec in records:
+        if rec.get("usb"):
+            start = None  # Charging or on USB, nothing to learn until it's unplugged again
+            recent = []
+            continue
+        if recent and rec["v"] > sum(recent) / len(recent) + 0.2:
+            start = None  # Fresh batteries went in
+            recent = []
+        recent.append(rec["v"])
+        del recent[:-SMOOTH_READINGS]
+        if start is None:
+            if len(recent) == SMOOTH_READINGS:
+                start, start_charge, counts = rec["t"], percent(sum(recent) / len(recent), curve), {}
+            continue
+        counts[rec["k"]] = counts.get(rec["k"], 0) + 1
+        if rec["t"] - start >= hours * 3600:
+            end_charge = percent(sum(recent) / len(recent), curve)
+            yield start_charge - end_charge, (rec["t"] - start) / 3600, counts
+            start, start_charge, counts = rec["t"], end_charge, {}
+
+
+# Least squares fit of % per wake of each kind and % per hour asleep. The normal
+# equations are summed as the windows stream past, so the log is never held in memory.
+# With a fixed sleep interval wakes per hour never change, so sleeping can't be told
+# apart from waking; then the sleep cost is folded into the wake costs instead.
+def fit(records, kinds=KINDS, curve=None):
+    n = len(kinds) + 1
+    ata = [[0.0] * n for _ in range(n)]
+    atb = [0.0] * n
+    spans = 0
+    for used, span_hours, counts in windows(records, curve):
+        spans += 1
+        row = [counts.get(kind, 0) for kind in kinds] + [span_hours]
+        for i in range(n):
+            atb[i] += row[i] * used
+            for j in range(n):
+                ata[i][j] += row[i] * row[j]
+    if spans < n:
+        return None  # Not enough history yet
+    x = _solve([r[:] for r in ata], atb[:])
+    if x is None or x[-1] < 0:
+        x = _solve([r[:-1] for r in ata[:-1]], atb[:-1])
+        if x is None:
+            return None  # Every window had the same mix of wakes, can't tell them apart
+        x.append(0.0)
+    return {
+        "wake": {kind: max(0.0, cost) for kind, cost in zip(kinds, x)},
+        "hour": x[-1],
+        "windows": spans,
+    }
+
+
+# Hours left at `charge_left` %, for so many wakes of each kind per hour
+def runtime_hours(charge_left, costs, wakes_per_hour):
+    drain = costs["hour"] + sum(costs["wake"].get(kind, 0) * rate for kind, rate in wakes_per_hour.items())
+    return charge_left / drain if drain > 0 else None
+
+
+# Share of wakes of each kind when sleeping `minutes` between them: about one wake per
+# `stale_seconds` finds the data stale and goes online, all of them once the sleep is longer
+def wake_mix(minutes, stale_seconds):
+    network = min(1, minutes * 60 / stale_seconds)
+    return {"network": network, "cached": 1 - network}
+
+
+# Shortest sleep (most refreshes) that still lasts `target_days`, from `choices` minutes,
+# or None if even the longest won't. `mix` is the share of wakes of each kind, e.g.
+# {"network": 0.25, "cached": 0.75}, or a function giving it for a sleep in minutes
+# (see wake_mix) when the share depends on the interval.
+def plan_sleep_minutes(charge_left, costs, target_days, mix, choices=(5, 10, 15, 20, 30, 60, 120)):
+    for minutes in sorted(choices):
+        shares = mix(minutes) if callable(mix) else mix
+        rates = {kind: share * 60 / minutes for kind, share in shares.items()}
+        hours = runtime_hours(charge_left, costs, rates)
+        if hours is None or hours >= target_days * 24:
+            return minutes
+    return None
+
+
+# The fitted costs, refitted from the log when they're over a day old
+def costs(log_path=BATTERY_LOG, fit_path=BATTERY_FIT):
+    try:
+        with open(fit_path) as f:
+            cached = json.load(f)
+        if time.time() - cached.get("fitted", 0) < REFIT_SECONDS:
+            return cached
+    except (OSError, ValueError):
+        cached = None
+    fitted = fit(read_log([log_path + ".1", log_path]))
+    if fitted is None:
+        return cached
+    fitted["fitted"] = time.time()
+    try:
+        with open(fit_path, "w") as f:
+            json.dump(fitted, f)
+    except OSError as e:
+        print(f"Failed to save battery fit: {e}")
+    return fitted
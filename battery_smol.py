@@ -1,12 +1,8 @@
-from machine import ADC, Pin
-import time
+from machine import Pin
+import battery
 from picographics import PicoGraphics, DISPLAY_INKY_FRAME_7
 
-def display_battery(display):
-    # these are our reference voltages for a full/empty battery, in volts
-    full_battery = 4.2
-    empty_battery = 2.8
-
+def display_battery(display=None):
     # colours to draw with
     BLACK = 0
     WHITE = 1
@@ -16,8 +12,10 @@ def display_battery(display):
     ORANGE = 6
     YELLOW = 5
 
-    # set up the display
-    display = PicoGraphics(display=DISPLAY_INKY_FRAME_7)
+    # set up the display, unless the hosting script passed in its own (and cleared it)
+    own_display = display is None
+    if own_display:
+        display = PicoGraphics(display=DISPLAY_INKY_FRAME_7)
 
     # and the activity LED
     activity_led = Pin(6, Pin.OUT)
@@ -29,21 +27,11 @@ def display_battery(display):
     hold_vsys_en_pin = Pin(HOLD_VSYS_EN_PIN, Pin.OUT)
     hold_vsys_en_pin.value(True)
 
-    # set up the ADC that's connected to the system input voltage (VSYS)
-    vsys = ADC(3)  # Use ADC3 (GPIO29)
-
-    # on a Pico W we need to pull GP25 high to be able to read vsys
-    spi_output = Pin(25, Pin.OUT)
-    spi_output.value(True)
-
-    # how we convert the reading into a voltage, and then a percentage
-    conversion_factor = 3 * 3.3 / 65535
-         
-    # convert the raw ADC read into a voltage, and then a percentage
-    voltage = vsys.read_u16() * conversion_factor
-    percentage = 100 * ((voltage - empty_battery) / (full_battery - empty_battery))
-    if percentage > 100:
-        percentage = 100.00
+    # average a burst of ADC reads into a voltage, then look the percentage up on the
+    # discharge curve (it isn't linear between full and empty). battery.log() can then
+    # record this same reading for the wake.
+    battery.sample()  # ADC3 (GPIO29), with GP25 pulled high as the Pico W needs
+    percentage = battery.charge() or 0
 
     # monitoring vbus tells us if Inky is being USB powered
     vbus = Pin('WL_GPIO2', Pin.IN)
@@ -51,12 +39,15 @@ def display_battery(display):
     # New coordinates and sizes for repositioned battery graphic
     battery_width = 38  # Adjusted to maintain aspect ratio with the new height
     battery_height = 13
-    battery_x = 800 - battery_width - 12  # 8 pixels padding from the right edge
+    battery_x = display.get_bounds()[0] - battery_width - 12  # 8 pixels padding from the right edge
     battery_y = 2  # 5 pixels padding from the top edge
 
-    # clear the display
+    # clear the display if it's ours, otherwise just the icon area (the text runs 16 px tall)
     display.set_pen(WHITE)
-    display.clear()
+    if own_display:
+        display.clear()
+    else:
+        display.rectangle(battery_x - 50, 0, display.get_bounds()[0] - battery_x + 50, battery_y + 16)
 
     # draw the battery outline with a hollow white interior
     display.set_pen(BLACK)
@@ -0,0 +1,381 @@
+import time
+import json
+import api_client
+import perf
+import memory
+import results_archive
+import player_stats
+
+from API_KEY import API_KEY
+
+# Shared dataset for every page of footy_frame.py: fetched once, cached on the SD
+# card, and rendered from by whichever page is due on this wake.
+
+API_URL = 'https://v3.football.api-sports.io'
+LEAGUE_ID = 39  # Premier League ID
+
+# api-football seasons are named after the year they start in (2024 = 2024/25)
+def current_season():
+    now = time.localtime()
+    return now[0] if now[1] >= 7 else now[0] - 1
+
+
+SEASON = current_season()  # Worked out again once the RTC has been synced (footy_frame.connect_wifi)
+
+CACHE_FILE = "/sd/footy_cache.json"
+STALE_SECONDS = 60 * 60  # Refetch after an hour...
+LIVE_STALE_SECONDS = 5 * 60  # ...or after 5 minutes while a match is being played
+REFRESH_BUDGET_MS = 90000  # A fetch still going after this gives up and the cache is shown
+
+MAX_FIXTURES = 10  # Upcoming/live fixtures kept for the fixtures page
+MAX_RESULTS = 10  # Finished fixtures kept for the results page
+
+# Teams you follow (team IDs, same as the crest filenames), e.g. [40] for Liverpool.
+# When set, fixture queries are narrowed with the API's team= parameter, events are only
+# fetched for these teams' matches and the table is trimmed to the rows around them.
+FAVOURITE_TEAMS = []
+FAVOURITE_DAYS_BACK = 14  # Window of fixtures fetched per followed team...
+FAVOURITE_DAYS_AHEAD = 21  # ...either side of today
+FAVOURITE_EVENT_RESULTS = 2  # Finished matches per followed team that get their events fetched
+STANDINGS_WINDOW = 2  # Table rows kept either side of each followed team
+
+FOCUS_TEAM_ID = FAVOURITE_TEAMS[0] if FAVOURITE_TEAMS else None  # Team shown on the team focus page
+
+LIVE_STATUSES = ('LIVE', '1H', '2H', 'HT', 'ET', 'BT', 'P')
+FINISHED_STATUSES = ('FT', 'AET', 'PEN')
+
+
+# GET an api-football endpoint and return its 'response' list, or None on failure.
+# api_client.DeadlineExceeded is let through, the rest of the refresh is pointless then.
+def api_get(path):
+    memory.checkpoint()  # Collect and check the heap before making the request
+    url = f'{API_URL}/{path}'
+    headers = {'x-apisports-key': API_KEY}
+    try:
+        response = api_client.get(url, headers=headers)
+    except api_client.DeadlineExceeded:
+        raise
+    except OSError as e:
+        print(f"Fetching {path} failed: {e}")
+        return None
+    except MemoryError:  # No room for the body, api_client keeps its pooled buffer
+        memory.on_memory_error(path)
+        return None
+    try:
+        print(f"Fetching {path}: {response.status_code}")
+        if response.status_code != 200:
+            return None
+        with perf.span("parse"):
+            data = response.json()
+        return data.get('response')
+    except MemoryError:
+        memory.on_memory_error(path)
+        return None
+    finally:
+        response.close()
+        memory.checkpoint()
+
+
+# Keep only the fields the pages draw, so the cached dataset stays small
+def compact_standing(team):
+    return {
+        'position': team['rank'],
+        'name': team['team']['name'],
+        'id': team['team']['id'],
+        'played': team['all']['played'],
+        'wins': team['all']['win'],
+        'draws': team['all']['draw'],
+        'losses': team['all']['lose'],
+        'goals_for': team['all']['goals']['for'],
+        'goals_against': team['all']['goals']['against'],
+        'goal_difference': team['goalsDiff'],
+        'points': team['points'],
+        'form': team['form'] or '',
+    }
+
+
+def compact_fixture(fixture):
+    return {
+        'id': fixture['fixture']['id'],
+        'date': fixture['fixture']['date'],  # ISO 8601 in UTC, e.g. 2024-10-19T14:00:00+00:00
+        'timestamp': fixture['fixture']['timestamp'],
+        'status': fixture['fixture']['status']['short'],
+        'home': fixture['teams']['home']['name'],
+        'home_id': fixture['teams']['home']['id'],
+        'away': fixture['teams']['away']['name'],
+        'away_id': fixture['teams']['away']['id'],
+        'home_score': fixture['goals']['home'],
+        'away_score': fixture['goals']['away'],
+        'events': [],
+    }
+
+
+def compact_event(event):
+    return {
+        'type': event['type'],
+        'detail': event['detail'],
+        'player': event['player']['name'],
+        'team_id': event['team']['id'],
+        'minute': event['time']['elapsed'],
+    }
+
+
+def compact_scorer(entry):
+    stats = entry['statistics'][0]
+    return {
+        'name': entry['player']['name'],
+        'team': stats['team']['name'],
+        'team_id': stats['team']['id'],
+        'goals': stats['goals']['total'] or 0,
+        'assists': stats['goals']['assists'] or 0,
+        'played': stats['games']['appearences'] or 0,  # (sic) api-football's spelling
+    }
+
+
+def compact_card(entry):
+    stats = entry['statistics'][0]
+    cards = stats['cards']
+    return {
+        'name': entry['player']['name'],
+        'team': stats['team']['name'],
+        'team_id': stats['team']['id'],
+        'yellow': cards['yellow'] or 0,
+        'red': (cards['red'] or 0) + (cards['yellowred'] or 0),  # A second yellow is a red too
+        'played': stats['games']['appearences'] or 0,
+    }
+
+
+# The full table (or just the rows around the followed teams) and how many teams are in the league
+def fetch_standings():
+    response = api_get(f'standings?league={LEAGUE_ID}&season={SEASON}')
+    if not response:
+        return [], 0
+    standings = response[0]['league']['standings'][0]
+    del response
+    return trim_standings([compact_standing(team) for team in standings], FAVOURITE_TEAMS), len(standings)
+
+
+# Keep the rows within `window` places of any of `team_ids` (all of them if none are given)
+def trim_standings(standings, team_ids, window=STANDINGS_WINDOW):
+    if not team_ids:
+        return standings
+    keep = set()
+    for i, team in enumerate(standings):
+        if team['id'] in team_ids:
+            keep.update(range(max(0, i - window), i + window + 1))
+    return [team for i, team in enumerate(standings) if i in keep]
+
+
+def fetch_fixtures(query):
+    response = api_get(f'fixtures?league={LEAGUE_ID}&season={SEASON}&{query}')
+    return [compact_fixture(fixture) for fixture in response or []]
+
+
+# A fixture's goals and cards, or None if the request failed
+def fetch_events(fixture_id):
+    response = api_get(f'fixtures/events?fixture={fixture_id}')
+    if response is None:
+        return None
+    return [compact_event(event) for event in response if event['type'] in ('Goal', 'Card')]
+
+
+def fetch_top_scorers():
+    response = api_get(f'players/topscorers?league={LEAGUE_ID}&season={SEASON}')
+    return [compact_scorer(entry) for entry in (response or [])[:player_stats.SNAPSHOT_PLAYERS]]
+
+
+# Most yellow cards and most reds as one list, a player on both only once
+def fetch_top_cards():
+    cards = []
+    seen = set()
+    for endpoint in ('topyellowcards', 'topredcards'):
+        response = api_get(f'players/{endpoint}?league={LEAGUE_ID}&season={SEASON}')
+        for entry in (response or [])[:player_stats.SNAPSHOT_PLAYERS]:
+            key = (entry['player']['id'], entry['statistics'][0]['team']['id'])
+            if key not in seen:
+                seen.add(key)
+                cards.append(compact_card(entry))
+        del response
+    return cards
+
+
+# Top scorers and discipline leaderboards: fetched once a day, with the goals and
+# cards of `fixtures` added on in between (see player_stats.py)
+def fetch_player_stats(fixtures, path=player_stats.STATS_FILE):
+    stats = player_stats.load(path)
+    if player_stats.is_stale(stats):
+        scorers = fetch_top_scorers()
+        if scorers:  # Otherwise keep the old leaderboards, it's tried again next refresh
+            finished = [fixture['id'] for fixture in fixtures if fixture['status'] in FINISHED_STATUSES]
+            stats = player_stats.snapshot(scorers, fetch_top_cards(), finished)
+    if stats is None:
+        return [], []
+    player_stats.note_events(stats, fixtures)
+    player_stats.save(stats, path)
+    return player_stats.leaderboards(stats)
+
+
+# Today's fixtures topped up with the next ones (same approach as the v9 fixtures script)
+def fetch_upcoming():
+    today = "{:04d}-{:02d}-{:02d}".format(*time.localtime()[:3])
+    fixtures = fetch_fixtures(f'date={today}')
+    if len(fixtures) < MAX_FIXTURES:
+        seen = set(fixture['id'] for fixture in fixtures)
+        for fixture in fetch_fixtures(f'next={MAX_FIXTURES}'):
+            if fixture['id'] not in seen:
+                fixtures.append(fixture)
+                seen.add(fixture['id'])
+    fixtures = sorted(fixtures, key=lambda fixture: fixture['timestamp'])
+    return fixtures[:MAX_FIXTURES]
+
+
+# One from/to query per followed team covers its recent results, live match and next
+# fixtures, instead of the league-wide date, next and last queries
+def fetch_favourite_fixtures():
+    now = time.time()
+    start = "{:04d}-{:02d}-{:02d}".format(*time.localtime(now - FAVOURITE_DAYS_BACK * 86400)[:3])
+    end = "{:04d}-{:02d}-{:02d}".format(*time.localtime(now + FAVOURITE_DAYS_AHEAD * 86400)[:3])
+    upcoming = []
+    results = []
+    seen = set()
+    for team_id in FAVOURITE_TEAMS:
+        for fixture in fetch_fixtures(f'team={team_id}&from={start}&to={end}'):
+            if fixture['id'] in seen:
+                continue  # Two followed teams playing each other
+            seen.add(fixture['id'])
+            if fixture['status'] in FINISHED_STATUSES:
+                results.append(fixture)
+            else:
+                upcoming.append(fixture)
+    upcoming = sorted(upcoming, key=lambda fixture: fixture['timestamp'])[:MAX_FIXTURES]
+    results = sorted(results, key=lambda fixture: -fixture['timestamp'])[:MAX_RESULTS]
+    return upcoming, results
+
+
+# Fixtures whose goal/card events are worth a request
+def event_fixtures(upcoming, results):
+    wanted = [fixture for fixture in upcoming if fixture['status'] in LIVE_STATUSES]
+    if not FAVOURITE_TEAMS:
+        return wanted + [fixture for fixture in results if fixture['status'] in FINISHED_STATUSES]
+    # Only each followed team's latest few results
+    for team_id in FAVOURITE_TEAMS:
+        played = [fixture for fixture in results if team_id in (fixture['home_id'], fixture['away_id'])]
+        wanted += [fixture for fixture in played[:FAVOURITE_EVENT_RESULTS] if fixture not in wanted]
+    return wanted
+
+
+# Events of the fixtures that had already finished at the last fetch never change, so
+# they're carried over from the previous dataset instead of being fetched again
+def known_events(previous):
+    if not previous:
+        return {}
+    final = previous.get('final_events', [])
+    return {fixture['id']: fixture['events'] for fixture in previous['fixtures'] + previous['results']
+            if fixture['id'] in final}
+
+
+# Keep finished results in the on-SD archive, so history never needs another API call
+def archive_results(results):
+    try:
+        archive = results_archive.ResultsArchive()
+        added = sum(archive.add(fixture, fixture['events'], LEAGUE_ID, SEASON) for fixture in results)
+        print(f"Archived {added} new results")
+    except OSError as e:
+        print(f"Failed to archive results: {e}")
+
+
+# Fetch everything every page needs in one go. `previous` is the last dataset, whose
+# finished fixtures' events are reused.
+def fetch_dataset(stats_path=player_stats.STATS_FILE, previous=None):
+    if FAVOURITE_TEAMS:
+        upcoming, results = fetch_favourite_fixtures()
+    else:
+        upcoming = fetch_upcoming()
+        results = fetch_fixtures(f'last={MAX_RESULTS}')
+        results = sorted(results, key=lambda fixture: -fixture['timestamp'])
+
+    # Events for matches that have kicked off (live ones sit in upcoming, finished in results):
+    # only live matches and ones that finished since the last fetch need a request, and
+    # those are skipped once memory is short
+    known = known_events(previous)
+    final = []
+    for fixture in event_fixtures(upcoming, results):
+        if fixture['id'] in known:
+            fixture['events'] = known[fixture['id']]
+        elif memory.events_allowed():
+            events = fetch_events(fixture['id'])
+            if events is None:
+                continue  # Tried again next refresh
+            fixture['events'] = events
+        else:
+            continue
+        if fixture['status'] in FINISHED_STATUSES:
+            final.append(fixture['id'])
+    del known
+    # Only results with their events, the archive takes each fixture once
+    archive_results([fixture for fixture in results if fixture['id'] in final])
+
+    standings, table_size = fetch_standings()
+    scorers, cards = fetch_player_stats(upcoming + results, stats_path)
+    return {
+        'fetched': time.time(),
+        'standings': standings,
+        'table_size': table_size,
+        'fixtures': upcoming,
+        'results': results,
+        'scorers': scorers,
+        'cards': cards,
+        'final_events': final,  # Fixtures whose events are complete, see known_events
+    }
+
+
+def has_live_match(dataset):
+    return any(fixture['status'] in LIVE_STATUSES for fixture in dataset['fixtures'])
+
+
+def is_stale(dataset):
+    max_age = LIVE_STALE_SECONDS if has_live_match(dataset) else STALE_SECONDS
+    return time.time() - dataset.get('fetched', 0) > max_age
+
+
+def load_cache(path=CACHE_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cache(dataset, path=CACHE_FILE):
+    try:
+        with open(path, 'w') as f:
+            json.dump(dataset, f)
+    except OSError as e:
+        print(f"Failed to write cache {path}: {e}")
+
+
+# Cached dataset if it's fresh enough (or we're told to avoid the network), otherwise fetch a new one.
+# `connect` is only called when a fetch is actually needed, so Wi-Fi stays off for cached wakes.
+def get_dataset(connect=None, offline=False, path=CACHE_FILE, stats_path=player_stats.STATS_FILE):
+    dataset = load_cache(path)
+    if dataset is not None and (offline or not is_stale(dataset)):
+        print("Using cached data")
+        return dataset
+    if offline:
+        return None
+    if connect is not None and not connect():
+        print("No network, falling back to cached data")
+        return dataset
+    api_client.start_refresh(REFRESH_BUDGET_MS)
+    try:
+        fresh = fetch_dataset(stats_path, dataset)
+    except api_client.DeadlineExceeded:
+        print("Refresh ran out of time, falling back to cached data")
+        return dataset
+    finally:
+        api_client.close()  # Done with the API for this wake, drop the TLS session
+    if not fresh['standings'] and not fresh['fixtures'] and dataset is not None:
+        print("Fetch failed, keeping cached data")
+        return dataset
+    save_cache(fresh, path)
+    return fresh
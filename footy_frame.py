@@ -0,0 +1,169 @@
+import os
+import json
+import machine
+import sdcard
+import inky_frame
+from machine import Pin, SPI
+from picographics import PicoGraphics, DISPLAY_INKY_FRAME_7
+from pngdec import PNG
+import perf
+import memory
+import wifi_manager
+import time_sync
+import battery
+import footy_data
+import footy_pages
+import results_archive
+
+# Import Wi-Fi credentials
+from WIFI_CONFIG import SSID, PASSWORD
+
+# Rotates through the table, fixtures, results, top scorers, team focus and discipline pages.
+# Every wake draws the next page from one shared dataset cached on the SD card, and
+# only goes online when that dataset is stale. Pressing A-E shows that button's page
+# (see BUTTON_PAGES) straight away from the cached data without touching Wi-Fi.
+
+SLEEP_MINUTES = 15  # How long to sleep between pages
+BATTERY_TARGET_DAYS = None  # e.g. 60 to sleep longer between pages when that's what it takes to last 60 days
+STATE_FILE = "/sd/footy_state.json"
+
+BUTTONS = [inky_frame.button_a, inky_frame.button_b, inky_frame.button_c, inky_frame.button_d, inky_frame.button_e]
+# The page each button shows, the same whatever's configured: E's team page needs a
+# followed team (FAVOURITE_TEAMS) and shows the table without one. Discipline has no
+# button, it only comes up in the rotation.
+BUTTON_PAGES = ('table', 'fixtures', 'results', 'scorers', 'team')
+
+# Grab the receive buffers before anything else fragments the heap
+memory.init()
+
+# Initialize the display for Inky Frame 7.3"
+display = PicoGraphics(display=DISPLAY_INKY_FRAME_7)  # DISPLAY_INKY_FRAME_4 for the 4.0", DISPLAY_INKY_FRAME for the 5.7"
+png = PNG(display)  # Initialize the PNG decoder
+
+# Set up the SD card
+sd_spi = SPI(0, sck=Pin(18, Pin.OUT), mosi=Pin(19, Pin.OUT), miso=Pin(16, Pin.OUT))
+sd = sdcard.SDCard(sd_spi, machine.Pin(22))
+os.mount(sd, "/sd")
+
+# Pages draw from the shared dataset plus the local results archive (head to head, form),
+# or without it if it can't be opened
+try:
+    archive = results_archive.ResultsArchive()
+except OSError as e:
+    print(f"Failed to open the results archive: {e}")
+    archive = None
+footy_pages.init(display, png, archive)
+
+went_online = False  # Whether this wake used the network, for the battery log
+
+
+# Connect to Wi-Fi, trying the cached access point and IP settings first, then make
+# sure the RTC can be trusted before anything works out today's date from it
+def connect_wifi():
+    global went_online
+    if not wifi_manager.connect(SSID, PASSWORD):
+        return False
+    went_online = True
+    time_sync.sync_if_needed()
+    footy_data.SEASON = footy_data.current_season()
+    return True
+
+
+def load_state():
+    try:
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'page': -1}
+
+
+def save_state(state):
+    try:
+        with open(STATE_FILE, 'w') as f:
+            json.dump(state, f)
+    except OSError as e:
+        print(f"Failed to save state: {e}")
+
+
+# Index of the button that woke us (or is being held), None for a timer wake
+def pressed_button():
+    if not inky_frame.woken_by_button():
+        return None
+    for i, button in enumerate(BUTTONS):
+        if button.read():
+            return i
+    return None
+
+
+def main():
+    memory.checkpoint()
+    battery.sample()  # Before Wi-Fi, it shares a pin with the VSYS reading
+    names = footy_pages.page_names()
+    state = load_state()
+
+    button = pressed_button()
+    if button is not None:
+        # Button wake: jump to that page and stay offline, cached data is good enough
+        name = BUTTON_PAGES[button]
+        if name not in names:
+            print(f"No {name} page without FAVOURITE_TEAMS, showing the table")
+            name = 'table'
+        page = names.index(name)
+        dataset = footy_data.get_dataset(offline=True)
+        if dataset is None:
+            dataset = footy_data.get_dataset(connect=connect_wifi)
+    else:
+        page = (state['page'] + 1) % len(names)
+        dataset = footy_data.get_dataset(connect=connect_wifi)
+
+    if dataset is None:
+        print("No data available.")
+        return
+
+    name = names[page]
+    print(f"Drawing page {page}: {name}")
+    led = BUTTONS[BUTTON_PAGES.index(name)] if name in BUTTON_PAGES else None  # The page's button, if it has one
+    if led is not None:
+        led.led_on()
+    footy_pages.draw_page(name, dataset)
+    del dataset
+    memory.checkpoint()
+
+    with perf.span("update"):
+        display.update()
+    if led is not None:
+        led.led_off()
+    battery.log("network" if went_online else "cached")
+
+    state['page'] = page
+    save_state(state)
+    memory.stats()  # Peak usage and fragmentation go into the perf record
+    perf.write(f"page_{name}")
+
+
+# Minutes until the next page: SLEEP_MINUTES, or longer if the battery wouldn't last BATTERY_TARGET_DAYS
+def sleep_minutes():
+    charge = battery.charge()
+    if not BATTERY_TARGET_DAYS or charge is None:
+        return SLEEP_MINUTES
+    costs = battery.costs()
+    if costs is None:
+        return SLEEP_MINUTES  # Not enough history yet
+    # About one wake in every STALE_SECONDS goes online, the rest draw from the cache
+    def mix(minutes):
+        return battery.wake_mix(minutes, footy_data.STALE_SECONDS)
+    choices = [m for m in (5, 10, 15, 20, 30, 60, 120) if m >= SLEEP_MINUTES]
+    minutes = battery.plan_sleep_minutes(charge, costs, BATTERY_TARGET_DAYS, mix, choices)
+    if minutes is None:
+        minutes = max(choices + [SLEEP_MINUTES])
+        print(f"Battery {charge:.0f}%, won't last {BATTERY_TARGET_DAYS} days at any refresh rate, "
+              f"sleeping the longest {minutes} minutes")
+        return minutes
+    print(f"Battery {charge:.0f}%, sleeping {minutes} minutes to last {BATTERY_TARGET_DAYS} days")
+    return minutes
+
+
+main()
+
+# Sleep until the next page is due (or a button is pressed)
+inky_frame.sleep_for(sleep_minutes())
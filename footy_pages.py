@@ -0,0 +1,441 @@
+import time
+import perf
+import memory
+import footy_data
+import form_guide
+import layout
+
+# Page renderers for footy_frame.py. Each page draws one full screen from the shared
+# dataset built by footy_data, it never touches the network. Column positions, row
+# spacing and crest sizes come from layout.py's plan for the display's size.
+#
+# Call init(display, png) once, then draw_page(name, dataset). Pass a ResultsArchive
+# too for head to head strips and locally worked out form (it's only read from the SD card).
+
+display = None
+png = None
+archive = None
+
+
+def init(picographics, png_decoder, results=None):
+    global display, png, archive, WHITE, BLACK, RED, GRAY, GREEN, BLUE, YELLOW
+    display = picographics
+    png = png_decoder
+    archive = results
+
+    # Set colors
+    WHITE = display.create_pen(255, 255, 255)
+    BLACK = display.create_pen(0, 0, 0)
+    RED = display.create_pen(180, 0, 0)
+    GRAY = display.create_pen(128, 128, 128)
+    GREEN = display.create_pen(0, 255, 0)
+    BLUE = display.create_pen(0, 0, 255)
+    YELLOW = display.create_pen(255, 255, 0)  # For yellow cards
+
+
+# time.mktime wants an 8-tuple on MicroPython and a 9-tuple on CPython (the host tools)
+try:
+    time.mktime((2000, 1, 1, 0, 0, 0, 0, 0))
+    _MKTIME_PAD = ()
+except TypeError:
+    _MKTIME_PAD = (0,)
+
+
+def mktime(date_tuple):
+    return time.mktime(tuple(date_tuple[:8]) + _MKTIME_PAD)
+
+
+# Function to determine if a given date is during BST (last Sunday in March to last Sunday in October)
+def is_bst(date_tuple):
+    year = date_tuple[0]
+    last_march_sunday = max(day for day in range(31, 24, -1) if time.localtime(mktime((year, 3, day, 0, 0, 0, 0, 0)))[6] == 6)
+    last_october_sunday = max(day for day in range(31, 24, -1) if time.localtime(mktime((year, 10, day, 0, 0, 0, 0, 0)))[6] == 6)
+    start_bst = (year, 3, last_march_sunday, 1, 0, 0, 0, 0)  # BST starts at 1 AM on the last Sunday in March
+    end_bst = (year, 10, last_october_sunday, 1, 0, 0, 0, 0)  # BST ends at 1 AM on the last Sunday in October
+    return mktime(start_bst) <= mktime(date_tuple) < mktime(end_bst)
+
+
+# Function to convert UTC time string (HH:MM) to local time (considering BST/GMT)
+def convert_utc_to_local(utc_time_str):
+    hour_utc, minute = map(int, utc_time_str.split(":"))
+    time_offset = 1 if is_bst(time.localtime()) else 0  # BST (UTC+1) if DST is active, otherwise GMT (UTC+0)
+    hour_local = (hour_utc + time_offset) % 24
+    return f"{hour_local:02d}:{minute:02d}"
+
+
+# Function to get the day name from a date (YYYY-MM-DD format)
+def get_day_name(date_str):
+    year, month, day = map(int, date_str.split('-'))
+    weekday_num = time.localtime(mktime((year, month, day, 0, 0, 0, 0, 0)))[6]
+    return ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"][weekday_num]
+
+
+# Function to wrap text based on a maximum character count per line
+def wrap_text(text, max_length):
+    lines = []
+    current_line = ""
+    for word in text.split(" "):
+        if len(current_line) + len(word) + 1 <= max_length:
+            if current_line:
+                current_line += " "
+            current_line += word
+        else:
+            lines.append(current_line)
+            current_line = word
+    if current_line:
+        lines.append(current_line)
+    return lines
+
+
+# Function to load and display team crests (pre-scaled to `size`), with a black square if the crest is missing
+def load_and_display_crest(team_id, x, y, size=layout.CREST_NATIVE):
+    if memory.crests_allowed():  # Too little memory left to decode PNGs: just the square
+        try:
+            with perf.span("png"):
+                png.open_file(layout.crest_file(team_id, size))
+                png.decode(x, y)
+            return
+        except OSError:
+            pass
+    display.set_pen(BLACK)
+    display.rectangle(x, y, size, size)
+
+
+# Goal/card events as the short strings shown next to a fixture
+def format_events(events):
+    details = []
+    for event in events:
+        if event['type'] == 'Goal':
+            details.append(f"Goal: {event['player']} ({event['minute']}')")
+        elif event['type'] == 'Card':
+            card_type = 'Yellow' if event['detail'] == 'Yellow Card' else 'Red'
+            details.append(f"{card_type}: {event['player']} ({event['minute']}')")
+    return details
+
+
+def page_title(title, y=5):
+    display.set_pen(BLUE)
+    display.text(title, 10, y, scale=2)
+    display.line(0, y + 20, display.get_bounds()[0], y + 20)
+    return y + 30
+
+
+TABLE_HEADERS = {'team': "Team", 'P': "P", 'W': "W", 'D': "D", 'L': "L", 'GF': "GF", 'GA': "GA",
+                 'GD': "GD", 'Pts': "Pts", 'form': "Form"}
+
+
+# The table's row layout, spacing and crest size for `count` rows from `top` down
+def table_layout(count, top=layout.TABLE_TOP):
+    plan = layout.plan(display)
+    pitch = layout.pitch_for(display, top, count, plan['table_pitch'])
+    if pitch >= 2 * layout.TEXT_HEIGHT + 2:
+        return plan['table'], pitch, layout.crest_size(pitch, plan['crest'])
+    return plan['table_small'], pitch, 0  # Too many rows for the big text, small text and no crests
+
+
+# League table, same layout as league_standings.py
+def draw_table(dataset):
+    standings = dataset['standings']
+    if not standings:
+        display.set_pen(RED)
+        display.text("No standings available.", 10, 10, scale=2)
+        return
+
+    row, pitch, crest = table_layout(len(standings))
+    display.set_pen(BLACK)
+    for name, label in TABLE_HEADERS.items():
+        layout.cell(display, row, name, label, 5)
+
+    y_position = layout.TABLE_TOP  # Start position below headers
+    right = display.get_bounds()[0] - layout.MARGIN
+    # Positions rather than row numbers, the table may be trimmed to the followed teams
+    relegation = dataset.get('table_size', len(standings)) - 2
+
+    previous = None
+    for team in standings:
+        draw_table_row(team, row, y_position, pitch, crest)
+        line_y = table_line_y(row, y_position, pitch)
+
+        # Gap where rows between the followed teams were trimmed out
+        if previous is not None and team['position'] != previous + 1:
+            display.set_pen(GRAY)
+            for x in range(layout.MARGIN, right, 8):
+                display.line(x, line_y, x + 4, line_y)
+        previous = team['position']
+
+        # Lines separating European qualification and relegation places
+        if team['position'] in (5, 6):
+            display.set_pen(BLUE)
+            display.line(layout.MARGIN, line_y, right, line_y)
+        if team['position'] == relegation:
+            display.set_pen(RED)
+            display.line(layout.MARGIN, line_y, right, line_y)
+
+        y_position += pitch
+
+    display.set_pen(RED)
+    line_y = table_line_y(row, y_position, pitch)
+    display.line(layout.MARGIN, line_y, right, line_y)
+
+
+# Separator line just above a table row, halfway into the space between rows
+def table_line_y(row, y_position, pitch):
+    return y_position - (pitch - layout.TEXT_HEIGHT * row['team'][3]) // 2 - 2
+
+
+def draw_table_row(team, row, y_position, pitch, crest):
+    text_height = layout.TEXT_HEIGHT * row['team'][3]
+    display.set_pen(BLACK)
+    layout.cell(display, row, 'pos', f"{team['position']}.", y_position)
+    if crest and 'crest' in row:
+        load_and_display_crest(team['id'], row['crest'][0], y_position + (text_height - crest) // 2, crest)
+    display.set_pen(BLACK)
+    layout.cell(display, row, 'team', team['name'], y_position)
+    for name, key in (('P', 'played'), ('W', 'wins'), ('D', 'draws'), ('L', 'losses'), ('GF', 'goals_for'),
+                      ('GA', 'goals_against'), ('GD', 'goal_difference'), ('Pts', 'points')):
+        layout.cell(display, row, name, f"{team[key]}", y_position)
+    if 'form' not in row:
+        return
+
+    # Team Form (Color Coded with Letters), worked out from the archive if the API had none
+    form = team['form']
+    if not form and archive is not None:
+        form = local_form(team['id'])
+    form_x_offset = row['form'][0]
+    box = min(layout.FORM_BOX - 2, pitch - 4)
+    for j, result in enumerate(form[:5]):
+        if result == 'W':
+            display.set_pen(GREEN)
+        elif result == 'L':
+            display.set_pen(RED)
+        else:
+            display.set_pen(GRAY)
+        display.rectangle(form_x_offset + (j * layout.FORM_BOX), y_position, box, box)
+        if box >= layout.TEXT_HEIGHT + 4:
+            display.set_pen(WHITE)
+            display.text(result, form_x_offset + (j * layout.FORM_BOX) + 2, y_position + 2, scale=1)
+
+
+def local_form(team_id):
+    try:
+        return form_guide.cached_form(archive, team_id)
+    except OSError as e:
+        print(f"Failed to read form for {team_id}: {e}")
+        return ''
+
+
+# Head to head and form line for a fixture that hasn't kicked off, if anything is archived
+def h2h_details(fixture):
+    if archive is None or fixture['status'] != 'NS':
+        return []
+    try:
+        strip = form_guide.h2h_strip(archive, fixture['home_id'], fixture['away_id'])
+    except OSError as e:
+        print(f"Failed to read head to head: {e}")
+        return []
+    return [strip] if strip else []
+
+
+# Score (or kick off time) and its colour for a fixture, as in the v9 fixtures script
+def score_and_pen(fixture):
+    status = fixture['status']
+    score = f"{fixture['home_score']}-{fixture['away_score']}"
+    if status in footy_data.FINISHED_STATUSES:
+        return score, BLACK
+    if status in footy_data.LIVE_STATUSES:
+        return score, GREEN
+    if status == 'NS':
+        return convert_utc_to_local(fixture['date'][11:16]), RED
+    if status == 'TBD':
+        return "TBD", RED
+    return "P-P", RED
+
+
+# A team's name in its fixture column with its league position hugging it (left of a
+# right-aligned home name, right of the away name)
+def draw_fixture_team(row, column, name, team_id, positions, y_position):
+    x, width, chars, scale, align = row[column]
+    label = str(positions[team_id]) if team_id in positions else ""
+    label_width = display.measure_text(label, scale=1) + 3 if label else 0
+    name = layout.fit(display, name[:chars], width - label_width, scale)
+    name_width = display.measure_text(name, scale=scale)
+    name_x = x + width - name_width if align == "r" else x
+    display.set_pen(BLACK)
+    display.text(name, name_x, y_position + 5, scale=scale)
+    if label:
+        display.set_pen(RED)
+        label_x = name_x - label_width if align == "r" else name_x + name_width + 3
+        display.text(label, label_x, y_position - 3, scale=1)
+
+
+# One row per fixture grouped under day headers, same layout as the v9 fixtures script
+def draw_fixture_list(fixtures, positions, y_position=10, max_y=None):
+    if max_y is None:
+        max_y = display.get_bounds()[1]
+    if not fixtures:
+        display.set_pen(RED)
+        display.text("No fixtures found.", 10, y_position, scale=2)
+        return y_position + 40
+
+    plan = layout.plan(display)
+    row = plan['fixture']
+    current_date = None
+    for fixture in fixtures[:memory.fixture_limit(len(fixtures))]:
+        fixture_date = fixture['date'][:10]
+        if y_position + 30 + (20 if fixture_date != current_date else 0) > max_y:
+            break  # Out of room (with the day header, if it needs one), the rest don't fit on this page
+
+        if fixture_date != current_date:
+            current_date = fixture_date
+            date_parts = fixture_date.split('-')
+            display.set_pen(BLUE)
+            display.text(f"{get_day_name(fixture_date)}, {date_parts[2]}-{date_parts[1]}-{date_parts[0]}", 10, y_position, scale=1)
+            y_position += 10
+            display.line(0, y_position, display.get_bounds()[0], y_position)
+            y_position += 10
+
+        score_display, pen_color = score_and_pen(fixture)
+        draw_fixture_team(row, 'home', fixture['home'], fixture['home_id'], positions, y_position)
+        load_and_display_crest(fixture['home_id'], row['home_crest'][0], y_position + 2, row['home_crest'][1])
+        display.set_pen(pen_color)
+        layout.cell(display, row, 'score', score_display, y_position + 5)
+        load_and_display_crest(fixture['away_id'], row['away_crest'][0], y_position + 2, row['away_crest'][1])
+        draw_fixture_team(row, 'away', fixture['away'], fixture['away_id'], positions, y_position)
+
+        # Goal scorers and cards, centred on the row, pushing the next row down if they run long
+        pitch = plan['fixture_pitch']
+        if 'details' in row:
+            details = format_events(fixture['events']) or h2h_details(fixture)
+            x, width, chars, scale, _ = row['details']
+            wrapped_lines = wrap_text("; ".join(details), chars)
+            top = max(y_position - 3, y_position + 8 - (len(wrapped_lines) - 1) * 5)
+            wrapped_lines = wrapped_lines[:max(1, (max_y - top) // 10)]
+            display.set_pen(BLACK)
+            for i, line in enumerate(wrapped_lines):
+                display.text(line, x, top + (i * 10), scale=scale)
+            pitch = max(pitch, top - y_position + len(wrapped_lines) * 10 + 3)
+
+        y_position += pitch
+
+    return y_position + 5
+
+
+def positions_from(dataset):
+    return {team['id']: team['position'] for team in dataset['standings']}
+
+
+def draw_fixtures(dataset):
+    draw_fixture_list(dataset['fixtures'], positions_from(dataset))
+
+
+def draw_results(dataset):
+    draw_fixture_list(dataset['results'], positions_from(dataset))
+
+
+# Player leaderboard rows: rank, player, crest, team and appearances, then `stats` as
+# (column, key, pen) on the right
+def draw_players(title, players, row, headers, stats):
+    y_position = page_title(title)
+    if not players:
+        display.set_pen(RED)
+        display.text(f"No {title.lower()} available.", 10, y_position, scale=2)
+        return
+
+    display.set_pen(BLACK)
+    for name, label in headers:
+        layout.cell(display, row, name, label, y_position)
+    y_position += 30
+
+    pitch = layout.pitch_for(display, y_position, len(players), layout.plan(display)['scorer_pitch'])
+    crest = layout.crest_size(pitch, row['crest'][1]) if 'crest' in row else 0
+    for i, player in enumerate(players):
+        if y_position + 2 * layout.TEXT_HEIGHT > display.get_bounds()[1]:
+            break
+        display.set_pen(BLACK)
+        layout.cell(display, row, 'rank', f"{i + 1}.", y_position)
+        layout.cell(display, row, 'player', player['name'], y_position)
+        if crest:
+            load_and_display_crest(player['team_id'], row['crest'][0], y_position + (2 * layout.TEXT_HEIGHT - crest) // 2, crest)
+        display.set_pen(BLACK)
+        layout.cell(display, row, 'team', player['team'], y_position)
+        layout.cell(display, row, 'apps', f"{player['played']}", y_position)
+        for name, key, pen in stats:
+            display.set_pen(pen)
+            layout.cell(display, row, name, f"{player[key]}", y_position)
+        y_position += pitch
+
+
+def draw_scorers(dataset):
+    draw_players("Top Scorers", dataset['scorers'], layout.plan(display)['scorers'],
+                 (('player', "Player"), ('team', "Team"), ('apps', "Apps"), ('A', "A"), ('G', "G")),
+                 (('A', 'assists', BLACK), ('G', 'goals', GREEN)))
+
+
+# Most booked players, yellows and reds (second yellows included) as of the last
+# refresh, ordered by player_stats.discipline_points
+def draw_discipline(dataset):
+    draw_players("Discipline", dataset.get('cards', []), layout.plan(display)['discipline'],
+                 (('player', "Player"), ('team', "Team"), ('apps', "Apps"), ('Y', "Y"), ('R', "R")),
+                 (('Y', 'yellow', BLACK), ('R', 'red', RED)))
+
+
+def involves(fixture, team_id):
+    return fixture['home_id'] == team_id or fixture['away_id'] == team_id
+
+
+# One club's corner of the table plus its latest result and next fixtures
+def draw_team(dataset, team_id=None):
+    if team_id is None:
+        team_id = footy_data.FOCUS_TEAM_ID
+    standings = dataset['standings']
+    index = next((i for i, team in enumerate(standings) if team['id'] == team_id), None)
+    if index is None:
+        display.set_pen(RED)
+        display.text("Team not found in the table.", 10, 10, scale=2)
+        return
+
+    team = standings[index]
+    load_and_display_crest(team_id, 10, 8)
+    display.set_pen(BLACK)
+    display.text(layout.fit(display, team['name'], display.get_bounds()[0] - 40 - layout.MARGIN, 3), 40, 10, scale=3)
+    y_position = 45
+
+    # The table two places either side of the team
+    row, pitch, crest = table_layout(layout.TABLE_ROWS)
+    start = max(0, min(index - 2, len(standings) - 5))
+    for entry in standings[start:start + 5]:
+        if entry['id'] == team_id:
+            display.set_pen(YELLOW)
+            display.rectangle(0, table_line_y(row, y_position, pitch) + 1, display.get_bounds()[0], pitch)
+        draw_table_row(entry, row, y_position, pitch, crest)
+        y_position += pitch
+
+    y_position += 10
+    positions = positions_from(dataset)
+    fixtures = [f for f in dataset['results'] if involves(f, team_id)][:2]
+    fixtures += [f for f in dataset['fixtures'] if involves(f, team_id)]
+    draw_fixture_list(fixtures, positions, y_position)
+
+
+PAGES = {
+    'table': draw_table,
+    'fixtures': draw_fixtures,
+    'results': draw_results,
+    'scorers': draw_scorers,
+    'team': draw_team,
+    'discipline': draw_discipline,
+}
+
+
+# Pages in rotation order, skipping the team page when no team is followed (the
+# buttons' pages are in footy_frame.BUTTON_PAGES)
+def page_names():
+    return [name for name in ('table', 'fixtures', 'results', 'scorers', 'team', 'discipline')
+            if name != 'team' or footy_data.FOCUS_TEAM_ID is not None]
+
+
+def draw_page(name, dataset):
+    display.set_pen(WHITE)
+    display.clear()
+    display.set_font("bitmap8")
+    PAGES[name](dataset)
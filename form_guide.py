@@ -0,0 +1,97 @@
+# Form guide, home/away splits and head to head records worked out locally from the
+# results archive (results_archive.py) instead of the API.
+#
+# Every lookup is an index range read: a team's last N results, one season of a
+# team's results, or the meetings between two teams (one contiguous range in the
+# pair index). Totals are built incrementally with Tally as records stream past, so
+# nothing scans the log and nothing holds more than a season of records at once.
+
+
+# W, D or L for `team_id` in an archived result
+def result_letter(record, team_id):
+    if record['home_score'] == record['away_score']:
+        return 'D'
+    home_won = record['home_score'] > record['away_score']
+    return 'W' if home_won == (record['home_id'] == team_id) else 'L'
+
+
+# Running played/won/drawn/lost/goals totals for one team
+class Tally:
+    def __init__(self):
+        self.played = 0
+        self.won = 0
+        self.drawn = 0
+        self.lost = 0
+        self.goals_for = 0
+        self.goals_against = 0
+
+    def add(self, record, team_id):
+        home = record['home_id'] == team_id
+        scored = record['home_score'] if home else record['away_score']
+        conceded = record['away_score'] if home else record['home_score']
+        self.played += 1
+        self.goals_for += scored
+        self.goals_against += conceded
+        if scored > conceded:
+            self.won += 1
+        elif scored == conceded:
+            self.drawn += 1
+        else:
+            self.lost += 1
+
+    def points(self):
+        return self.won * 3 + self.drawn
+
+    def __repr__(self):
+        return f"P{self.played} W{self.won} D{self.drawn} L{self.lost} {self.goals_for}-{self.goals_against}"
+
+
+# Last `n` results as a string like the API's form, oldest first
+def form(archive, team_id, n=5, before=0xFFFFFFFF):
+    return "".join(result_letter(record, team_id)
+                   for record in archive.team_results(team_id, until=before, limit=n))
+
+
+# Separate home and away Tallys for a team since a kick off timestamp (e.g. season start)
+def home_away_split(archive, team_id, since=0):
+    home = Tally()
+    away = Tally()
+    for record in archive.team_results(team_id, since=since):
+        (home if record['home_id'] == team_id else away).add(record, team_id)
+    return home, away
+
+
+# Head to head from `team_a`'s point of view: its Tally against `team_b` and the latest meeting
+def head_to_head(archive, team_a, team_b, limit=None):
+    tally = Tally()
+    meetings = archive.head_to_head(team_a, team_b, limit)
+    for record in meetings:
+        tally.add(record, team_a)
+    return tally, meetings[-1] if meetings else None
+
+
+# Cached per wake, a team shows up in several fixtures but its form only needs reading once
+_form_cache = {}
+
+
+def cached_form(archive, team_id, n=5):
+    key = (team_id, n)
+    if key not in _form_cache:
+        _form_cache[key] = form(archive, team_id, n)
+    return _form_cache[key]
+
+
+# One line for an upcoming fixture: head to head from the home side's view plus both forms,
+# e.g. "H2H W3 D1 L2, last 2-1 | Form WWDLW v LDWWW". Empty when nothing is archived.
+def h2h_strip(archive, home_id, away_id, meetings=10):
+    parts = []
+    tally, last = head_to_head(archive, home_id, away_id, meetings)
+    if tally.played:
+        last_score = f"{last['home_score']}-{last['away_score']}" if last['home_id'] == home_id \
+            else f"{last['away_score']}-{last['home_score']}"
+        parts.append(f"H2H W{tally.won} D{tally.drawn} L{tally.lost}, last {last_score}")
+    home_form = cached_form(archive, home_id)
+    away_form = cached_form(archive, away_id)
+    if home_form or away_form:
+        parts.append(f"Form {home_form or '-'} v {away_form or '-'}")
+    return " | ".join(parts)
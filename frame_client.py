@@ -0,0 +1,121 @@
+import struct
+import gc
+import api_client
+import perf
+
+# Thin client for tools/frame_server.py: instead of fetching JSON and decoding crest
+# PNGs on the Pico, pull one frame the server already rendered and stream it straight
+# into the display. No JSON parsing, no PNG decoding, no API key on the device.
+
+SERVER_URL = "http://192.168.1.10:8080"  # Where tools/frame_server.py is running
+FRAME_ID = "frame1"  # Each frame gets its own page rotation on the server
+SLEEP_MINUTES = 15
+
+# Frame blob header: magic, width, height, bits per pixel, reserved
+FRAME_MAGIC = b"IKFR"
+FRAME_HEADER = ">4sHHBB"
+FRAME_HEADER_SIZE = struct.calcsize(FRAME_HEADER)
+
+
+# Fill the whole memoryview from the stream, False if it ended early
+def read_exactly(stream, view):
+    got = 0
+    while got < len(view):
+        n = stream.readinto(view[got:])
+        if not n:
+            return False
+        got += n
+    return True
+
+
+# Draw one row of packed 4bpp palette indices as horizontal runs of the same colour
+def draw_packed_row(display, row, y):
+    run_start = 0
+    run_pen = row[0] >> 4
+    x = 0
+    for byte in row:
+        for pen in (byte >> 4, byte & 0x0F):
+            if pen != run_pen:
+                display.set_pen(run_pen)
+                display.pixel_span(run_start, y, x - run_start)
+                run_start = x
+                run_pen = pen
+            x += 1
+    display.set_pen(run_pen)
+    display.pixel_span(run_start, y, x - run_start)
+
+
+# Stream a packed frame into the display, returns True once every row has been drawn
+def draw_frame(display, stream):
+    header = bytearray(FRAME_HEADER_SIZE)
+    if not read_exactly(stream, memoryview(header)):
+        print("Frame ended before its header")
+        return False
+    magic, width, height, bpp, _ = struct.unpack(FRAME_HEADER, header)
+    if magic != FRAME_MAGIC or bpp != 4 or (width, height) != display.get_bounds():
+        print(f"Frame doesn't suit this display: {magic} {width}x{height} {bpp}bpp")
+        return False
+
+    # Displays whose framebuffer sits in RP2040 RAM in the same packed format (Inky Frame
+    # 4.0/5.7) take the frame as is. The 7.3" keeps its framebuffer in PSRAM, so it's drawn
+    # row by row in runs instead.
+    try:
+        framebuffer = memoryview(display)
+    except TypeError:
+        framebuffer = None
+    if framebuffer is not None and len(framebuffer) == width * height // 2:
+        return read_exactly(stream, framebuffer)
+
+    row = bytearray(width // 2)
+    row_view = memoryview(row)
+    for y in range(height):
+        if not read_exactly(stream, row_view):
+            print(f"Frame ended at row {y}")
+            return False
+        draw_packed_row(display, row, y)
+    return True
+
+
+# Fetch the next pre-rendered page for this frame and draw it
+def fetch_frame(display, url=None):
+    if url is None:
+        url = f"{SERVER_URL}/frame/next?frame={FRAME_ID}"
+    gc.collect()
+    try:
+        response = api_client.open_stream(url)
+    except OSError as e:
+        print(f"Failed to fetch frame: {e}")
+        return False
+    try:
+        if response.status_code != 200:
+            print(f"Failed to fetch frame: {response.status_code}")
+            return False
+        with perf.span("draw"):
+            return draw_frame(display, response)
+    except OSError as e:  # The server stalled or dropped mid-frame, keep the old one on the panel
+        print(f"Frame stream failed: {e}")
+        return False
+    finally:
+        response.close()
+        gc.collect()
+
+
+def main():
+    import inky_frame
+    import wifi_manager
+    from picographics import PicoGraphics, DISPLAY_INKY_FRAME_7
+    from WIFI_CONFIG import SSID, PASSWORD
+
+    display = PicoGraphics(display=DISPLAY_INKY_FRAME_7)  # DISPLAY_INKY_FRAME_4 for the 4.0", DISPLAY_INKY_FRAME for the 5.7"
+
+    # If anything goes wrong leave the last frame on the panel rather than blanking it
+    if wifi_manager.connect(SSID, PASSWORD) and fetch_frame(display):
+        with perf.span("update"):
+            display.update()
+    perf.write("frame_client")
+
+    inky_frame.sleep_for(SLEEP_MINUTES)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import json
+
+# Layout plans for every Inky Frame size (4.0" 640x400, 5.7" 600x448, 7.3" 800x480).
+#
+# Pages describe their rows as columns: text columns in characters at a text scale,
+# crests and form boxes in pixels. plan(display) solves those into x positions and
+# widths for the panel it's given: columns get their natural width when there's room,
+# with any spare going to the `grow` column; otherwise the gaps close up, then text
+# columns lose characters down to their minimum, and only then are columns dropped
+# (lowest `drop` first, 0 never). Row heights and the crest size come from the panel
+# height. Plans are cached per panel size in memory and on the SD card, so a wake
+# just loads the plan instead of working it out again.
+#
+# Crests come pre-scaled (tools/scale_crests.py) in CREST_SIZES: the 20 px originals
+# in /sd, the others in /sd/crests/<size>/, so there's no scaling at draw time.
+
+PLAN_FILE = "/sd/layout.json"
+PLAN_VERSION = 3  # Bump when the column specs change, so cached plans get redone
+
+CREST_SIZES = (20, 16, 12)  # Pre-scaled crest sizes, biggest first
+CREST_NATIVE = 20  # Size of the crests in footy_frame_crests.zip
+TEXT_HEIGHT = 8  # bitmap8 is 8 px tall at scale 1
+MARGIN = 5  # Left/right edge of every row
+GAP = 12  # Space between columns...
+MIN_GAP = 4  # ...closed up to this on narrow panels
+FORM_BOX = 16  # One W/D/L box in the form column
+POSITION_PX = 15  # League position superscript after a team name
+
+
+# One column: `chars` at text `scale` plus `px`, shrinking to `min_chars`
+def col(name, chars=0, scale=2, min_chars=None, px=0, drop=0, grow=False, align="l"):
+    return (name, chars, scale, chars if min_chars is None else min_chars, px, drop, grow, align)
+
+
+CREST = -1  # px placeholder for the crest size of the plan
+
+TABLE = (
+    col("pos", 3), col("crest", px=CREST), col("team", 17, min_chars=8, grow=True),
+    col("P", 2), col("W", 2, drop=3), col("D", 2, drop=3), col("L", 2, drop=3),
+    col("GF", 3, drop=1), col("GA", 3, drop=1), col("GD", 3), col("Pts", 3),
+    col("form", px=5 * FORM_BOX, drop=2),
+)
+FIXTURE = (
+    col("home", 19, min_chars=10, align="r"),  # Name plus the league position hugging it
+    col("home_crest", px=CREST), col("score", 5, align="c"), col("away_crest", px=CREST),
+    col("away", 19, min_chars=10),
+    col("details", 30, scale=1, min_chars=24, grow=True, drop=1),
+)
+# match_fixtures' rows: kick-off time, then each team's crest and name with its league position after it
+DAY_FIXTURE = (
+    col("time", 5), col("home_crest", px=CREST), col("home", 17, min_chars=8, px=POSITION_PX),
+    col("score", 5, align="c"), col("away_crest", px=CREST), col("away", 17, min_chars=8, px=POSITION_PX),
+    col("details", 40, scale=1, min_chars=24, grow=True, drop=1),
+)
+SCORERS = (
+    col("rank", 3), col("player", 20, min_chars=10, grow=True), col("crest", px=CREST),
+    col("team", 17, min_chars=8, drop=2), col("apps", 4, drop=1, align="r"), col("A", 2, align="r"),
+    col("G", 2, align="r"),
+)
+DISCIPLINE = (
+    col("rank", 3), col("player", 20, min_chars=10, grow=True), col("crest", px=CREST),
+    col("team", 17, min_chars=8, drop=2), col("apps", 4, drop=1, align="r"), col("Y", 2, align="r"),
+    col("R", 2, align="r"),
+)
+
+TABLE_TOP = 30  # Below the header row
+TABLE_ROWS = 20  # Rows the table's height is planned for (more squeeze in at draw time)
+TABLE_PITCH = 22  # Row spacing when there's room
+FIXTURE_PITCH = 40
+SCORER_PITCH = 40
+SCORER_ROWS = 10
+
+_plans = {}
+
+
+# Width in px of one character at each scale (bitmap8 digits are all the same width)
+def _char_widths(display):
+    return {scale: display.measure_text("0", scale=scale) for scale in (1, 2, 3)}
+
+
+def _widths(columns, chars_of, char_w, crest):
+    return [chars_of(c) * char_w[c[2]] + (crest if c[4] == CREST else c[4]) for c in columns]
+
+
+# Solve a row spec for `width` px: {name: [x, width, chars, scale, align]}
+def solve(spec, width, char_w, crest):
+    columns = [c for c in spec if not (c[4] == CREST and not crest)]
+    while True:
+        gaps = len(columns) - 1
+        room = width - 2 * MARGIN
+        natural = _widths(columns, lambda c: c[1], char_w, crest)
+        if sum(natural) + gaps * GAP <= room:
+            chars = [c[1] for c in columns]
+            gap = GAP
+            spare = room - sum(natural) - gaps * GAP
+            break
+        minimum = _widths(columns, lambda c: c[3], char_w, crest)
+        if sum(minimum) + gaps * MIN_GAP <= room or not any(c[5] for c in columns):
+            # Close up the gaps first, then take characters off the longest text columns
+            gap = max(MIN_GAP, (room - sum(natural)) // gaps) if gaps else 0
+            chars = [c[1] for c in columns]
+            over = sum(natural) + gaps * gap - room
+            while over > 0:
+                i = max(range(len(columns)), key=lambda i: (chars[i] - columns[i][3]) * char_w[columns[i][2]])
+                if chars[i] <= columns[i][3]:
+                    break  # Nothing left to give, it overflows
+                chars[i] -= 1
+                over -= char_w[columns[i][2]]
+            spare = max(0, -over)
+            break
+        victim = min((c for c in columns if c[5]), key=lambda c: c[5])
+        columns.remove(victim)
+
+    row = {}
+    x = MARGIN
+    for c, n in zip(columns, chars):
+        w = n * char_w[c[2]] + (crest if c[4] == CREST else c[4])
+        if c[6]:
+            w += spare
+            n += spare // char_w[c[2]] if c[1] else 0
+        row[c[0]] = [x, w, n, c[2], c[7]]
+        x += w + gap
+    return row
+
+
+# Biggest pre-scaled crest that fits in a row `pitch` px apart (and `limit` px wide)
+def crest_size(pitch, limit=CREST_NATIVE):
+    for size in CREST_SIZES:
+        if size + 2 <= pitch and size <= limit:
+            return size
+    return 0
+
+
+def _compute(display):
+    width, height = display.get_bounds()
+    char_w = _char_widths(display)
+    table_pitch = min(TABLE_PITCH, (height - TABLE_TOP) // TABLE_ROWS)
+    crest = crest_size(table_pitch)
+    scorer_pitch = min(SCORER_PITCH, (height - 65) // SCORER_ROWS)
+    return {
+        "v": PLAN_VERSION,
+        "size": [width, height],
+        "crest": crest,
+        "table": solve(TABLE, width, char_w, crest),
+        # Scale 1 and no crests, for tables too long for the big text
+        "table_small": solve(tuple(c[:2] + (1,) + c[3:] for c in TABLE), width, char_w, 0),
+        "table_pitch": table_pitch,
+        "fixture": solve(FIXTURE, width, char_w, crest_size(FIXTURE_PITCH)),
+        "fixture_pitch": FIXTURE_PITCH,
+        "day_fixture": solve(DAY_FIXTURE, width, char_w, crest_size(FIXTURE_PITCH)),
+        "scorers": solve(SCORERS, width, char_w, crest),
+        "discipline": solve(DISCIPLINE, width, char_w, crest),
+        "scorer_pitch": scorer_pitch,
+    }
+
+
+def _load(key, path):
+    try:
+        with open(path) as f:
+            saved = json.load(f).get(key)
+        if saved and saved.get("v") == PLAN_VERSION:
+            return saved
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _save(key, found, path):
+    try:
+        try:
+            with open(path) as f:
+                plans = json.load(f)
+        except (OSError, ValueError):
+            plans = {}
+        plans[key] = found
+        with open(path, "w") as f:
+            json.dump(plans, f)
+    except OSError:
+        pass  # No SD card (or the host tools), it's only a cache
+
+
+# The layout plan for this display's size, worked out once per panel size
+def plan(display, path=PLAN_FILE):
+    width, height = display.get_bounds()
+    key = f"{width}x{height}"
+    found = _plans.get(key)
+    if found is None:
+        found = _load(key, path)
+        if found is None:
+            found = _compute(display)
+            _save(key, found, path)
+        _plans[key] = found
+    return found
+
+
+# Row spacing for `count` rows from `top` down to the bottom of the panel, at most `pitch`
+def pitch_for(display, top, count, pitch):
+    return min(pitch, (display.get_bounds()[1] - top) // max(1, count))
+
+
+# Cut `text` down until it fits in `width` px
+def fit(display, text, width, scale):
+    while text and display.measure_text(text, scale=scale) > width:
+        text = text[:-1]
+    return text
+
+
+# Draw `text` in the row's column `name` (skipped if the panel had no room for the
+# column), truncated to fit and aligned. Returns the x it was drawn at and its width.
+def cell(display, row, name, text, y):
+    column = row.get(name)
+    if column is None:
+        return None, 0
+    x, width, chars, scale, align = column
+    text = fit(display, text[:chars], width, scale)
+    drawn = display.measure_text(text, scale=scale)
+    if align == "r":
+        x += width - drawn
+    elif align == "c":
+        x += (width - drawn) // 2
+    display.text(text, x, y, scale=scale)
+    return x, drawn
+
+
+# File for a team's crest at `size` px (the originals in /sd, the scaled ones under /sd/crests)
+def crest_file(team_id, size):
+    if size == CREST_NATIVE:
+        return f"/sd/{team_id}.png"
+    return f"/sd/crests/{size}/{team_id}.png"
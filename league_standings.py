@@ -1,19 +1,23 @@
-import network
-import urequests
-import time
+import wifi_manager
+import time_sync
+import api_client
 import os
 import machine
 import sdcard
 from machine import Pin, SPI
 from picographics import PicoGraphics, DISPLAY_INKY_FRAME_7, PEN_P4
 from pngdec import PNG
+import perf
+import results_archive
+import form_guide
+import layout
 
 # Import Wi-Fi credentials and API key
 from WIFI_CONFIG import SSID, PASSWORD
 from API_KEY import API_KEY
 
 # Initialize the display for Inky Frame 7.3"
-display = PicoGraphics(display=DISPLAY_INKY_FRAME_7)
+display = PicoGraphics(display=DISPLAY_INKY_FRAME_7)  # DISPLAY_INKY_FRAME_4 for the 4.0", DISPLAY_INKY_FRAME for the 5.7"
 png = PNG(display)  # Initialize the PNG decoder
 
 # Set colors
@@ -24,21 +28,34 @@ GRAY = display.create_pen(128, 128, 128)
 GREEN = display.create_pen(0, 255, 0)
 BLUE = display.create_pen(0, 0, 255)
 
-# Wi-Fi Connection
-wlan = network.WLAN(network.STA_IF)
-wlan.active(True)
-wlan.connect(SSID, PASSWORD)
-
-# Wait for connection
-while not wlan.isconnected():
-    time.sleep(1)
-print("Connected to Wi-Fi")
-
-# Set up the SD card
+# Set up the SD card first, so the Wi-Fi and clock state is shared with the other scripts on it
 sd_spi = SPI(0, sck=Pin(18, Pin.OUT), mosi=Pin(19, Pin.OUT), miso=Pin(16, Pin.OUT))
 sd = sdcard.SDCard(sd_spi, machine.Pin(22))
 os.mount(sd, "/sd")
 
+# Wi-Fi Connection
+connected = wifi_manager.connect(SSID, PASSWORD)
+if connected:
+    time_sync.sync_if_needed()
+
+# Results archive, for working out form locally if the API doesn't send it
+try:
+    archive = results_archive.ResultsArchive()
+except OSError as e:
+    print(f"Failed to open the results archive: {e}")
+    archive = None
+
+
+# Form from the archive, or none if it can't be read (the table is drawn without it)
+def local_form(team_id):
+    if archive is None:
+        return ''
+    try:
+        return form_guide.form(archive, team_id)
+    except OSError as e:
+        print(f"Failed to read form for {team_id}: {e}")
+        return ''
+
 # Fetch Premier League data
 LEAGUE_ID = 39  # Premier League ID
 SEASON = 2024  # Current season
@@ -47,11 +64,26 @@ headers = {
     'x-apisports-key': API_KEY
 }
 
-response = urequests.get(url, headers=headers)
+response = None
+if not connected:
+    print("No Wi-Fi, leaving the last table on the panel")
+else:
+    api_client.start_refresh()  # Requests give up past the deadline
+    try:
+        response = api_client.get(url, headers=headers)
+    except OSError as e:  # Timed out, out of retries or past the refresh deadline
+        print("Failed to fetch data:", e)
+        display.set_pen(WHITE)
+        display.clear()
+        display.set_pen(RED)
+        display.text(f"Couldn't fetch the table: {e}", 10, 10, display.get_bounds()[0] - 20, 2)
+        with perf.span("update"):
+            display.update()
 
 # Check if the response is OK
-if response.status_code == 200:
-    data = response.json()
+if response is not None and response.status_code == 200:
+    with perf.span("parse"):
+        data = response.json()
     standings = data['response'][0]['league']['standings'][0]
 
     # Extract league details
@@ -69,7 +101,7 @@ if response.status_code == 200:
             'goals_against': team['all']['goals']['against'],
             'goal_difference': team['goalsDiff'],
             'points': team['points'],
-            'form': team['form']
+            'form': team['form'] or local_form(team['team']['id'])
         })
 
     # Clear the display
@@ -79,99 +111,103 @@ if response.status_code == 200:
     # Set the font to bitmap8
     display.set_font("bitmap8")
 
-    # Draw column headers (shifted 20 pixels to the right)
+    # Column positions, row spacing and crest size for this display size
+    plan = layout.plan(display)
+    row = plan['table']
+    line_height = layout.pitch_for(display, layout.TABLE_TOP, len(league_table), plan['table_pitch'])
+    crest = layout.crest_size(line_height, plan['crest'])
+    right = display.get_bounds()[0] - layout.MARGIN
+
+    # Draw column headers
     display.set_pen(BLACK)
-    display.text("Team", 60, 5, scale=2)
-    display.text("P", 235, 5, scale=2)   # Shifted by 20px
-    display.text("W", 295, 5, scale=2)   # Shifted by 20px
-    display.text("D", 355, 5, scale=2)   # Shifted by 20px
-    display.text("L", 415, 5, scale=2)   # Shifted by 20px
-    display.text("GF", 475, 5, scale=2)  # Shifted by 20px
-    display.text("GA", 535, 5, scale=2)  # Shifted by 20px
-    display.text("GD", 595, 5, scale=2)  # Shifted by 20px
-    display.text("Pts", 655, 5, scale=2) # Shifted by 20px
-    display.text("Form", 725, 5, scale=2)
+    for name, label in (('team', "Team"), ('P', "P"), ('W', "W"), ('D', "D"), ('L', "L"), ('GF', "GF"),
+                        ('GA', "GA"), ('GD', "GD"), ('Pts', "Pts"), ('form', "Form")):
+        layout.cell(display, row, name, label, 5)
 
     # Start drawing the teams' data
-    y_position = 30  # Start position below headers
-    line_height = 22  # Reduced space between rows
+    y_position = layout.TABLE_TOP  # Start position below headers
 
     for i, team in enumerate(league_table):
-        x_offset = 5  # Offset for left margin
+        x_offset = layout.MARGIN  # Offset for left margin
 
         # Draw lines to separate European qualification and relegation places
         if i == 4:  # Top 4 teams (Champions League qualification)
             display.set_pen(BLUE)
-            display.line(x_offset, y_position - 5, 790, y_position - 5)
+            display.line(x_offset, y_position - 5, right, y_position - 5)
 
         if i == 5:  # Top 5 teams (Europa League/Conference League qualification)
             display.set_pen(BLUE)
-            display.line(x_offset, y_position - 5, 790, y_position - 5)
+            display.line(x_offset, y_position - 5, right, y_position - 5)
 
         if i == 17:  # Bottom 3 teams (relegation)
             display.set_pen(RED)
-            display.line(x_offset, y_position - 5, 790, y_position - 5)
+            display.line(x_offset, y_position - 5, right, y_position - 5)
 
-        # Draw Team Position (shifted after crest column)
+        # Draw Team Position
         display.set_pen(BLACK)
-        display.text(f"{team['position']}.", x_offset, y_position, scale=2)
-
-        # Load and draw the team crest using pngdec, using team ID as filename
-        crest_filename = f"/sd/{team['id']}.png"
-        try:
-            with open(crest_filename, 'rb'):
-                png.open_file(crest_filename)
-                png.decode(x_offset+30, y_position-3)  # Position the PNG at the current offset and y position
-        except OSError:
-            print(f"Crest file not found: {crest_filename}")
-        except Exception as e:
-            print(f"Error loading crest {crest_filename}: {e}")
-
-        # Team Name (shifted after position and crest)
+        layout.cell(display, row, 'pos', f"{team['position']}.", y_position)
+
+        # Load and draw the team crest using pngdec, pre-scaled to fit the row (none if the rows are too tight)
+        if crest and 'crest' in row:
+            crest_filename = layout.crest_file(team['id'], crest)
+            try:
+                with open(crest_filename, 'rb'), perf.span("png"):
+                    png.open_file(crest_filename)
+                    png.decode(row['crest'][0], y_position + (16 - crest) // 2)  # Centred on the scale 2 text
+            except OSError:
+                print(f"Crest file not found: {crest_filename}")
+            except Exception as e:
+                print(f"Error loading crest {crest_filename}: {e}")
+
+        # Team Name
         display.set_pen(BLACK)
-        display.text(f"{team['name'][:17]}", x_offset + 55, y_position, scale=2)
+        layout.cell(display, row, 'team', team['name'], y_position)
 
         # Matches Played, Wins, Draws, Losses, Goals For, Goals Against, Goal Difference, Points
-        display.text(f"{team['played']}", 235, y_position, scale=2)   # Shifted by 20px
-        display.text(f"{team['wins']}", 295, y_position, scale=2)     # Shifted by 20px
-        display.text(f"{team['draws']}", 355, y_position, scale=2)    # Shifted by 20px
-        display.text(f"{team['losses']}", 415, y_position, scale=2)   # Shifted by 20px
-        display.text(f"{team['goals_for']}", 475, y_position, scale=2)# Shifted by 20px
-        display.text(f"{team['goals_against']}", 535, y_position, scale=2) # Shifted by 20px
-        display.text(f"{team['goal_difference']}", 595, y_position, scale=2)# Shifted by 20px
-        display.text(f"{team['points']}", 655, y_position, scale=2)   # Shifted by 20px
+        # (columns the panel has no room for are skipped)
+        for name, key in (('P', 'played'), ('W', 'wins'), ('D', 'draws'), ('L', 'losses'), ('GF', 'goals_for'),
+                          ('GA', 'goals_against'), ('GD', 'goal_difference'), ('Pts', 'points')):
+            layout.cell(display, row, name, f"{team[key]}", y_position)
 
         # Team Form (Color Coded with Letters)
-        form_x_offset = 720  # Shifted by 20px
-        for j, result in enumerate(team['form']):
-            if result == 'W':
-                display.set_pen(GREEN)  # Win
-            elif result == 'L':
-                display.set_pen(RED)  # Loss
-            elif result == 'D':
-                display.set_pen(GRAY)  # Draw
-            
-            # Draw a smaller square representing the form
-            display.rectangle(form_x_offset + (j * 16), y_position, 14, 14)
-            
-            # Draw the W, D, L letters inside the square
-            display.set_pen(WHITE)
-            display.text(result, form_x_offset + (j * 16) + 2, y_position + 2, scale=1)
+        if 'form' in row:
+            form_x_offset = row['form'][0]
+            box = min(layout.FORM_BOX - 2, line_height - 4)
+            for j, result in enumerate(team['form'][:5]):
+                if result == 'W':
+                    display.set_pen(GREEN)  # Win
+                elif result == 'L':
+                    display.set_pen(RED)  # Loss
+                elif result == 'D':
+                    display.set_pen(GRAY)  # Draw
+
+                # Draw a smaller square representing the form
+                display.rectangle(form_x_offset + (j * layout.FORM_BOX), y_position, box, box)
+
+                # Draw the W, D, L letters inside the square
+                display.set_pen(WHITE)
+                display.text(result, form_x_offset + (j * layout.FORM_BOX) + 2, y_position + 2, scale=1)
 
         # Update the y_position for the next team
         y_position += line_height
 
     # Draw final relegation line
     display.set_pen(RED)
-    display.line(x_offset, y_position - 5, 790, y_position - 5)
+    display.line(x_offset, y_position - 5, right, y_position - 5)
 
     # Update the display
-    display.update()
+    with perf.span("update"):
+        display.update()
 
-else:
+elif response is not None:
     print("Failed to fetch data:", response.status_code)
 
-response.close()
+if response is not None:
+    response.close()
+api_client.close()  # Done with the API for this refresh, drop the TLS session
+
+# Log where this refresh's time and memory went
+perf.write("standings")
 
 # Unmount the SD card
 #os.umount("/sd")
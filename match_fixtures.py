@@ -1,5 +1,6 @@
-import network
-import urequests
+import wifi_manager
+import time_sync
+import api_client
 import time
 import os
 import machine
@@ -8,13 +9,15 @@ from machine import Pin, SPI
 from picographics import PicoGraphics, DISPLAY_INKY_FRAME_7
 from pngdec import PNG
 import uasyncio as asyncio
+import perf
+import layout
 
 # Import Wi-Fi credentials and API key
 from WIFI_CONFIG import SSID, PASSWORD
 from API_KEY import API_KEY
 
 # Initialize the display for Inky Frame 7.3"
-display = PicoGraphics(display=DISPLAY_INKY_FRAME_7)
+display = PicoGraphics(display=DISPLAY_INKY_FRAME_7)  # DISPLAY_INKY_FRAME_4 for the 4.0", DISPLAY_INKY_FRAME for the 5.7"
 png = PNG(display)  # Initialize the PNG decoder
 
 # Set colors
@@ -89,23 +92,27 @@ def convert_utc_to_local(utc_time_str):
     hour_local = (hour_utc + time_offset) % 24
     return f"{hour_local:02d}:{minute:02d}"
 
-# Async function to connect to Wi-Fi
+# Async function to connect to Wi-Fi, returns whether it's connected
 async def connect_wifi():
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-    wlan.connect(SSID, PASSWORD)
-    while not wlan.isconnected():
-        await asyncio.sleep(1)
-    print("Connected to Wi-Fi")
+    if not wifi_manager.connect(SSID, PASSWORD):
+        return False
+    time_sync.sync_if_needed()  # get_date_and_day trusts the RTC
+    return True
 
 # Async function to fetch the current league standings
 async def fetch_standings():
     url = f'https://v3.football.api-sports.io/standings?league={LEAGUE_ID}&season={SEASON}'
     headers = {'x-apisports-key': API_KEY}
-    response = urequests.get(url, headers=headers)
+    try:
+        response = api_client.get(url, headers=headers)
+    except OSError as e:  # Timed out, out of retries or past the refresh deadline
+        print("Failed to fetch standings:", e)
+        return {}
 
     if response.status_code == 200:
-        data = response.json()
+        with perf.span("parse"):
+            data = response.json()
+        response.close()
         standings = data['response'][0]['league']['standings'][0]
 
         # Create a dictionary mapping team IDs to their league positions
@@ -113,18 +120,23 @@ async def fetch_standings():
         return positions
     else:
         print("Failed to fetch standings:", response.status_code)
+        response.close()
         return {}
 
 # Async function to fetch fixture events like goals and cards
 async def fetch_fixture_events(fixture_id):
     url = f'https://v3.football.api-sports.io/fixtures/events?fixture={fixture_id}'
     headers = {'x-apisports-key': API_KEY}
-    response = urequests.get(url, headers=headers)
-
     details = []
+    try:
+        response = api_client.get(url, headers=headers)
+    except OSError as e:  # Timed out, out of retries or past the refresh deadline
+        print("Failed to fetch events:", e)
+        return details
 
     if response.status_code == 200:
-        events = response.json()['response']
+        with perf.span("parse"):
+            events = response.json()['response']
 
         for event in events:
             if event['type'] == 'Goal':
@@ -161,6 +173,36 @@ def wrap_text(text, max_length):
 
     return lines
 
+# Function to draw a team's crest in its column of the fixture row (pre-scaled to the
+# column's width, see tools/scale_crests.py)
+def draw_crest(row, column, team_id, y_position):
+    if column not in row:
+        return  # No room for crests on this panel
+    x, size = row[column][:2]
+    crest_filename = layout.crest_file(team_id, size)
+    try:
+        with open(crest_filename, 'rb'), perf.span("png"):
+            png.open_file(crest_filename)
+            png.decode(x, y_position - 3)
+    except OSError:
+        print(f"Crest file not found: {crest_filename}")
+    except Exception as e:
+        print(f"Error loading crest {crest_filename}: {e}")
+
+# Function to draw a team name in its fixture column, with the league position as a
+# smaller superscript in red just after it
+def draw_team_name(row, column, name, team_id, positions, y_position):
+    x, width, chars, scale, _ = row[column]
+    league_position = str(positions[team_id]) if team_id in positions else ""
+    position_width = display.measure_text(league_position, scale=1) + 3 if league_position else 0
+    name = layout.fit(display, name[:chars], width - position_width, scale)
+
+    display.set_pen(BLACK)
+    display.text(name, x, y_position, scale=scale)
+    if league_position:
+        display.set_pen(RED)
+        display.text(league_position, x + display.measure_text(name, scale=scale) + 3, y_position - 3, scale=1)
+
 # Async function to fetch and display fixtures
 async def fetch_and_display_fixtures(positions):
     y_position = 10  # Starting y-position for the first day's fixtures, moved up by 5 pixels
@@ -181,11 +223,19 @@ async def fetch_and_display_fixtures(positions):
         # Fetch the day's fixtures
         url = f'https://v3.football.api-sports.io/fixtures?league={LEAGUE_ID}&date={date[6:]}-{date[3:5]}-{date[0:2]}&season={SEASON}'
         headers = {'x-apisports-key': API_KEY}
-        response = urequests.get(url, headers=headers)
+        try:
+            response = api_client.get(url, headers=headers)
+        except OSError as e:  # Timed out, out of retries or past the refresh deadline
+            print("Failed to fetch fixtures:", e)
+            display.set_pen(RED)
+            display.text("Couldn't fetch fixtures.", 10, y_position, scale=2)
+            y_position += line_height
+            continue
 
         # Check if the response is OK
         if response.status_code == 200:
-            data = response.json()
+            with perf.span("parse"):
+                data = response.json()
             fixtures = data['response']
 
             if not fixtures:
@@ -193,13 +243,16 @@ async def fetch_and_display_fixtures(positions):
                 display.text("No fixtures found.", 10, y_position, scale=2)
                 y_position += line_height
             else:
-                # Draw column headers with scale=1
+                # Column positions for this display size come from the layout plan
+                row = layout.plan(display)['day_fixture']
+
+                # Draw column headers with scale=1 (Score centred over the scores)
                 display.set_pen(BLACK)
-                display.text("Time", 10, y_position, scale=1)
-                display.text("Home", 70, y_position, scale=1)  # Move Home team name left by 15 pixels
-                display.text("Score", 290, y_position, scale=1)  # Move Score left by 5 pixels
-                display.text("Away", 330, y_position, scale=1)  # Move Away team name right by 10 pixels
-                display.text("Details", 515, y_position, scale=1)  # Move Details right by 5 pixels
+                for column, header in (('time', "Time"), ('home', "Home"), ('away', "Away"), ('details', "Details")):
+                    if column in row:
+                        display.text(header, row[column][0], y_position, scale=1)
+                score_x, score_width = row['score'][:2]
+                display.text("Score", score_x + (score_width - display.measure_text("Score", scale=1)) // 2, y_position, scale=1)
 
                 y_position += 30  # Space between headers and the first match
 
@@ -221,73 +274,35 @@ async def fetch_and_display_fixtures(positions):
 
                     # Display fixture time in local time
                     display.set_pen(BLACK)
-                    display.text(fixture_time_local, 10, y_position, scale=2)
-
-                    # Load and draw the home team crest with adjusted y-position
-                    home_crest_filename = f"/sd/{home_team_id}.png"
-                    try:
-                        with open(home_crest_filename, 'rb'):
-                            png.open_file(home_crest_filename)
-                            png.decode(70, y_position - 3)  # Adjusted x-position and y-position
-                    except OSError:
-                        print(f"Home crest file not found: {home_crest_filename}")
-                    except Exception as e:
-                        print(f"Error loading home crest {home_crest_filename}: {e}")
-
-                    # Display home team name with adjusted x-position and increased length
-                    display.set_pen(BLACK)
-                    team_name_x = 95  # Reduced space between time and home team name
-                    display.text(f"{home_team[:17]}", team_name_x, y_position, scale=2)  # Increased length to 17 characters
+                    layout.cell(display, row, 'time', fixture_time_local, y_position)
 
-                    # Display league position as a smaller superscript in red
-                    if home_team_id in positions:
-                        league_position = str(positions[home_team_id])
-                        display.set_pen(RED)
-                        superscript_x = team_name_x + display.measure_text(home_team[:17], scale=2) + 3  # Offset for superscript
-                        display.text(league_position, superscript_x, y_position - 3, scale=1)  # Smaller scale and adjusted y
+                    # Home crest and name, the score, then the away crest and name
+                    draw_crest(row, 'home_crest', home_team_id, y_position)
+                    draw_team_name(row, 'home', home_team, home_team_id, positions, y_position)
 
-                    # Display the score centered under "Score" header
-                    score_display = f"{home_score} - {away_score}" if status != 'NS' else "vs"
-                    score_width = display.measure_text(score_display, scale=2)
-                    score_x = 290 + (display.measure_text("Score", scale=1) - score_width) // 2  # Center score under "Score" header
-                    display.text(score_display, score_x, y_position, scale=2)
-
-                    # Load and draw the away team crest with adjusted y-position
-                    away_crest_filename = f"/sd/{away_team_id}.png"
-                    try:
-                        with open(away_crest_filename, 'rb'):
-                            png.open_file(away_crest_filename)
-                            png.decode(330, y_position - 3)  # Adjusted x-position (moved right by 10 pixels)
-                    except OSError:
-                        print(f"Away crest file not found: {away_crest_filename}")
-                    except Exception as e:
-                        print(f"Error loading away crest {away_crest_filename}: {e}")
-
-                    # Display away team name with adjusted x-position and increased length
                     display.set_pen(BLACK)
-                    team_name_x = 355  # Moved right by 10 pixels
-                    display.text(f"{away_team[:17]}", team_name_x, y_position, scale=2)  # Increased length to 17 characters
+                    score_display = f"{home_score} - {away_score}" if status != 'NS' else "vs"
+                    layout.cell(display, row, 'score', score_display, y_position)
 
-                    # Display league position as a smaller superscript in red for away team
-                    if away_team_id in positions:
-                        league_position = str(positions[away_team_id])
-                        display.set_pen(RED)
-                        superscript_x = team_name_x + display.measure_text(away_team[:17], scale=2) + 5  # Offset for superscript
-                        display.text(league_position, superscript_x, y_position - 5, scale=1)  # Smaller scale and adjusted y
+                    draw_crest(row, 'away_crest', away_team_id, y_position)
+                    draw_team_name(row, 'away', away_team, away_team_id, positions, y_position)
 
                     # Fetch and display match details like goal scorers and cards
-                    details = await fetch_fixture_events(fixture_id)
-                    detail_x_offset = 515  # Adjusted x-position for details (moved right by 5 pixels)
-                    wrapped_lines = wrap_text("; ".join(details), 63)  # Wrap at 63 characters
-
-                    # Calculate vertical offset for centering the wrapped lines
-                    total_lines = len(wrapped_lines)
-                    vertical_offset = ((total_lines - 1) * 10) // 2  # Adjusted for reduced line spacing
-
-                    # Display each wrapped line, nudging them up by 5 pixels
-                    for i, line in enumerate(wrapped_lines):
-                        display.set_pen(BLACK)
-                        display.text(line, detail_x_offset, y_position - vertical_offset + (i * 10) - 5, scale=1)  # Reduced line spacing
+                    # (the details column is left out on panels too narrow for it)
+                    total_lines = 1
+                    if 'details' in row:
+                        details = await fetch_fixture_events(fixture_id)
+                        detail_x_offset, _, detail_chars, detail_scale, _ = row['details']
+                        wrapped_lines = wrap_text("; ".join(details), detail_chars)
+
+                        # Calculate vertical offset for centering the wrapped lines
+                        total_lines = max(1, len(wrapped_lines))
+                        vertical_offset = ((total_lines - 1) * 10) // 2  # Adjusted for reduced line spacing
+
+                        # Display each wrapped line, nudging them up by 5 pixels
+                        for i, line in enumerate(wrapped_lines):
+                            display.set_pen(BLACK)
+                            display.text(line, detail_x_offset, y_position - vertical_offset + (i * 10) - 5, scale=detail_scale)
 
                     # Adjust y_position for the next fixture, considering the number of wrapped lines
                     y_position += line_height + (total_lines - 1) * 10  # Adjusted for reduced line spacing
@@ -300,13 +315,19 @@ async def fetch_and_display_fixtures(positions):
         response.close()
 
     # Update the display after drawing everything
-    display.update()
+    with perf.span("update"):
+        display.update()
 
 # Main function to run all tasks
 async def main():
-    await connect_wifi()  # Connect to Wi-Fi
+    if not await connect_wifi():  # Connect to Wi-Fi
+        print("No Wi-Fi, leaving the last page on the panel")
+        return
+    api_client.start_refresh()  # Requests give up past the deadline and the page says so
     positions = await fetch_standings()  # Fetch the league standings
     await fetch_and_display_fixtures(positions)  # Fetch and display fixtures with league positions
+    api_client.close()  # Done with the API for this refresh, drop the TLS session
+    perf.write("fixtures")  # Log where this refresh's time and memory went
 
 # Run the main function
 asyncio.run(main())
@@ -0,0 +1,124 @@
+import gc
+import perf
+import api_client
+
+# Memory manager for a refresh: preallocates the receive buffers once at boot so the
+# fetch -> parse -> PNG decode cycle doesn't keep carving up the heap, watches
+# gc.mem_free() at checkpoints and degrades in steps instead of dying with a MemoryError:
+#
+#   FULL            everything
+#   NO_EVENTS       skip goal/card event requests
+#   NO_CRESTS       ...and skip crest PNG decoding
+#   HALF_FIXTURES   ...and show half as many fixtures
+#
+# The level only ever goes up during a refresh, call reset() to start the next one.
+
+RECV_BUFFER_SIZE = 24 * 1024  # Fits a 20 team standings response, bigger ones get a one-off buffer
+LINE_BUFFER_SIZE = 1024  # Status line/header read-ahead
+
+FULL = 0
+NO_EVENTS = 1
+NO_CRESTS = 2
+HALF_FIXTURES = 3
+LEVEL_NAMES = ("full", "no events", "no crests", "half fixtures")
+
+# Free heap (after a collect) below which each level kicks in
+THRESHOLDS = (
+    (HALF_FIXTURES, 16 * 1024),
+    (NO_CRESTS, 24 * 1024),
+    (NO_EVENTS, 40 * 1024),
+)
+
+level = FULL
+_low_water = None
+_memory_errors = 0
+
+
+# Allocate the fixed buffers while the heap is still in one piece (call first thing at boot)
+def init():
+    gc.collect()
+    api_client.use_buffers(bytearray(RECV_BUFFER_SIZE), bytearray(LINE_BUFFER_SIZE))
+    reset()
+
+
+def reset():
+    global level, _low_water, _memory_errors
+    level = FULL
+    _low_water = None
+    _memory_errors = 0
+    checkpoint()
+
+
+# Collect, note the low-water mark and step the degradation level down if we're short
+def checkpoint():
+    global level, _low_water
+    gc.collect()
+    try:
+        free = gc.mem_free()
+    except AttributeError:  # CPython (host tools), memory is never short there
+        return level
+    if _low_water is None or free < _low_water:
+        _low_water = free
+    for step, min_free in THRESHOLDS:
+        if free < min_free:
+            if step > level:
+                print(f"Low memory ({free} bytes free), degrading to: {LEVEL_NAMES[step]}")
+                level = step
+            break
+    return level
+
+
+# Called when a MemoryError was caught: free what we can and drop a level
+def on_memory_error(where):
+    global level, _memory_errors
+    _memory_errors += 1
+    level = min(level + 1, HALF_FIXTURES)
+    print(f"MemoryError in {where}, degrading to: {LEVEL_NAMES[level]}")
+    gc.collect()
+
+
+def events_allowed():
+    return checkpoint() < NO_EVENTS
+
+
+def crests_allowed():
+    return checkpoint() < NO_CRESTS
+
+
+def fixture_limit(count):
+    return count // 2 if checkpoint() >= HALF_FIXTURES else count
+
+
+# Biggest single allocation the heap can still satisfy, the gap to mem_free() is fragmentation
+def largest_block(free):
+    size = free
+    while size > 256:
+        try:
+            probe = bytearray(size)
+            del probe
+            return size
+        except MemoryError:
+            size = size * 3 // 4
+    return 0
+
+
+# Peak usage and fragmentation for this refresh, also added to the perf record
+def stats():
+    gc.collect()
+    try:
+        free = gc.mem_free()
+        total = free + gc.mem_alloc()
+    except AttributeError:
+        return {}
+    largest = largest_block(free)
+    result = {
+        "level": level,
+        "low": _low_water,
+        "peak": total - (_low_water if _low_water is not None else free),
+        "free": free,
+        "largest": largest,
+        "frag": round(100 - 100 * largest / free) if free else 0,  # % of free heap not usable in one block
+        "errors": _memory_errors,
+    }
+    perf.note("mem", result)
+    return result
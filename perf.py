@@ -0,0 +1,107 @@
+import time
+import gc
+import json
+
+# Where the per-refresh records are appended (one JSON object per line)
+PERF_LOG = "/sd/perf.log"
+PERF_LOG_MAX_BYTES = 64 * 1024  # Rotate to perf.log.1 once the log grows past this
+
+# MicroPython has ticks_ms/mem_free, fall back to something sensible when run on a host
+try:
+    ticks_ms = time.ticks_ms
+    ticks_diff = time.ticks_diff
+except AttributeError:
+    def ticks_ms():
+        return int(time.time() * 1000)
+
+    def ticks_diff(end, start):
+        return end - start
+
+try:
+    mem_free = gc.mem_free
+except AttributeError:
+    def mem_free():
+        return 0
+
+# Phase name -> [total ms, total bytes consumed, number of spans]
+_phases = {}
+_notes = {}  # Anything else worth keeping with the record, e.g. memory stats
+_start_ticks = ticks_ms()
+_low_water = mem_free()
+
+
+# Context manager timing one phase of a refresh, e.g. `with perf.span("wifi"):`
+# Repeated spans with the same name (one per crest, one per request...) are summed
+class span:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.free_before = mem_free()
+        self.start = ticks_ms()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _low_water
+        elapsed = ticks_diff(ticks_ms(), self.start)
+        free_after = mem_free()
+        if free_after < _low_water:
+            _low_water = free_after
+        phase = _phases.get(self.name)
+        if phase is None:
+            phase = _phases[self.name] = [0, 0, 0]
+        phase[0] += elapsed
+        phase[1] += self.free_before - free_after
+        phase[2] += 1
+        return False  # Never swallow exceptions
+
+
+# Start a fresh refresh record (only needed if one process does several refreshes)
+def reset():
+    global _start_ticks, _low_water
+    _phases.clear()
+    _notes.clear()
+    _start_ticks = ticks_ms()
+    _low_water = mem_free()
+
+
+# Attach an extra value to the current refresh record
+def note(name, value):
+    _notes[name] = value
+
+
+# Build the compact record for the current refresh
+def record(screen):
+    rec = {
+        "s": screen,
+        "t": time.time(),
+        "ms": ticks_diff(ticks_ms(), _start_ticks),
+        "low": _low_water,
+        "p": _phases,
+    }
+    if _notes:
+        rec["x"] = _notes
+    return rec
+
+
+# Append the current refresh record to the SD card log, never letting logging break a refresh
+def write(screen, path=PERF_LOG):
+    rec = record(screen)
+    print("Perf:", rec)
+    try:
+        try:
+            import os
+            if os.stat(path)[6] > PERF_LOG_MAX_BYTES:
+                try:
+                    os.remove(path + ".1")
+                except OSError:
+                    pass
+                os.rename(path, path + ".1")
+        except OSError:
+            pass  # No log yet
+        with open(path, "a") as f:
+            f.write(json.dumps(rec))
+            f.write("\n")
+    except OSError as e:
+        print(f"Failed to write perf log {path}: {e}")
+    reset()
@@ -0,0 +1,112 @@
+import time
+import json
+
+# Player leaderboards for the top scorers and discipline pages.
+#
+# The league's players/topscorers, topyellowcards and topredcards only change when
+# matches are played, so they're fetched at most once a day (STATS_TTL) and kept on
+# the SD card. Between those fetches, goals and cards from the fixtures footy_data
+# already has events for (live and finished) are added on top, so the tables keep up
+# with the matchday without spending any requests. Fixtures that had finished when
+# the leaderboards were fetched are already in them and aren't added twice; the rest
+# are counted until the next daily fetch takes them in.
+#
+# Only players already on the fetched leaderboards are updated. Those are the top 20
+# of each and the pages show 10, so nobody outside them can score their way in
+# between fetches.
+
+STATS_FILE = "/sd/footy_players.json"
+STATS_TTL = 24 * 60 * 60  # Refetch the leaderboards once a day
+SNAPSHOT_PLAYERS = 20  # Players kept from each leaderboard (the API sends 20)
+MAX_PLAYERS = 10  # Rows on each page
+
+RED_POINTS = 3  # Discipline order: a yellow is 1 point, a red (or second yellow) this many
+
+
+def load(path=STATS_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save(stats, path=STATS_FILE):
+    try:
+        with open(path, 'w') as f:
+            json.dump(stats, f)
+    except OSError as e:
+        print(f"Failed to write player stats {path}: {e}")
+
+
+def is_stale(stats):
+    return stats is None or time.time() - stats.get('fetched', 0) > STATS_TTL
+
+
+# Freshly fetched leaderboards, which already count the fixtures in `counted` (ids of
+# the ones that had finished when they were fetched)
+def snapshot(scorers, cards, counted):
+    return {
+        'fetched': time.time(),
+        'scorers': scorers[:SNAPSHOT_PLAYERS],
+        'cards': cards,
+        'counted': counted,
+        'seen': {},  # Fixture id -> its goals and cards as [kind, player, team id], kind G, Y or R
+    }
+
+
+# One fixture's goals and cards as they'd show up in the player stats. Own goals and
+# missed penalties don't count as the player's goals.
+def tally(events):
+    found = []
+    for event in events:
+        detail = event['detail']
+        if event['type'] == 'Goal':
+            if detail in ('Own Goal', 'Missed Penalty'):
+                continue
+            kind = 'G'
+        elif event['type'] == 'Card':
+            kind = 'Y' if detail == 'Yellow Card' else 'R'
+        else:
+            continue
+        found.append([kind, event['player'], event['team_id']])
+    return found
+
+
+# Record the goals and cards of every fixture the leaderboards don't count yet. A
+# fixture's events come back whole on every fetch, so its entry is just replaced.
+def note_events(stats, fixtures):
+    counted = stats['counted']
+    for fixture in fixtures:
+        if fixture['events'] and fixture['id'] not in counted:
+            stats['seen'][str(fixture['id'])] = tally(fixture['events'])
+
+
+def _find(players, name, team_id):
+    for player in players:
+        if player['name'] == name and player['team_id'] == team_id:
+            return player
+    return None
+
+
+def discipline_points(player):
+    return player['yellow'] + RED_POINTS * player['red']
+
+
+# The leaderboards with the noted events added on, sorted and cut to MAX_PLAYERS
+def leaderboards(stats):
+    scorers = [dict(player) for player in stats['scorers']]
+    cards = [dict(player) for player in stats['cards']]
+    for events in stats['seen'].values():
+        for kind, name, team_id in events:
+            if kind == 'G':
+                player = _find(scorers, name, team_id)
+                if player is not None:
+                    player['goals'] += 1
+            else:
+                player = _find(cards, name, team_id)
+                if player is not None:
+                    player['yellow' if kind == 'Y' else 'red'] += 1
+    scorers.sort(key=lambda player: (-player['goals'], -player['assists']))
+    cards.sort(key=lambda player: (-discipline_points(player), -player['red']))
+    return scorers[:MAX_PLAYERS], cards[:MAX_PLAYERS]
@@ -0,0 +1,306 @@
+import os
+import struct
+
+# Append-only archive of finished results on the SD card, so history (form, head to
+# head...) can be looked up locally instead of spending API calls on it.
+#
+#   results.log   every finished fixture, appended once, never rewritten
+#   team.idx      sorted (team id, kick off, log offset) entries, two per fixture
+#   date.idx      sorted (kick off, log offset) entries
+#   pair.idx      sorted (lower team id, higher team id, kick off, log offset) entries,
+#                 so a head to head is one contiguous range
+#   *.new         small unsorted tails of the indexes, merged in every MERGE_AT adds
+#
+# Index lookups are binary searches over fixed size entries (O(log n) seeks) plus a
+# scan of the tail, which never holds more than MERGE_AT entries.
+
+ARCHIVE_DIR = "/sd/results"
+MERGE_AT = 64  # Entries an index tail may hold before it is merged into the sorted index
+
+# Record: length, fixture id, kick off, home id, away id, league, season,
+# home goals, away goals, status, number of events
+RECORD_HEADER = "<HIIIIHHBBBB"
+RECORD_HEADER_SIZE = struct.calcsize(RECORD_HEADER)
+# Event: type, minute, side (0 home, 1 away), length of the player name that follows
+EVENT_HEADER = "<BBBB"
+EVENT_HEADER_SIZE = struct.calcsize(EVENT_HEADER)
+MAX_NAME_CHARS = 24  # Player names are cut to this many characters
+
+TEAM_ENTRY = "<III"  # team id, kick off, offset
+DATE_ENTRY = "<II"  # kick off, offset
+PAIR_ENTRY = "<IIII"  # lower team id, higher team id, kick off, offset
+
+STATUSES = ('FT', 'AET', 'PEN')
+# (type, detail) pairs as api-football names them, in code order
+EVENT_KINDS = (
+    ('Goal', 'Normal Goal'),
+    ('Goal', 'Own Goal'),
+    ('Goal', 'Penalty'),
+    ('Goal', 'Missed Penalty'),
+    ('Card', 'Yellow Card'),
+    ('Card', 'Red Card'),
+    ('Card', 'Second Yellow card'),
+)
+
+
+def _event_code(event):
+    for code, (kind, detail) in enumerate(EVENT_KINDS):
+        if event['type'] == kind and event['detail'] == detail:
+            return code
+    return 0 if event['type'] == 'Goal' else 5  # Anything new: count goals as goals, cards as red
+
+
+def encode_record(fixture, events, league_id, season):
+    parts = []
+    for event in events:
+        if event['type'] not in ('Goal', 'Card'):
+            continue
+        name = (event['player'] or '')[:MAX_NAME_CHARS].encode()
+        side = 0 if event['team_id'] == fixture['home_id'] else 1
+        minute = min(event['minute'] or 0, 255)
+        parts.append(struct.pack(EVENT_HEADER, _event_code(event), minute, side, len(name)) + name)
+    body = b"".join(parts)
+    header = struct.pack(
+        RECORD_HEADER, RECORD_HEADER_SIZE + len(body), fixture['id'], fixture['timestamp'],
+        fixture['home_id'], fixture['away_id'], league_id, season,
+        fixture['home_score'] or 0, fixture['away_score'] or 0,
+        STATUSES.index(fixture['status']) if fixture['status'] in STATUSES else 0, len(parts))
+    return header + body
+
+
+def decode_record(data, with_events=True):
+    (_, fixture_id, timestamp, home_id, away_id, league_id, season,
+     home_score, away_score, status, event_count) = struct.unpack_from(RECORD_HEADER, data, 0)
+    record = {
+        'id': fixture_id, 'timestamp': timestamp, 'home_id': home_id, 'away_id': away_id,
+        'league': league_id, 'season': season, 'home_score': home_score, 'away_score': away_score,
+        'status': STATUSES[status],
+    }
+    if with_events:
+        events = []
+        pos = RECORD_HEADER_SIZE
+        for _ in range(event_count):
+            code, minute, side, name_len = struct.unpack_from(EVENT_HEADER, data, pos)
+            pos += EVENT_HEADER_SIZE
+            kind, detail = EVENT_KINDS[code]
+            events.append({
+                'type': kind, 'detail': detail, 'minute': minute,
+                'team_id': away_id if side else home_id,
+                'player': str(data[pos:pos + name_len], 'utf-8'),
+            })
+            pos += name_len
+        record['events'] = events
+    return record
+
+
+def _exists(path):
+    try:
+        os.stat(path)
+        return True
+    except OSError:
+        return False
+
+
+# A sorted index file of fixed size entries plus its small unsorted tail
+class _Index:
+    def __init__(self, path, entry_format):
+        self.path = path
+        self.tail_path = path[:-4] + ".new"
+        self.format = entry_format
+        self.size = struct.calcsize(entry_format)
+        self.buf = bytearray(self.size)
+        self.tail = []
+        try:
+            with open(self.tail_path, "rb") as f:
+                data = f.read()
+            for pos in range(0, len(data) - self.size + 1, self.size):
+                self.tail.append(struct.unpack_from(entry_format, data, pos))
+        except OSError:
+            pass
+
+    def count(self):
+        try:
+            return os.stat(self.path)[6] // self.size
+        except OSError:
+            return 0
+
+    def add(self, entry):
+        with open(self.tail_path, "ab") as f:
+            f.write(struct.pack(self.format, *entry))
+        self.tail.append(entry)
+        if len(self.tail) >= MERGE_AT:
+            self.merge()
+
+    # Stream the sorted index and the sorted tail into a new sorted index
+    def merge(self):
+        if not self.tail:
+            return
+        pending = sorted(self.tail)
+        tmp_path = self.path + ".tmp"
+        i = 0
+        with open(tmp_path, "wb") as out:
+            if _exists(self.path):
+                with open(self.path, "rb") as f:
+                    while f.readinto(self.buf) == self.size:
+                        entry = struct.unpack(self.format, self.buf)
+                        while i < len(pending) and pending[i] < entry:
+                            out.write(struct.pack(self.format, *pending[i]))
+                            i += 1
+                        out.write(self.buf)
+            for entry in pending[i:]:
+                out.write(struct.pack(self.format, *entry))
+        if _exists(self.path):
+            os.remove(self.path)
+        os.rename(tmp_path, self.path)
+        os.remove(self.tail_path)
+        self.tail = []
+
+    def _entry(self, f, i):
+        f.seek(i * self.size)
+        f.readinto(self.buf)
+        return struct.unpack(self.format, self.buf)
+
+    # Every entry with low <= entry <= high (tuples compared field by field), in order
+    def range(self, low, high):
+        found = []
+        n = self.count()
+        if n:
+            with open(self.path, "rb") as f:
+                lo, hi = 0, n
+                while lo < hi:  # First entry >= low
+                    mid = (lo + hi) // 2
+                    if self._entry(f, mid) < low:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                while lo < n:
+                    entry = self._entry(f, lo)
+                    if entry > high:
+                        break
+                    found.append(entry)
+                    lo += 1
+        found += [entry for entry in self.tail if low <= entry <= high]
+        if self.tail:
+            found.sort()
+        return found
+
+
+class ResultsArchive:
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+        if not _exists(root):
+            os.mkdir(root)
+        self.log_path = root + "/results.log"
+        self.team_index = _Index(root + "/team.idx", TEAM_ENTRY)
+        self.date_index = _Index(root + "/date.idx", DATE_ENTRY)
+        self.pair_index = _Index(root + "/pair.idx", PAIR_ENTRY)
+        # Archives written before the pair index existed get it built on first open
+        if not self.pair_index.count() and not self.pair_index.tail and self.count():
+            self.rebuild()
+
+    def read(self, offset, with_events=True):
+        return self.read_many([offset], with_events)[0]
+
+    # Several records through one open file, only reading the fixed header unless events are wanted
+    def read_many(self, offsets, with_events=False):
+        records = []
+        with open(self.log_path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                header = f.read(RECORD_HEADER_SIZE)
+                if with_events:
+                    length = struct.unpack_from("<H", header, 0)[0]
+                    header += f.read(length - RECORD_HEADER_SIZE)
+                records.append(decode_record(header, with_events))
+        return records
+
+    def _index(self, record, offset):
+        home_id, away_id, timestamp = record['home_id'], record['away_id'], record['timestamp']
+        self.date_index.add((timestamp, offset))
+        self.team_index.add((home_id, timestamp, offset))
+        self.team_index.add((away_id, timestamp, offset))
+        self.pair_index.add((min(home_id, away_id), max(home_id, away_id), timestamp, offset))
+
+    def contains(self, fixture_id, timestamp):
+        for _, offset in self.date_index.range((timestamp, 0), (timestamp, 0xFFFFFFFF)):
+            if self.read(offset, False)['id'] == fixture_id:
+                return True
+        return False
+
+    # Archive a finished fixture (footy_data's compact form) with its goal/card events.
+    # Returns False if it isn't finished or is already archived.
+    def add(self, fixture, events, league_id, season):
+        if fixture['status'] not in STATUSES or self.contains(fixture['id'], fixture['timestamp']):
+            return False
+        record = encode_record(fixture, events, league_id, season)
+        with open(self.log_path, "ab") as f:
+            f.seek(0, 2)  # MicroPython's append mode doesn't report the end position until we seek
+            offset = f.tell()
+            f.write(record)
+        self._index(fixture, offset)
+        return True
+
+    # A team's results between two kick off timestamps, oldest first (newest `limit` if given)
+    def team_results(self, team_id, since=0, until=0xFFFFFFFF, limit=None, with_events=False):
+        entries = self.team_index.range((team_id, since, 0), (team_id, until, 0xFFFFFFFF))
+        if limit is not None:
+            entries = entries[-limit:] if limit else []
+        return self.read_many([entry[-1] for entry in entries], with_events)
+
+    # Meetings between two teams (either way round), oldest first (newest `limit` if given)
+    def head_to_head(self, team_a, team_b, limit=None, with_events=False):
+        low, high = min(team_a, team_b), max(team_a, team_b)
+        entries = self.pair_index.range((low, high, 0, 0), (low, high, 0xFFFFFFFF, 0xFFFFFFFF))
+        if limit is not None:
+            entries = entries[-limit:] if limit else []
+        return self.read_many([entry[-1] for entry in entries], with_events)
+
+    # Every result between two kick off timestamps, oldest first
+    def between(self, since, until, with_events=False):
+        entries = self.date_index.range((since, 0), (until, 0xFFFFFFFF))
+        return self.read_many([offset for _, offset in entries], with_events)
+
+    # Results on a YYYY-MM-DD date (UTC)
+    def on_date(self, date_str, with_events=True):
+        year, month, day = map(int, date_str.split('-'))
+        start = days_from_civil(year, month, day) * 86400
+        return self.between(start, start + 86399, with_events)
+
+    def count(self):
+        return self.date_index.count() + len(self.date_index.tail)
+
+    # Merge the index tails now (e.g. before copying the card off for analysis)
+    def flush(self):
+        self.team_index.merge()
+        self.date_index.merge()
+        self.pair_index.merge()
+
+    # Rebuild the indexes from the log, if a power cut left them behind it
+    def rebuild(self):
+        for index in (self.team_index, self.date_index, self.pair_index):
+            for path in (index.path, index.tail_path):
+                if _exists(path):
+                    os.remove(path)
+            index.tail = []
+        offset = 0
+        if not _exists(self.log_path):
+            return
+        with open(self.log_path, "rb") as f:
+            while True:
+                header = f.read(RECORD_HEADER_SIZE)
+                if len(header) < RECORD_HEADER_SIZE:
+                    break
+                self._index(decode_record(header, False), offset)
+                offset += struct.unpack_from("<H", header, 0)[0]
+                f.seek(offset)
+        self.flush()
+
+
+# Days since 1970-01-01 for a calendar date, independent of the RTC and time zone
+def days_from_civil(year, month, day):
+    year -= month <= 2
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
@@ -0,0 +1,170 @@
+import sys
+import time
+import json
+import os
+from results_archive import days_from_civil
+
+# Keeps the RTC (UTC) right without an NTP round trip on every wake. The first API
+# response of a wake already carries the server's time in its Date header, so that
+# sets the clock for free. Between those, the RTC's drift rate is learnt from how far
+# off it was each time and persisted, and an NTP sync is only done when the estimated
+# error has grown past MAX_ERROR_SECONDS, or the RTC lost its time (power cycle).
+#
+# Everything goes through a clock object (now/set/ntp) so tools/sim_time_sync.py can
+# run it against a simulated drifting RTC.
+
+STATE_FILE = "time_state.json"  # On the SD card if it's mounted, else in flash
+MAX_ERROR_SECONDS = 30  # Estimated error that triggers an NTP sync
+MIN_CORRECTION_SECONDS = 2  # Smaller offsets than this are left alone (Date has 1 s resolution)
+DEFAULT_DRIFT_PPM = 50  # Assumed until a rate has been measured, a typical crystal
+MIN_DRIFT_PPM = 5  # Never trust a learnt rate below this, the measurements are only to the second
+MIN_RATE_INTERVAL = 12 * 3600  # Seconds between two readings before they say much about the rate
+RATE_SMOOTHING = 0.3  # Weight of a new drift rate measurement
+VALID_AFTER = 1704067200  # 2024-01-01, anything earlier means the RTC was reset
+
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# Seconds from 1970 to this port's time.time() epoch (2000 on older MicroPython builds)
+EPOCH_OFFSET = days_from_civil(*time.gmtime(0)[:3]) * 86400
+
+
+# The board's RTC, in Unix seconds (UTC)
+class RTCClock:
+    def now(self):
+        return int(time.time()) + EPOCH_OFFSET
+
+    def set(self, unix_time):
+        import machine
+        t = time.gmtime(int(unix_time) - EPOCH_OFFSET)
+        machine.RTC().datetime((t[0], t[1], t[2], t[6], t[3], t[4], t[5], 0))
+        try:
+            import inky_frame
+            inky_frame.pico_rtc_to_pcf()  # The PCF85063A is what keeps time through deep sleep
+        except (ImportError, AttributeError):
+            pass
+
+    def ntp(self):
+        import ntptime
+        return int(ntptime.time()) + EPOCH_OFFSET
+
+
+# Host tools talk to the same api_client, but the host's clock is not ours to set
+clock = RTCClock() if sys.implementation.name == "micropython" else None
+_state = None
+_observed = False  # One Date header per wake is plenty
+
+
+def _state_path():
+    try:
+        os.stat("/sd")
+        return "/sd/" + STATE_FILE
+    except OSError:
+        return "/" + STATE_FILE
+
+
+def load_state():
+    global _state
+    if _state is None:
+        try:
+            with open(_state_path()) as f:
+                _state = json.load(f)
+        except (OSError, ValueError):
+            _state = {}
+    return _state
+
+
+def save_state():
+    try:
+        with open(_state_path(), 'w') as f:
+            json.dump(_state, f)
+    except OSError as e:
+        print(f"Failed to save time state: {e}")
+
+
+# Start a new wake (only needed if one process does several, like the simulation)
+def reset():
+    global _observed
+    _observed = False
+
+
+def rtc_valid():
+    return clock.now() >= VALID_AFTER
+
+
+# Seconds the RTC may be off by now: what was left after the last check, plus the
+# drift since then at the learnt rate. Timestamps stay ints, the Pico's floats are
+# single precision and can't hold a Unix time to the second.
+def estimated_error():
+    state = load_state()
+    if not rtc_valid() or 'checked' not in state:
+        return None  # Unknown
+    ppm = state.get('ppm')
+    ppm = max(abs(ppm), MIN_DRIFT_PPM) if ppm is not None else DEFAULT_DRIFT_PPM
+    return state.get('residual', 0) + 1 + max(0, clock.now() - state['checked']) * ppm / 1e6
+
+
+def needs_ntp():
+    error = estimated_error()
+    return error is None or error > MAX_ERROR_SECONDS
+
+
+# Compare the RTC with a trusted time (int Unix seconds) and correct it, learning the
+# drift rate on the way. 'synced' is when the RTC was last set, so the offset since
+# then is all drift; the rate is only measured when a correction is due, as smaller
+# offsets are mostly the Date header's rounding.
+def _correct(true_time, source):
+    state = load_state()
+    now = clock.now()
+    offset = true_time - now
+    synced = state.get('synced')
+    valid = rtc_valid()
+    if abs(offset) >= MIN_CORRECTION_SECONDS or not valid or synced is None:
+        if valid and synced is not None and now - synced >= MIN_RATE_INTERVAL:
+            measured = offset * 1e6 / (now - synced)
+            ppm = state.get('ppm')
+            state['ppm'] = measured if ppm is None else ppm + (measured - ppm) * RATE_SMOOTHING
+        print(f"Setting RTC from {source}, it was {offset:+d} s off")
+        clock.set(true_time)
+        state['synced'] = true_time
+        state['residual'] = 0
+    else:
+        state['residual'] = abs(offset)
+    state['checked'] = true_time
+    state['offset'] = offset
+    state['source'] = source
+    save_state()
+
+
+# "Sun, 19 Oct 2026 01:28:05 GMT" -> Unix seconds, None if it doesn't parse
+def parse_http_date(value):
+    try:
+        _, day, month, year, clock_time, _ = value.split()
+        hour, minute, second = map(int, clock_time.split(':'))
+        days = days_from_civil(int(year), MONTHS.index(month) + 1, int(day))
+        return days * 86400 + hour * 3600 + minute * 60 + second
+    except (ValueError, AttributeError):
+        return None
+
+
+# Feed in a response's Date header (api_client does this for every response)
+def observe(date_header):
+    global _observed
+    if clock is None or _observed or not date_header:
+        return
+    server_time = parse_http_date(date_header)
+    if server_time is None:
+        return
+    _observed = True
+    _correct(server_time, "date")
+
+
+# Call once online: NTP only if the RTC is unset or has probably drifted too far
+def sync_if_needed():
+    if clock is None or not needs_ntp():
+        return False
+    try:
+        _correct(clock.ntp(), "ntp")
+        return True
+    except (OSError, ImportError) as e:
+        print(f"NTP sync failed: {e}")
+        return False
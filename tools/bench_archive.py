@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# Host-side benchmark for results_archive.py with a synthetic multi-season dataset
+#
+#   python3 tools/bench_archive.py [--seasons 5] [--leagues 3] [--teams 20]
+#
+# Builds every league's double round robin for each season, appends it to a fresh
+# archive in a temp dir, then times indexed lookups against a full scan of the log
+# and checks both give the same answers.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import form_guide  # noqa: E402
+import results_archive  # noqa: E402
+
+FIRST_NAMES = ["Alex", "Ben", "Chris", "Dani", "Eddie", "Femi", "Gabriel", "Heung-min", "Ivan", "Jamal"]
+LAST_NAMES = ["Smith", "Silva", "Müller", "Ødegaard", "Van Dijk", "Fernandes", "Saka", "Son", "Toney", "Watkins"]
+
+
+def synthetic_season(rng, league_id, season, teams, start_ts, next_id):
+    team_ids = [league_id * 1000 + i for i in range(teams)]
+    fixtures = []
+    rounds = []
+    # Circle method round robin, then the reverse fixtures
+    ids = team_ids[:]
+    for _ in range(teams - 1):
+        rounds.append([(ids[i], ids[teams - 1 - i]) for i in range(teams // 2)])
+        ids = [ids[0]] + [ids[-1]] + ids[1:-1]
+    rounds += [[(away, home) for home, away in r] for r in rounds]
+    for round_no, matches in enumerate(rounds):
+        for n, (home, away) in enumerate(matches):
+            ts = start_ts + round_no * 7 * 86400 + (n % 4) * 3 * 3600
+            home_goals, away_goals = rng.randint(0, 4), rng.randint(0, 3)
+            events = []
+            for side, goals in ((home, home_goals), (away, away_goals)):
+                for _ in range(goals):
+                    events.append({'type': 'Goal', 'detail': rng.choice(['Normal Goal', 'Penalty', 'Own Goal']),
+                                   'player': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                                   'team_id': side, 'minute': rng.randint(1, 95)})
+            for _ in range(rng.randint(0, 5)):
+                events.append({'type': 'Card', 'detail': rng.choice(['Yellow Card', 'Yellow Card', 'Red Card']),
+                               'player': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                               'team_id': rng.choice((home, away)), 'minute': rng.randint(1, 95)})
+            fixtures.append(({'id': next_id + len(fixtures), 'timestamp': ts, 'status': 'FT',
+                              'home_id': home, 'away_id': away, 'home_score': home_goals, 'away_score': away_goals},
+                             events, league_id, season))
+    return fixtures
+
+
+def scan(archive, predicate):
+    # What a lookup costs without the indexes: read every record in the log
+    found = []
+    offset = 0
+    size = os.path.getsize(archive.log_path)
+    while offset < size:
+        record = archive.read(offset, False)
+        if predicate(record):
+            found.append(record['id'])
+        with open(archive.log_path, "rb") as f:
+            f.seek(offset)
+            offset += int.from_bytes(f.read(2), "little")
+    return found
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the on-SD results archive")
+    parser.add_argument("--seasons", type=int, default=5)
+    parser.add_argument("--leagues", type=int, default=3)
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    fixtures = []
+    for season in range(2020, 2020 + args.seasons):
+        season_start = int(time.mktime((season, 8, 10, 15, 0, 0, 0, 0, 0)))
+        for league in range(1, args.leagues + 1):
+            fixtures += synthetic_season(rng, 39 + league, season, args.teams, season_start, 100000 + len(fixtures))
+    fixtures.sort(key=lambda f: f[0]['timestamp'])
+
+    with tempfile.TemporaryDirectory() as root:
+        archive = results_archive.ResultsArchive(root)
+        start = time.perf_counter()
+        for fixture, events, league, season in fixtures:
+            archive.add(fixture, events, league, season)
+        append_ms = (time.perf_counter() - start) * 1000
+        # Adding the same results again must be a no-op
+        duplicates = sum(archive.add(*f) for f in fixtures[-50:])
+
+        sizes = {name: os.path.getsize(os.path.join(root, name)) for name in sorted(os.listdir(root))}
+        print(f"{len(fixtures)} results ({args.seasons} seasons x {args.leagues} leagues x {args.teams} teams)")
+        print(f"append: {append_ms:.0f} ms total, {append_ms / len(fixtures):.2f} ms per result, "
+              f"{duplicates} duplicates re-added")
+        for name, size in sizes.items():
+            print(f"  {name:<12}{size:>10} bytes")
+
+        team = fixtures[0][0]['home_id']
+        rival = fixtures[0][0]['away_id']
+        last_season = fixtures[-1][3]
+        day = time.strftime("%Y-%m-%d", time.gmtime(fixtures[len(fixtures) // 2][0]['timestamp']))
+        day_start = results_archive.days_from_civil(*map(int, day.split("-"))) * 86400
+
+        checks = [
+            ("team last 5",
+             lambda: [r['id'] for r in archive.team_results(team, limit=5)],
+             lambda: scan(archive, lambda r: team in (r['home_id'], r['away_id']))[-5:]),
+            ("team all seasons",
+             lambda: [r['id'] for r in archive.team_results(team)],
+             lambda: scan(archive, lambda r: team in (r['home_id'], r['away_id']))),
+            ("head to head",
+             lambda: [r['id'] for r in archive.head_to_head(team, rival)],
+             lambda: scan(archive, lambda r: {team, rival} == {r['home_id'], r['away_id']})),
+            ("results on a date",
+             lambda: [r['id'] for r in archive.on_date(day)],
+             lambda: scan(archive, lambda r: day_start <= r['timestamp'] < day_start + 86400)),
+            ("latest season by date",
+             lambda: len(archive.between(int(time.mktime((last_season, 7, 1, 0, 0, 0, 0, 0, 0))), 0xFFFFFFFF)),
+             lambda: len(scan(archive, lambda r: r['season'] == last_season))),
+        ]
+        print(f"\n{'lookup':<24}{'indexed ms':>12}{'scan ms':>12}  match")
+        failures = 0
+        for name, indexed, scanned in checks:
+            got, indexed_ms = timed(indexed, 20)
+            want, scan_ms = timed(scanned, 1)
+            failures += got != want
+            print(f"{name:<24}{indexed_ms:>12.2f}{scan_ms:>12.1f}  {'yes' if got == want else 'NO'}")
+
+        # The fixtures screen's head to head strip, for a 10 match round
+        matchday = [(f['home_id'], f['away_id']) for f, _, _, _ in fixtures[-10:]]
+
+        def strips():
+            form_guide._form_cache.clear()
+            return [form_guide.h2h_strip(archive, home, away) for home, away in matchday]
+
+        lines, strip_ms = timed(strips, 20)
+        print(f"\nh2h strip: {strip_ms / len(matchday):.2f} ms per fixture, e.g. {lines[0]!r}")
+        home, away = form_guide.home_away_split(archive, team, int(time.mktime((last_season, 7, 1, 0, 0, 0, 0, 0, 0))))
+        print(f"home/away split for {team} in {last_season}: home {home}, away {away}")
+
+        # A power cut between the log append and the index write is fixed by a rebuild
+        _, rebuild_ms = timed(archive.rebuild, 1)
+        reopened = results_archive.ResultsArchive(root)
+        rebuilt_ok = [r['id'] for r in reopened.team_results(team, limit=5)] == checks[0][2]()
+        print(f"\nrebuild indexes from log: {rebuild_ms:.0f} ms, {'ok' if rebuilt_ok else 'MISMATCH'}")
+        failures += not rebuilt_ok
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# Host-side benchmark: api_client keep-alive vs a fresh TLS connection per request
+#
+#   python3 tools/bench_keepalive.py [--requests 13] [--rtt 40] [--chunked]
+#
+# Starts a local TLS stub of v3.football.api-sports.io (self-signed cert made with
+# the openssl CLI), replays one fixtures refresh worth of requests (standings,
+# today, next 10, then events) both ways and reports handshake count and latency.
+# --rtt adds a simulated network round trip per TLS flight and per request.
+
+import argparse
+import json
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import api_client  # noqa: E402
+
+
+def make_cert(tmpdir):
+    cert = os.path.join(tmpdir, "stub.pem")
+    key = os.path.join(tmpdir, "stub.key")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+def payload_for(path):
+    # Roughly the sizes of real api-sports responses
+    if path.startswith("/standings"):
+        teams = [{"rank": i + 1, "team": {"id": 30 + i, "name": f"Team {i}"}, "points": 60 - i,
+                  "goalsDiff": 20 - i, "form": "WWDLW",
+                  "all": {"played": 30, "win": 18, "draw": 6, "lose": 6, "goals": {"for": 50, "against": 30}}}
+                 for i in range(20)]
+        return {"response": [{"league": {"standings": [teams]}}]}
+    if path.startswith("/fixtures/events"):
+        return {"response": [{"type": "Goal", "detail": "Normal Goal", "time": {"elapsed": 10 * i},
+                              "player": {"name": f"Player {i}"}} for i in range(6)]}
+    return {"response": [{"fixture": {"id": 1000 + i, "date": "2024-10-19T14:00:00+00:00", "timestamp": 1729346400,
+                                      "status": {"short": "FT"}},
+                          "teams": {"home": {"id": 30 + i, "name": f"Team {i}"}, "away": {"id": 40 + i, "name": f"Team {i + 10}"}},
+                          "goals": {"home": 1, "away": 2}} for i in range(10)]}
+
+
+class StubServer:
+    def __init__(self, cert, key, rtt, chunked):
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(cert, key)
+        self.rtt = rtt
+        self.chunked = chunked
+        self.handshakes = 0
+        self.requests = 0
+        self.listener = socket.socket()
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(8)
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.handle, args=(sock,), daemon=True).start()
+
+    def handle(self, raw):
+        time.sleep(self.rtt * 2)  # TCP + TLS 1.3 handshake flights
+        try:
+            conn = self.context.wrap_socket(raw, server_side=True)
+        except (ssl.SSLError, OSError):
+            raw.close()
+            return
+        self.handshakes += 1
+        reader = conn.makefile("rb")
+        try:
+            while True:
+                request_line = reader.readline()
+                if not request_line:
+                    break
+                path = request_line.split()[1].decode()
+                close = False
+                while True:
+                    line = reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    if line.lower().startswith(b"connection:") and b"close" in line.lower():
+                        close = True
+                time.sleep(self.rtt)  # Request/response round trip
+                self.requests += 1
+                body = json.dumps(payload_for(path)).encode()
+                head = "HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                if self.chunked:
+                    out = (head + "Transfer-Encoding: chunked\r\n\r\n").encode()
+                    for i in range(0, len(body), 1000):
+                        part = body[i:i + 1000]
+                        out += b"%x\r\n" % len(part) + part + b"\r\n"
+                    out += b"0\r\n\r\n"
+                else:
+                    out = (head + f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+                conn.sendall(out)
+                if close:
+                    break
+        except (OSError, ssl.SSLError):
+            pass
+        finally:
+            conn.close()
+
+    def stop(self):
+        self.listener.close()
+
+
+def refresh_urls(port, count):
+    base = f"https://127.0.0.1:{port}"
+    urls = [f"{base}/standings?league=39&season=2024",
+            f"{base}/fixtures?league=39&season=2024&date=2024-10-19",
+            f"{base}/fixtures?league=39&season=2024&next=10"]
+    urls += [f"{base}/fixtures/events?fixture={1000 + i}" for i in range(max(0, count - 3))]
+    return urls[:count]
+
+
+def run(server, urls, reuse):
+    start_handshakes = server.handshakes
+    start = time.perf_counter()
+    for url in urls:
+        response = api_client.get(url, headers={"x-apisports-key": "bench"})
+        assert response.status_code == 200
+        data = response.json()
+        assert "response" in data
+        response.close()
+        if not reuse:
+            api_client.close()  # What urequests does: one connection per request
+    api_client.close()
+    elapsed = time.perf_counter() - start
+    return server.handshakes - start_handshakes, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark api_client keep-alive against a local TLS stub")
+    parser.add_argument("--requests", type=int, default=13, help="requests per refresh (3-13 for the fixtures screen)")
+    parser.add_argument("--rtt", type=float, default=0.0, help="simulated round trip in ms")
+    parser.add_argument("--rounds", type=int, default=5, help="refreshes to average over")
+    parser.add_argument("--chunked", action="store_true", help="serve chunked bodies instead of Content-Length")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cert, key = make_cert(tmpdir)
+        server = StubServer(cert, key, args.rtt / 1000.0, args.chunked)
+        urls = refresh_urls(server.port, args.requests)
+        results = {}
+        for label, reuse in (("new connection per request", False), ("keep-alive", True)):
+            handshakes = 0
+            elapsed = 0.0
+            for _ in range(args.rounds):
+                h, e = run(server, urls, reuse)
+                handshakes += h
+                elapsed += e
+            results[label] = (handshakes / args.rounds, elapsed / args.rounds * 1000)
+        server.stop()
+
+    print(f"{len(urls)} requests per refresh, {args.rounds} refreshes, rtt {args.rtt:.0f} ms,"
+          f" {'chunked' if args.chunked else 'content-length'} bodies")
+    print(f"{'mode':<28}{'handshakes':>12}{'total ms':>12}")
+    for label, (handshakes, ms) in results.items():
+        print(f"{label:<28}{handshakes:>12.1f}{ms:>12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
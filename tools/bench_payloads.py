@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# Scaling benchmark for the parsing and page layout code, on the host emulator
+#
+#   python3 tools/bench_payloads.py [--edge] [--pages table,fixtures] [--verbose]
+#
+# Generates payload corpora (tools/payload_corpus.py) from a normal league up to 36
+# teams, 24 live matches and 60 event games, parses them the way footy_data does
+# and draws every footy_pages page on a HostDisplay. For each step it reports
+# parse time and peak Python memory, render time and peak, and how the layout
+# coped: text drawn off the panel, text boxes overlapping each other, and items in
+# the dataset that never made it (whole) onto the page. A page that raises is reported too.
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, ".."))
+sys.path.insert(0, TOOLS_DIR)
+
+import footy_data  # noqa: E402
+import footy_pages  # noqa: E402
+import payload_corpus  # noqa: E402
+import player_stats  # noqa: E402
+from frame_server import crest_root  # noqa: E402
+from host_display import HostDisplay, HostPNG  # noqa: E402
+
+# (label, corpus arguments) from today's league up to well past anything real
+STEPS = [
+    ("20 teams", dict(teams=20, live=1, finished=10, upcoming=10, events_per_match=6)),
+    ("24 teams", dict(teams=24, live=2, finished=12, upcoming=12, events_per_match=10)),
+    ("10 live", dict(teams=24, live=10, finished=12, upcoming=12, events_per_match=15)),
+    ("30 events", dict(teams=24, live=12, finished=12, upcoming=12, events_per_match=30)),
+    ("36 teams", dict(teams=36, live=18, finished=18, upcoming=18, events_per_match=45)),
+    ("worst case", dict(teams=36, live=24, finished=24, upcoming=24, events_per_match=60, scorers=40)),
+]
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+# Parse raw payloads into the shared dataset, the way footy_data.fetch_dataset does
+def parse(payloads):
+    standings = json.loads(payloads["standings.json"])["response"][0]["league"]["standings"][0]
+    fixtures = [footy_data.compact_fixture(f) for f in json.loads(payloads["fixtures.json"])["response"]]
+    for fixture in fixtures:
+        raw = payloads.get(f"events_{fixture['id']}.json")
+        if raw:
+            fixture['events'] = [footy_data.compact_event(e) for e in json.loads(raw)["response"]
+                                 if e['type'] in ('Goal', 'Card')]
+    upcoming = [f for f in fixtures if f['status'] not in footy_data.FINISHED_STATUSES and f['timestamp']]
+    upcoming = sorted(upcoming, key=lambda f: f['timestamp'])[:footy_data.MAX_FIXTURES]
+    results = [f for f in fixtures if f['status'] in footy_data.FINISHED_STATUSES]
+    results = sorted(results, key=lambda f: -f['timestamp'])[:footy_data.MAX_RESULTS]
+    # Player leaderboards with the live matches' goals and cards added on (footy_data.fetch_player_stats)
+    scorers = json.loads(payloads["topscorers.json"])["response"][:player_stats.SNAPSHOT_PLAYERS]
+    cards = []
+    for name in ("topyellowcards.json", "topredcards.json"):
+        cards += [footy_data.compact_card(e) for e in json.loads(payloads[name])["response"][:player_stats.SNAPSHOT_PLAYERS]]
+    finished = [f['id'] for f in results]
+    stats = player_stats.snapshot([footy_data.compact_scorer(entry) for entry in scorers], cards, finished)
+    player_stats.note_events(stats, upcoming + results)
+    scorers, cards = player_stats.leaderboards(stats)
+    return {
+        'fetched': int(time.time()),
+        'standings': [footy_data.compact_standing(team) for team in standings],
+        'table_size': len(standings),
+        'fixtures': upcoming,
+        'results': results,
+        'scorers': scorers,
+        'cards': cards,
+    }
+
+
+def overlaps(texts):
+    count = 0
+    for i, (_, x1, y1, w1, h1) in enumerate(texts):
+        for _, x2, y2, w2, h2 in texts[i + 1:]:
+            if x1 < x2 + w2 and x2 < x1 + w1 and y1 < y2 + h2 and y2 < y1 + h1:
+                count += 1
+    return count
+
+
+# Names that should show up on each page, to spot rows the layout silently dropped
+def expected_names(name, dataset):
+    if name == 'table':
+        return [team['name'] for team in dataset['standings']]
+    if name in ('fixtures', 'results'):
+        return [fixture['home'] for fixture in dataset[name]]
+    if name == 'scorers':
+        return [player['name'] for player in dataset[name]]
+    if name == 'discipline':
+        return [player['name'] for player in dataset['cards']]
+    return []
+
+
+def hidden(name, dataset, display):
+    drawn = [text for text, x, y, width, height in display.texts
+             if 0 <= x and x + width <= display.width and 0 <= y and y + height <= display.height]
+    return sum(1 for want in expected_names(name, dataset)
+               if not any(text.startswith(want[:10]) or want[:10] in text for text in drawn))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse/layout scaling benchmark against the host emulator")
+    parser.add_argument("--edge", action="store_true", help="use the awkward names/nulls/statuses corpus")
+    parser.add_argument("--pages", help="comma separated pages (default all)")
+    parser.add_argument("--verbose", action="store_true", help="list every overflowing text")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    crests = crest_root(os.path.join(TOOLS_DIR, "..", "footy_frame_crests.zip"))
+    pages = args.pages.split(",") if args.pages else ['table', 'fixtures', 'results', 'scorers', 'team', 'discipline']
+
+    print(f"{'step':<12}{'payload KB':>11}{'parse ms':>10}{'parse KB':>10}  "
+          f"{'page':<11}{'render ms':>10}{'render KB':>10}{'off panel':>10}{'overlaps':>9}{'hidden':>8}")
+    failures = 0
+    for label, step in STEPS:
+        files = payload_corpus.corpus(args.seed, edge=args.edge, **step)
+        payloads = {name: json.dumps(p, ensure_ascii=False).encode() for name, p in files.items()}
+        size = sum(len(data) for data in payloads.values()) / 1024
+        try:
+            dataset, parse_ms, parse_peak = measure(lambda: parse(payloads))
+        except Exception as e:  # noqa: BLE001 - report any crash and carry on with the next step
+            print(f"{label:<12}{size:>11.0f}  PARSE FAILED: {e!r}")
+            failures += 1
+            continue
+        footy_data.FOCUS_TEAM_ID = dataset['standings'][len(dataset['standings']) // 2]['id']
+        first = True
+        for name in pages:
+            prefix = f"{label:<12}{size:>11.0f}{parse_ms:>10.1f}{parse_peak / 1024:>10.0f}  " if first \
+                else " " * 45
+            first = False
+            display = HostDisplay(800, 480)  # The framebuffer isn't part of the page's peak
+            footy_pages.init(display, HostPNG(display, crests))
+            try:
+                _, render_ms, render_peak = measure(lambda: footy_pages.draw_page(name, dataset))
+            except Exception as e:  # noqa: BLE001
+                print(f"{prefix}{name:<11}  FAILED: {e!r}")
+                failures += 1
+                continue
+            print(f"{prefix}{name:<11}{render_ms:>10.0f}{render_peak / 1024:>10.0f}{len(display.overflow):>10}"
+                  f"{overlaps(display.texts):>9}{hidden(name, dataset, display):>8}")
+            if args.verbose:
+                for text, x, y, width in display.overflow:
+                    print(f"{'':>45}  off panel: {text!r} at ({x}, {y}), {width} px wide")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
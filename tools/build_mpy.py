@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# Precompiled (.mpy) and frozen builds of the frame modules
+#
+#   python3 tools/build_mpy.py [--main footy_frame] [--opt 1]     # build/mpy: copy these to the pico
+#   python3 tools/build_mpy.py --freeze [--micropython ~/micropython --board RPI_PICO_W]
+#   python3 tools/build_mpy.py --check-only                       # just the host import check
+#
+# Every module in the repo root is cross-compiled with mpy-cross (pip install
+# mpy-cross, the version has to match the firmware's .mpy format), so the pico loads
+# bytecode instead of running the compiler at every boot. MicroPython only runs
+# main.py as source, so a two line main.py launcher for --main is written next to
+# them. API_KEY.py and WIFI_CONFIG.py stay as source and aren't part of the build.
+#
+# --freeze writes a manifest for baking the same modules into a firmware image, and
+# builds it when given a MicroPython checkout. Frozen modules cost no RAM for their
+# bytecode, but a .py or .mpy of the same name on the pico still wins, delete them.
+#
+# After building, a size report (source vs .mpy) and the host import check: every
+# module compiles, every import resolves to a module in the build, a config file or
+# something the firmware has built in, and the modules that don't need the hardware
+# import cleanly on the host. With the MicroPython unix port on the PATH those are
+# imported from the built .mpy files, otherwise from source under CPython.
+# tools/import_report.py measures the import times on the pico itself.
+
+import argparse
+import ast
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+CONFIG = ("API_KEY", "WIFI_CONFIG")  # Edited on the pico, kept out of the build
+# Only exist on the Inky Frame firmware, modules importing these at the top need the hardware
+FIRMWARE = ("machine", "picographics", "pngdec", "jpegdec", "sdcard", "inky_frame", "network",
+            "ntptime", "uasyncio", "rp2", "inky_helper", "wakeup")
+# Built into MicroPython (or an alias it accepts), fine to import anywhere
+BUILTIN = ("array", "asyncio", "binascii", "collections", "errno", "gc", "hashlib", "io", "json",
+           "math", "micropython", "os", "random", "re", "select", "socket", "ssl", "struct",
+           "sys", "time", "zlib", "deflate")
+
+
+def modules():
+    names = sorted(f[:-3] for f in os.listdir(ROOT) if f.endswith(".py") and f[:-3] not in CONFIG)
+    return [name for name in names if name not in ("main", "boot")]
+
+
+def imports(name):
+    with open(os.path.join(ROOT, name + ".py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read(), name + ".py")
+    found, top = set(), set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        for imported in names:
+            found.add(imported.split(".")[0])
+    for node in tree.body:  # Imports run as soon as the module is loaded
+        if isinstance(node, ast.Import):
+            top.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            top.add(node.module.split(".")[0])
+    return found, top
+
+
+# Runs on import (footy_frame, v9...) rather than sitting behind a __main__ guard
+def runs_on_import(name):
+    with open(os.path.join(ROOT, name + ".py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+            return True
+    return False
+
+
+def has_main_guard(name):
+    with open(os.path.join(ROOT, name + ".py"), encoding="utf-8") as f:
+        return 'if __name__ == "__main__":' in f.read()
+
+
+def find_mpy_cross(path):
+    if path:
+        return [path]
+    if shutil.which("mpy-cross"):
+        return ["mpy-cross"]
+    try:
+        import mpy_cross  # noqa: F401 - pip install mpy-cross
+        return [sys.executable, "-m", "mpy_cross"]
+    except ImportError:
+        return None
+
+
+def compile_all(names, mpy_cross, out, opt):
+    version = subprocess.run(mpy_cross + ["--version"], capture_output=True, text=True).stdout.strip()
+    print(f"{version or 'mpy-cross'}, -O{opt}")
+    os.makedirs(out, exist_ok=True)
+    failed = []
+    for name in names:
+        result = subprocess.run(
+            mpy_cross + ["-march=armv6m", f"-O{opt}", "-s", name + ".py",
+                         "-o", os.path.join(out, name + ".mpy"), os.path.join(ROOT, name + ".py")],
+            capture_output=True, text=True)
+        if result.returncode:
+            print(f"{name}.py failed to compile:\n{result.stderr}")
+            failed.append(name)
+    return failed
+
+
+def write_launcher(main, out):
+    call = f'__import__("{main}")' + (".main()" if has_main_guard(main) else "")
+    with open(os.path.join(out, "main.py"), "w") as f:
+        f.write(f"# Written by tools/build_mpy.py: runs the precompiled {main} at boot\n{call}\n")
+
+
+def size_report(names, out):
+    print(f"\n{'module':<42}{'lines':>7}{'.py bytes':>11}{'.mpy bytes':>12}{'saved':>8}")
+    totals = [0, 0, 0]
+    for name in names:
+        path = os.path.join(ROOT, name + ".py")
+        with open(path, encoding="utf-8") as f:
+            lines = sum(1 for _ in f)
+        source = os.path.getsize(path)
+        mpy_path = os.path.join(out, name + ".mpy")
+        mpy = os.path.getsize(mpy_path) if os.path.exists(mpy_path) else None
+        totals[0] += lines
+        totals[1] += source
+        totals[2] += mpy or 0
+        saved = f"{1 - mpy / source:>8.0%}" if mpy else f"{'-':>8}"
+        print(f"{name:<42}{lines:>7}{source:>11}{mpy if mpy else '-':>12}{saved}")
+    if totals[2]:
+        print(f"{'total':<42}{totals[0]:>7}{totals[1]:>11}{totals[2]:>12}{1 - totals[2] / totals[1]:>8.0%}")
+
+
+def write_manifest(names, out, base):
+    os.makedirs(out, exist_ok=True)
+    path = os.path.join(out, "manifest.py")
+    with open(path, "w") as f:
+        f.write("# Written by tools/build_mpy.py: the board's own modules plus the frame modules\n")
+        if base:
+            f.write(f'include("{base}")\n')
+        for name in names:
+            f.write(f'module("{name}.py", base_path="{ROOT}")\n')
+    return path
+
+
+def build_firmware(micropython, board, manifest):
+    port = os.path.join(micropython, "ports", "rp2")
+    result = subprocess.run(["make", "-C", port, f"BOARD={board}", f"FROZEN_MANIFEST={manifest}"])
+    if result.returncode:
+        return False
+    print(f"firmware: {os.path.join(port, f'build-{board}', 'firmware.uf2')}")
+    return True
+
+
+# Import the modules that don't need the hardware, each in a fresh interpreter
+def import_check(names, out):
+    micropython = shutil.which("micropython")
+    from_mpy = micropython and out and any(f.endswith(".mpy") for f in os.listdir(out))
+    failed = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        if from_mpy:
+            # Only the .mpy files and the config on the path, so a source file can't hide a bad build
+            for name in CONFIG:
+                shutil.copy(os.path.join(ROOT, name + ".py"), config_dir)
+            command, env = [micropython, "-c"], dict(os.environ, MICROPYPATH=f"{out}:{config_dir}")
+            print(f"importing the .mpy files with {micropython}")
+        else:
+            command, env = [sys.executable, "-c"], dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1")
+            print("importing the sources with CPython (no micropython unix port on the PATH to load the .mpy files)")
+        for name in names:
+            result = subprocess.run(command + [f'__import__("{name}")'], env=env, cwd=config_dir,
+                                    capture_output=True, text=True, timeout=60)
+            if result.returncode:
+                print(f"  {name}: import failed\n    " + "\n    ".join(result.stderr.strip().splitlines()[-3:]))
+                failed.append(name)
+    return failed
+
+
+def host_check(names, out):
+    local = set(names) | set(CONFIG)
+    failures = []
+    importable = []
+    for name in names:
+        try:
+            found, top = imports(name)
+        except SyntaxError as e:
+            print(f"  {name}: {e}")
+            failures.append(name)
+            continue
+        unknown = sorted(found - local - set(FIRMWARE) - set(BUILTIN))
+        if unknown:
+            print(f"  {name}: imports {', '.join(unknown)}, which isn't in the build or the firmware")
+            failures.append(name)
+        if not top & set(FIRMWARE) and not runs_on_import(name):
+            importable.append(name)
+    if not failures:
+        print(f"{len(names)} modules, every import resolves")
+    failed = import_check(importable, out)
+    hardware = [name for name in names if name not in importable]
+    print(f"{len(importable) - len(failed)} of {len(importable)} imported cleanly "
+          f"({', '.join(hardware)} need the hardware, checked for syntax and imports only)")
+    return failures + failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build precompiled/frozen frame modules")
+    parser.add_argument("--out", default=os.path.join(ROOT, "build"))
+    parser.add_argument("--main", default="footy_frame", help="script main.py runs at boot")
+    parser.add_argument("--opt", type=int, default=1, choices=range(4), help="mpy-cross -O level (1+ drops asserts)")
+    parser.add_argument("--mpy-cross", help="path to the mpy-cross binary")
+    parser.add_argument("--freeze", action="store_true", help="write a frozen manifest (and build with --micropython)")
+    parser.add_argument("--base-manifest", default="$(PORT_DIR)/boards/manifest.py",
+                        help="manifest of the board's own frozen modules to include")
+    parser.add_argument("--micropython", help="MicroPython checkout to build the frozen firmware in")
+    parser.add_argument("--board", default="RPI_PICO_W")
+    parser.add_argument("--check-only", action="store_true", help="only run the host import check on the sources")
+    args = parser.parse_args()
+
+    names = modules()
+    if args.main not in names:
+        parser.error(f"--main {args.main}: no {args.main}.py")
+    mpy_out = os.path.join(args.out, "mpy")
+    failures = []
+
+    if not args.check_only:
+        mpy_cross = find_mpy_cross(args.mpy_cross)
+        if mpy_cross is None and not args.freeze:
+            print("mpy-cross not found: pip install mpy-cross (matching your firmware), or pass --mpy-cross")
+            return 1
+        if mpy_cross:
+            if os.path.isdir(mpy_out):
+                shutil.rmtree(mpy_out)
+            failures += compile_all(names, mpy_cross, mpy_out, args.opt)
+            write_launcher(args.main, mpy_out)
+            size_report(names, mpy_out)
+            print(f"\ncopy {mpy_out}/* to the pico (with your API_KEY.py and WIFI_CONFIG.py) "
+                  f"and delete the old .py copies, they'd be loaded first")
+        if args.freeze:
+            manifest = write_manifest(names, os.path.join(args.out, "freeze"), args.base_manifest)
+            print(f"manifest: {manifest}")
+            if args.micropython and not build_firmware(args.micropython, args.board, manifest):
+                failures.append("firmware")
+            os.makedirs(mpy_out, exist_ok=True)
+            write_launcher(args.main, mpy_out)
+
+    print("\nhost import check")
+    failures += host_check(names, mpy_out if os.path.isdir(mpy_out) and not args.check_only else None)
+    print("OK" if not failures else f"{len(failures)} failures: {', '.join(failures)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# Fault injection checks for api_client's timeouts, retries and refresh deadline
+#
+#   python3 tools/fault_inject.py [--verbose]
+#
+# Starts a local plain HTTP stub that misbehaves on purpose: it stalls before the
+# headers or halfway through a body, resets connections, sends 429s with Retry-After
+# and 5xxs that clear up after a try or two, and can report the daily quota as nearly
+# used up. Each check asserts that a request comes back (or fails) within a bounded
+# time and retries only when it should, and that footy_data.get_dataset falls back to
+# the cached dataset when a refresh stalls. The stub serves payload_corpus data, so
+# the happy path goes through the real parsing code too.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, ".."))
+sys.path.insert(0, TOOLS_DIR)
+
+import api_client  # noqa: E402
+import footy_data  # noqa: E402
+import memory  # noqa: E402
+import payload_corpus  # noqa: E402
+
+# Short limits so the whole run takes seconds; the checks scale with them
+SOCKET_TIMEOUT_MS = 800
+BACKOFF_BASE_MS = 100
+SLACK_MS = 400  # Scheduling noise allowed on top of the worst case
+
+
+class Stub:
+    def __init__(self):
+        self.release = threading.Event()  # Set at shutdown to end any stall
+        self.hits = {}
+        self.quota = 7500
+        self.mode = "ok"  # How the api-football endpoints behave: ok, stall or 500
+        files = payload_corpus.corpus(seed=1, live=2)
+        self.payloads = {name: json.dumps(p).encode() for name, p in files.items()}
+
+    def hit(self, path):
+        self.hits[path] = self.hits.get(path, 0) + 1
+        return self.hits[path]
+
+    def api_payload(self, path):
+        if path.startswith("/standings"):
+            return self.payloads["standings.json"]
+        if path.startswith("/fixtures/events"):
+            name = f"events_{path.split('fixture=')[1].split('&')[0]}.json"
+            return self.payloads.get(name, b'{"response": []}')
+        if path.startswith("/fixtures"):
+            return self.payloads["fixtures.json"]
+        if path.startswith("/players/top"):
+            return self.payloads.get(path.split("?")[0].split("/")[-1] + ".json")
+        return None
+
+
+def handler_for(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, body=b'{"response": []}', headers=()):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("x-ratelimit-requests-remaining", str(stub.quota))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path
+            count = stub.hit(path.split("?")[0])
+            if path == "/ok":
+                self.reply(200)
+            elif path == "/stall":
+                stub.release.wait(30)  # Never answers, as far as the client is concerned
+                self.close_connection = True
+            elif path == "/stall-body":
+                self.send_response(200)
+                self.send_header("Content-Length", "4096")
+                self.end_headers()
+                self.wfile.write(b'{"response": [')
+                self.wfile.flush()
+                stub.release.wait(30)
+                self.close_connection = True
+            elif path == "/reset":
+                # SO_LINGER 0 makes close() send a RST rather than a FIN
+                self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+                self.close_connection = True
+            elif path == "/429":
+                self.reply(429, headers=[("Retry-After", "1")]) if count == 1 else self.reply(200)
+            elif path == "/429-long":
+                self.reply(429, headers=[("Retry-After", "120")])
+            elif path == "/flaky":
+                self.reply(503) if count <= 2 else self.reply(200)
+            elif path == "/500":
+                self.reply(500)
+            elif path == "/big":
+                self.reply(200, b'{"response": "' + b"x" * 40000 + b'"}')
+            elif stub.mode == "stall":
+                stub.release.wait(30)
+                self.close_connection = True
+            elif stub.mode == "500":
+                self.reply(500)
+            else:
+                body = stub.api_payload(path)
+                self.reply(200, body) if body is not None else self.reply(404)
+
+    return Handler
+
+
+def reset_client():
+    api_client.close()
+    api_client._deadline_start = None
+    api_client.quota["day"] = api_client.quota["minute"] = None
+    for key in api_client.stats:
+        api_client.stats[key] = 0
+
+
+# Run fn, returning (result or exception, elapsed ms)
+def timed(fn):
+    start = time.monotonic()
+    try:
+        result = fn()
+    except Exception as e:  # noqa: BLE001 - the outcome is what's being checked
+        result = e
+    return result, (time.monotonic() - start) * 1000
+
+
+# Longest a request can take with every try timing out and the longest backoffs
+def worst_case_ms():
+    backoff = sum(min(api_client.BACKOFF_MAX_MS, api_client.BACKOFF_BASE_MS << n)
+                  for n in range(api_client.MAX_ATTEMPTS - 1))
+    return api_client.MAX_ATTEMPTS * api_client.SOCKET_TIMEOUT_MS + backoff + SLACK_MS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fault injection checks for api_client")
+    parser.add_argument("--verbose", action="store_true", help="show the client's own output")
+    args = parser.parse_args()
+
+    api_client.SOCKET_TIMEOUT_MS = SOCKET_TIMEOUT_MS
+    api_client.BACKOFF_BASE_MS = BACKOFF_BASE_MS
+    stub = Stub()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_for(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    failures = []
+
+    def check(name, ok, detail):
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<34}{detail}")
+        if not ok:
+            failures.append(name)
+
+    def get(path):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+            return timed(lambda: api_client.get(base + path))
+
+    def status(result):
+        return result.status_code if hasattr(result, "status_code") else repr(result)
+
+    worst = worst_case_ms()
+
+    reset_client()
+    result, ms = get("/ok")
+    check("plain request", status(result) == 200 and api_client.quota["day"] == 7500,
+          f"{status(result)} in {ms:.0f} ms, quota read as {api_client.quota['day']}")
+
+    for path in ("/stall", "/stall-body", "/reset"):
+        reset_client()
+        result, ms = get(path)
+        check(f"{path} fails, bounded", isinstance(result, OSError) and ms < worst,
+              f"{status(result)} after {ms:.0f} ms (limit {worst:.0f}), {api_client.stats['retries']} retries")
+
+    reset_client()
+    result, ms = get("/flaky")
+    check("503s retried until 200", status(result) == 200 and api_client.stats["retries"] == 2,
+          f"{status(result)} after {api_client.stats['retries']} retries, {ms:.0f} ms")
+
+    reset_client()
+    result, ms = get("/429")
+    check("429 waits for Retry-After", status(result) == 200 and ms >= 1000,
+          f"{status(result)} after {ms:.0f} ms")
+
+    reset_client()
+    api_client.start_refresh(3000)
+    result, ms = get("/429-long")
+    check("Retry-After past the deadline", status(result) == 429 and api_client.stats["retries"] == 0 and ms < 500,
+          f"{status(result)} in {ms:.0f} ms, {api_client.stats['retries']} retries")
+
+    reset_client()
+    stub.quota = api_client.QUOTA_RESERVE
+    stub.hits.pop("/500", None)
+    result, ms = get("/500")
+    check("no retries on a low quota", status(result) == 500 and stub.hits["/500"] == 1,
+          f"{status(result)}, server hit {stub.hits['/500']} time(s)")
+    stub.quota = 7500
+
+    reset_client()
+    stub.hits.pop("/500", None)
+    result, ms = get("/500")
+    check("500 retried, then returned", status(result) == 500 and stub.hits["/500"] == api_client.MAX_ATTEMPTS,
+          f"{status(result)}, server hit {stub.hits['/500']} time(s) in {ms:.0f} ms")
+
+    reset_client()
+    api_client.start_refresh(1200)
+    result, ms = get("/stall")
+    late, late_ms = get("/ok")
+    check("deadline cuts a stall short", isinstance(result, OSError) and ms < 1200 + SLACK_MS,
+          f"{status(result)} after {ms:.0f} ms")
+    check("nothing runs past the deadline", isinstance(late, api_client.DeadlineExceeded) and late_ms < 50,
+          f"{status(late)} in {late_ms:.0f} ms")
+
+    # A preallocated pool (memory.init) stays put: big bodies get their own buffer, and
+    # one over MAX_BODY_SIZE fails with a MemoryError that api_get turns into None
+    reset_client()
+    pool = bytearray(4096)
+    api_client.use_buffers(pool)
+    result, ms = get("/big")
+    body = 0
+    if hasattr(result, "content"):
+        body = len(result.content)
+        result.close()
+    check("big body kept off the pool", body > 40000 and api_client._body_buf is pool and api_client._spill is None,
+          f"{body} bytes read, pool {'kept' if api_client._body_buf is pool else 'replaced'}")
+    max_body, api_client.MAX_BODY_SIZE = api_client.MAX_BODY_SIZE, 16 * 1024
+    footy_data.API_URL = base
+    output = io.StringIO()
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+        failed = footy_data.api_get("big")
+    api_client.MAX_BODY_SIZE = max_body
+    result, ms = get("/ok")
+    check("MemoryError mid-body recovers", failed is None and api_client._body_buf is pool and status(result) == 200,
+          f"api_get gave {failed!r}, then {status(result)} on the same pool")
+    memory.reset()
+
+    # get_dataset against the stub, with a stale cache to fall back to
+    footy_data.API_URL = base
+    footy_data.REFRESH_BUDGET_MS = 2500
+    footy_data.archive_results = lambda results: None  # Keep the host's results archive out of it
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "footy_cache.json")
+        stats_path = os.path.join(root, "footy_players.json")
+        cached = {"fetched": 0, "standings": [{"id": 1}], "table_size": 1, "fixtures": [], "results": [], "scorers": []}
+
+        def dataset(mode):
+            reset_client()
+            stub.mode = mode
+            footy_data.save_cache(cached, path)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+                return timed(lambda: footy_data.get_dataset(path=path, stats_path=stats_path))
+
+        result, ms = dataset("ok")
+        check("get_dataset fetches", isinstance(result, dict) and len(result["standings"]) == 20
+              and footy_data.load_cache(path)["fetched"] > 0, f"{len(result['standings'])} teams in {ms:.0f} ms"
+              if isinstance(result, dict) else repr(result))
+
+        # A second refresh only asks for the live matches' events, finished ones are carried over
+        fresh = footy_data.load_cache(path)
+        fresh["fetched"] = 0
+        footy_data.save_cache(fresh, path)
+        stub.hits.pop("/fixtures/events", None)
+        reset_client()
+        output = io.StringIO()
+        max_fixtures, footy_data.MAX_FIXTURES = footy_data.MAX_FIXTURES, 100  # The stub sends every fixture, keep the live ones among the upcoming
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+            again = footy_data.get_dataset(path=path, stats_path=stats_path)
+        footy_data.MAX_FIXTURES = max_fixtures
+        live = [f for f in again["fixtures"] if f["status"] in footy_data.LIVE_STATUSES]
+        finished = [f for f in again["results"] if f["events"]]
+        check("finished events not refetched", stub.hits.get("/fixtures/events", 0) == len(live) and live and finished,
+              f"{stub.hits.get('/fixtures/events', 0)} event requests for {len(live)} live matches, "
+              f"{len(finished)} results kept their events")
+
+        # A result whose events request fails stays out of the archive until a refresh gets them
+        archived = []
+        failed_id = next(f["id"] for f in again["results"] if f["events"])
+        fetch_events = footy_data.fetch_events
+        footy_data.archive_results = archived.extend
+        footy_data.fetch_events = lambda fixture_id: None if fixture_id == failed_id else fetch_events(fixture_id)
+        result, ms = dataset("ok")
+        footy_data.fetch_events = fetch_events
+        footy_data.archive_results = lambda results: None
+        ids = [f["id"] for f in archived]
+        check("results archived only with events", archived and failed_id not in ids,
+              f"{len(ids)} archived, {failed_id} {'held back' if failed_id not in ids else 'archived without events'}")
+
+        result, ms = dataset("stall")
+        check("stalled refresh uses the cache", result == cached and ms < footy_data.REFRESH_BUDGET_MS + SLACK_MS,
+              f"{'cached' if result == cached else repr(result)[:40]} after {ms:.0f} ms")
+
+        result, ms = dataset("500")
+        check("failing API keeps the cache", result == cached and footy_data.load_cache(path) == cached,
+              f"{'cached' if result == cached else repr(result)[:40]} after {ms:.0f} ms")
+
+    stub.release.set()
+    server.shutdown()
+    print("OK" if not failures else f"{len(failures)} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# End-to-end check of the render-to-file pipeline, all on localhost:
+# frame_server renders a canned dataset, frame_client.fetch_frame pulls it over
+# HTTP and streams it into a host display, and the two framebuffers must match.
+#
+#   python3 tools/frame_e2e.py [--save DIR]
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, ".."))
+sys.path.insert(0, TOOLS_DIR)
+
+import frame_client  # noqa: E402
+import frame_server  # noqa: E402
+import footy_pages  # noqa: E402
+from host_display import HostDisplay  # noqa: E402
+
+# Team IDs that have crests in footy_frame_crests.zip
+CREST_IDS = [33, 34, 35, 36, 39, 40, 41, 42, 45, 46, 47, 48, 49, 50, 51, 52, 55, 57, 65, 66]
+
+
+def sample_dataset():
+    now = int(time.time())
+    standings = [{
+        'position': i + 1, 'name': f"Team {team_id}", 'id': team_id, 'played': 8, 'wins': 8 - i // 3,
+        'draws': 1, 'losses': i // 3, 'goals_for': 20 - i // 2, 'goals_against': 5 + i // 2,
+        'goal_difference': 15 - i, 'points': 60 - 2 * i, 'form': "WWDLW"[i % 5:] + "WWDLW"[:i % 5],
+    } for i, team_id in enumerate(CREST_IDS)]
+
+    def fixture(n, status, offset):
+        ts = now + offset
+        home, away = CREST_IDS[(2 * n) % 20], CREST_IDS[(2 * n + 1) % 20]
+        played = status != 'NS'
+        return {
+            'id': 1000 + n, 'date': time.strftime("%Y-%m-%dT%H:%M:00+00:00", time.gmtime(ts)), 'timestamp': ts,
+            'status': status, 'home': f"Team {home}", 'home_id': home, 'away': f"Team {away}", 'away_id': away,
+            'home_score': 2 if played else None, 'away_score': 1 if played else None,
+            'events': [{'type': 'Goal', 'detail': 'Normal Goal', 'player': 'A. Striker', 'team_id': home, 'minute': 23},
+                       {'type': 'Card', 'detail': 'Yellow Card', 'player': 'B. Defender', 'team_id': away, 'minute': 41},
+                       {'type': 'Goal', 'detail': 'Normal Goal', 'player': 'C. Winger', 'team_id': away, 'minute': 67}]
+            if played else [],
+        }
+
+    return {
+        'fetched': now,
+        'standings': standings,
+        'fixtures': [fixture(0, '2H', 0)] + [fixture(n, 'NS', n * 86400 // 3) for n in range(1, 8)],
+        'results': [fixture(n, 'FT', -n * 86400 // 2) for n in range(8, 14)],
+        'scorers': [{'name': f"Player {i}", 'team': f"Team {CREST_IDS[i]}", 'team_id': CREST_IDS[i],
+                     'goals': 12 - i, 'assists': i % 4, 'played': 8} for i in range(10)],
+        'cards': [{'name': f"Player {10 + i}", 'team': f"Team {CREST_IDS[10 + i]}", 'team_id': CREST_IDS[10 + i],
+                   'yellow': 7 - i // 2, 'red': int(i % 3 == 0), 'played': 8} for i in range(10)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render, serve and stream every page on localhost")
+    parser.add_argument("--save", help="also write PNG previews of what the client received here")
+    args = parser.parse_args()
+
+    import json
+    import tempfile
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(sample_dataset(), f)
+        dataset_file = f.name
+
+    crests = frame_server.crest_root(os.path.join(TOOLS_DIR, "..", "footy_frame_crests.zip"))
+    store = frame_server.FrameStore("DISPLAY_INKY_FRAME_7", crests, dataset_file)
+    server = frame_server.serve(store, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    failures = 0
+    for name in footy_pages.page_names():
+        client_display = HostDisplay(800, 480)
+        start = time.perf_counter()
+        ok = frame_client.fetch_frame(client_display, f"{base}/frame/next?frame=e2e")
+        elapsed = (time.perf_counter() - start) * 1000
+        match = ok and client_display.pixels == store.page(name).pixels
+        print(f"{name:<10}{'OK' if match else 'MISMATCH':>10}{elapsed:>10.0f} ms")
+        failures += not match
+        if args.save:
+            os.makedirs(args.save, exist_ok=True)
+            client_display.save_png(os.path.join(args.save, f"{name}.png"))
+
+    server.shutdown()
+    os.remove(dataset_file)
+    print("All pages matched." if not failures else f"{failures} page(s) failed.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# Companion render server: fetch the API once for every frame, render full pages
+# on a Linux host with the same footy_pages layout code the frames use, and serve
+# them in the panel's packed native format for frame_client.py to stream in.
+#
+#   python3 tools/frame_server.py --crests footy_frame_crests.zip            # serve on :8080
+#   python3 tools/frame_server.py --dataset cache.json --out frames/         # render to files
+#
+# Endpoints:
+#   /frame/next?frame=<id>   next page in that frame's rotation (what frame_client pulls)
+#   /frame/<page>            a specific page (table, fixtures, results, scorers, team, discipline)
+#   /preview/<page>.png      PNG preview of a page, for checking layouts in a browser
+#
+# The API key comes from API_KEY.py in the repo root, or FOOTY_API_KEY if set.
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, ".."))
+sys.path.insert(0, TOOLS_DIR)
+
+import footy_data  # noqa: E402
+import footy_pages  # noqa: E402
+import scale_crests  # noqa: E402
+from host_display import HostDisplay, HostPNG  # noqa: E402
+
+# The daily player leaderboards (player_stats.py), kept between refreshes like the frames keep them on /sd
+PLAYERS_FILE = os.path.join(tempfile.gettempdir(), "footy_players.json")
+
+
+# Unpack the crest zip from the repo into a temp dir along with the pre-scaled sizes
+# (tools/scale_crests.py), or use a directory that already has them as is
+def crest_root(path):
+    if path and (zipfile.is_zipfile(path) or not os.path.isdir(os.path.join(path, "crests"))):
+        root = tempfile.mkdtemp(prefix="footy_crests_")
+        scale_crests.make_variants(scale_crests.read_crests(path), root)
+        return root
+    return path or "."
+
+
+def render_page(name, dataset, profile="DISPLAY_INKY_FRAME_7", crests="."):
+    display = HostDisplay.for_profile(profile)
+    footy_pages.init(display, HostPNG(display, crests))
+    footy_pages.draw_page(name, dataset)
+    return display
+
+
+class FrameStore:
+    def __init__(self, profile, crests, dataset_file=None, refresh=15 * 60):
+        self.profile = profile
+        self.crests = crests
+        self.dataset_file = dataset_file
+        self.refresh = refresh
+        self.lock = threading.Lock()
+        self.dataset = None
+        self.fetched = 0
+        self.frames = {}  # page name -> rendered HostDisplay
+        self.rotation = {}  # frame id -> index of the last page it was sent
+
+    # One API fetch shared by every frame, redone once it's older than `refresh`
+    def _dataset(self):
+        if self.dataset is not None and time.time() - self.fetched < self.refresh:
+            return self.dataset
+        if self.dataset_file:
+            with open(self.dataset_file) as f:
+                dataset = json.load(f)
+        else:
+            dataset = footy_data.fetch_dataset(PLAYERS_FILE, self.dataset)
+            footy_data.api_client.close()
+        self.dataset = dataset
+        self.fetched = time.time()
+        self.frames = {}
+        return dataset
+
+    def page(self, name):
+        with self.lock:
+            dataset = self._dataset()
+            if name not in self.frames:
+                start = time.perf_counter()
+                self.frames[name] = render_page(name, dataset, self.profile, self.crests)
+                print(f"Rendered {name} in {(time.perf_counter() - start) * 1000:.0f} ms")
+            return self.frames[name]
+
+    def next_page(self, frame_id):
+        names = footy_pages.page_names()
+        with self.lock:
+            index = (self.rotation.get(frame_id, -1) + 1) % len(names)
+            self.rotation[frame_id] = index
+        return names[index]
+
+
+def make_handler(store):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            try:
+                if len(parts) == 2 and parts[0] == "frame":
+                    name = parts[1]
+                    if name == "next":
+                        frame_id = parse_qs(url.query).get("frame", ["default"])[0]
+                        name = store.next_page(frame_id)
+                    if name not in footy_pages.PAGES:
+                        return self.send_error(404, "unknown page")
+                    self._send(store.page(name).frame_blob(), "application/octet-stream", name)
+                elif len(parts) == 2 and parts[0] == "preview" and parts[1].endswith(".png"):
+                    name = parts[1][:-4]
+                    if name not in footy_pages.PAGES:
+                        return self.send_error(404, "unknown page")
+                    with tempfile.NamedTemporaryFile(suffix=".png") as f:
+                        store.page(name).save_png(f.name)
+                        self._send(f.read(), "image/png", name)
+                else:
+                    self.send_error(404)
+            except Exception as e:  # Keep serving other frames if one render fails
+                self.send_error(500, str(e))
+                raise
+
+        def _send(self, body, content_type, page):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("X-Page", page)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def serve(store, host, port):
+    server = ThreadingHTTPServer((host, port), make_handler(store))
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render footy frame pages on a host and serve them to frames")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--profile", default="DISPLAY_INKY_FRAME_7", help="display the frames use")
+    parser.add_argument("--crests", default=os.path.join(TOOLS_DIR, "..", "footy_frame_crests.zip"),
+                        help="crest zip or directory")
+    parser.add_argument("--dataset", help="render from a saved dataset (footy_cache.json) instead of the API")
+    parser.add_argument("--api-url", help="override the API base URL (e.g. a local stub)")
+    parser.add_argument("--refresh", type=int, default=15 * 60, help="seconds before refetching the API")
+    parser.add_argument("--out", help="render every page to this directory (.bin + .png) and exit")
+    args = parser.parse_args()
+
+    if os.environ.get("FOOTY_API_KEY"):
+        footy_data.API_KEY = os.environ["FOOTY_API_KEY"]
+    if args.api_url:
+        footy_data.API_URL = args.api_url
+
+    store = FrameStore(args.profile, crest_root(args.crests), args.dataset, args.refresh)
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for name in footy_pages.page_names():
+            display = store.page(name)
+            with open(os.path.join(args.out, f"{name}.bin"), "wb") as f:
+                f.write(display.frame_blob())
+            display.save_png(os.path.join(args.out, f"{name}.png"))
+            print(f"Wrote {name}.bin and {name}.png")
+        return 0
+
+    server = serve(store, args.host, args.port)
+    print(f"Serving frames on http://{args.host}:{server.server_address[1]}/frame/next?frame=<id>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
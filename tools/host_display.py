@@ -0,0 +1,320 @@
+# Host-side stand-ins for PicoGraphics and pngdec, so the page renderers in
+# footy_pages.py can draw on a Linux box (render server, benchmarks, layout checks).
+#
+# Pure Python on purpose: no Pillow or other extra packages needed on the host.
+# Pixels are stored as Inky palette indices and can be written out either in the
+# panel's packed native format (4 bits per pixel, two pixels per byte, high nibble
+# first) or as a PNG preview.
+
+import os
+import struct
+import zlib
+
+# Inky Frame 7-colour palette, in the panel's native index order
+PALETTE = [
+    (0, 0, 0),        # 0 black
+    (255, 255, 255),  # 1 white
+    (0, 255, 0),      # 2 green
+    (0, 0, 255),      # 3 blue
+    (255, 0, 0),      # 4 red
+    (255, 255, 0),    # 5 yellow
+    (255, 128, 0),    # 6 orange
+    (220, 180, 200),  # 7 clean (not used for drawing)
+]
+DRAWABLE = 7  # create_pen() and PNG decoding only pick from the first 7 colours
+
+# Display profiles matching picographics' DISPLAY_INKY_FRAME* constants
+PROFILES = {
+    "DISPLAY_INKY_FRAME_4": (640, 400),
+    "DISPLAY_INKY_FRAME": (600, 448),
+    "DISPLAY_INKY_FRAME_7": (800, 480),
+}
+
+FRAME_MAGIC = b"IKFR"
+FRAME_HEADER = ">4sHHBB"  # magic, width, height, bits per pixel, reserved
+
+# Classic 5x7 font for ASCII 32-126, five column bytes per glyph (bit 0 = top row).
+# picographics' bitmap8 is close enough in size: 8px tall, about 6px advance.
+_FONT = bytes.fromhex(
+    "0000000000" "00005f0000" "0007000700" "147f147f14" "242a7f2a12" "2313086462" "3649562050" "0005030000"
+    "001c224100" "0041221c00" "14083e0814" "08083e0808" "0050300000" "0808080808" "0060600000" "2010080402"
+    "3e5149453e" "00427f4000" "4261514946" "2141454b31" "1814127f10" "2745454539" "3c4a494930" "0171090503"
+    "3649494936" "064949291e" "0036360000" "0056360000" "0814224100" "1414141414" "0041221408" "0201510906"
+    "324979413e" "7e1111117e" "7f49494936" "3e41414122" "7f4141221c" "7f49494941" "7f09090901" "3e4149497a"
+    "7f0808087f" "00417f4100" "2040413f01" "7f08142241" "7f40404040" "7f020c027f" "7f0408107f" "3e4141413e"
+    "7f09090906" "3e4151215e" "7f09192946" "4649494931" "01017f0101" "3f4040403f" "1f2040201f" "3f4038403f"
+    "6314081463" "0708700807" "6151494543" "007f414100" "0204081020" "0041417f00" "0402010204" "4040404040"
+    "0001020400" "2054545478" "7f48444438" "3844444420" "384444487f" "3854545418" "087e090102" "0c5252523e"
+    "7f08040478" "00447d4000" "2040443d00" "7f10284400" "00417f4000" "7c0418047c" "7c08040478" "3844444438"
+    "7c14141408" "081414187c" "7c08040408" "4854545420" "043f444020" "3c4040207c" "1c2040201c" "3c4030403c"
+    "4428102844" "0c5050503c" "4464544c44" "0008364100" "00007f0000" "0041360800" "08082a1c08"
+)
+CHAR_WIDTH = 6  # 5 pixel glyph plus 1 pixel spacing
+CHAR_HEIGHT = 8
+
+
+def nearest_colour(r, g, b):
+    best = 0
+    best_dist = None
+    for index in range(DRAWABLE):
+        pr, pg, pb = PALETTE[index]
+        dist = (r - pr) * (r - pr) + (g - pg) * (g - pg) + (b - pb) * (b - pb)
+        if best_dist is None or dist < best_dist:
+            best = index
+            best_dist = dist
+    return best
+
+
+class HostDisplay:
+    def __init__(self, width=800, height=480):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(width * height)
+        self.pixels[:] = b"\x01" * (width * height)  # Start white like a cleared panel
+        self.pen = 0
+        self.font = "bitmap8"
+        self.updates = 0
+        # Anything drawn past the panel edge, for layout overflow checks
+        self.overflow = []
+        # Every text box drawn as (text, x, y, width, height), for overlap checks
+        self.texts = []
+
+    @classmethod
+    def for_profile(cls, name):
+        return cls(*PROFILES[name])
+
+    # --- PicoGraphics API used by the frame scripts ---
+
+    def get_bounds(self):
+        return self.width, self.height
+
+    def create_pen(self, r, g, b):
+        return nearest_colour(r, g, b)
+
+    def set_pen(self, pen):
+        self.pen = pen
+
+    def set_font(self, font):
+        self.font = font
+
+    def clear(self):
+        self.pixels[:] = bytes([self.pen]) * (self.width * self.height)
+
+    def update(self):
+        self.updates += 1
+
+    def pixel(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.pixels[y * self.width + x] = self.pen
+
+    def pixel_span(self, x, y, length):
+        if not 0 <= y < self.height:
+            return
+        start = max(0, x)
+        end = min(self.width, x + length)
+        if end > start:
+            row = y * self.width
+            self.pixels[row + start:row + end] = bytes([self.pen]) * (end - start)
+
+    def rectangle(self, x, y, w, h):
+        for row in range(max(0, y), min(self.height, y + h)):
+            self.pixel_span(x, row, w)
+
+    def line(self, x1, y1, x2, y2, thickness=1):
+        # Bresenham
+        dx = abs(x2 - x1)
+        dy = -abs(y2 - y1)
+        sx = 1 if x1 < x2 else -1
+        sy = 1 if y1 < y2 else -1
+        err = dx + dy
+        while True:
+            self.pixel(x1, y1)
+            if x1 == x2 and y1 == y2:
+                break
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x1 += sx
+            if e2 <= dx:
+                err += dx
+                y1 += sy
+
+    def measure_text(self, text, scale=2, spacing=1):
+        return len(text) * CHAR_WIDTH * int(scale)
+
+    def text(self, text, x, y, wordwrap=-1, scale=2, angle=0, spacing=1):
+        scale = int(scale)
+        width = self.measure_text(text, scale)
+        if x < 0 or y < 0 or x + width > self.width or y + CHAR_HEIGHT * scale > self.height:
+            self.overflow.append((text, x, y, width))
+        self.texts.append((text, x, y, width, CHAR_HEIGHT * scale))
+        for i, char in enumerate(text):
+            code = ord(char)
+            if not 32 <= code <= 126:
+                code = ord("?")
+            glyph = _FONT[(code - 32) * 5:(code - 32) * 5 + 5]
+            cx = x + i * CHAR_WIDTH * scale
+            for col, bits in enumerate(glyph):
+                for row in range(7):
+                    if bits & (1 << row):
+                        if scale == 1:
+                            self.pixel(cx + col, y + row)
+                        else:
+                            self.rectangle(cx + col * scale, y + row * scale, scale, scale)
+
+    # --- Output ---
+
+    # The panel's packed native format: 4bpp palette indices, high nibble first
+    def pack(self):
+        px = self.pixels
+        out = bytearray(len(px) // 2)
+        out[:] = bytes((px[i] << 4) | px[i + 1] for i in range(0, len(px), 2))
+        return bytes(out)
+
+    def unpack(self, data):
+        px = self.pixels
+        for i, byte in enumerate(data):
+            px[2 * i] = byte >> 4
+            px[2 * i + 1] = byte & 0x0F
+
+    def frame_blob(self):
+        return struct.pack(FRAME_HEADER, FRAME_MAGIC, self.width, self.height, 4, 0) + self.pack()
+
+    def save_png(self, path):
+        raw = bytearray()
+        for y in range(self.height):
+            raw.append(0)  # Filter type None
+            for index in self.pixels[y * self.width:(y + 1) * self.width]:
+                raw.extend(PALETTE[index])
+        write_png(path, self.width, self.height, bytes(raw))
+
+
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+# `raw_rows` are filter byte prefixed rows of RGB, or RGBA with alpha=True
+def write_png(path, width, height, raw_rows, alpha=False):
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6 if alpha else 2, 0, 0, 0)))
+        f.write(_chunk(b"IDAT", zlib.compress(raw_rows, 9)))
+        f.write(_chunk(b"IEND", b""))
+
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa = abs(p - a)
+    pb = abs(p - b)
+    pc = abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+# Decode an 8-bit, non-interlaced PNG into (width, height, rows of (r, g, b, a) tuples)
+def decode_png(data):
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("not a PNG")
+    pos = 8
+    idat = b""
+    palette = []
+    trns = b""
+    width = height = colour_type = None
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if kind == b"IHDR":
+            width, height, depth, colour_type, _, _, interlace = struct.unpack(">IIBBBBB", body)
+            if depth != 8 or interlace:
+                raise ValueError("only 8-bit non-interlaced PNGs are supported")
+        elif kind == b"PLTE":
+            palette = [tuple(body[i:i + 3]) for i in range(0, len(body), 3)]
+        elif kind == b"tRNS":
+            trns = body
+        elif kind == b"IDAT":
+            idat += body
+        elif kind == b"IEND":
+            break
+
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}[colour_type]
+    stride = width * channels
+    raw = zlib.decompress(idat)
+    rows = []
+    prev = bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        filter_type = raw[start]
+        line = bytearray(raw[start + 1:start + 1 + stride])
+        for i in range(stride):
+            left = line[i - channels] if i >= channels else 0
+            up = prev[i]
+            up_left = prev[i - channels] if i >= channels else 0
+            if filter_type == 1:
+                line[i] = (line[i] + left) & 0xFF
+            elif filter_type == 2:
+                line[i] = (line[i] + up) & 0xFF
+            elif filter_type == 3:
+                line[i] = (line[i] + ((left + up) >> 1)) & 0xFF
+            elif filter_type == 4:
+                line[i] = (line[i] + _paeth(left, up, up_left)) & 0xFF
+        prev = line
+
+        row = []
+        for x in range(width):
+            p = line[x * channels:(x + 1) * channels]
+            if colour_type == 6:
+                row.append(tuple(p))
+            elif colour_type == 2:
+                row.append((p[0], p[1], p[2], 255))
+            elif colour_type == 3:
+                r, g, b = palette[p[0]]
+                row.append((r, g, b, trns[p[0]] if p[0] < len(trns) else 255))
+            elif colour_type == 4:
+                row.append((p[0], p[0], p[0], p[1]))
+            else:
+                row.append((p[0], p[0], p[0], 255))
+        rows.append(row)
+    return width, height, rows
+
+
+class HostPNG:
+    # `root` stands in for the SD card: "/sd/33.png" is read from <root>/33.png
+    def __init__(self, display, root="."):
+        self.display = display
+        self.root = root
+        self.image = None
+        self._cache = {}
+
+    def _host_path(self, filename):
+        if filename.startswith("/sd/"):
+            filename = filename[4:]
+        return os.path.join(self.root, filename.lstrip("/"))
+
+    def open_file(self, filename):
+        path = self._host_path(filename)
+        if path not in self._cache:
+            with open(path, "rb") as f:  # Raises OSError like pngdec when the crest is missing
+                width, height, rows = decode_png(f.read())
+            # Pre-map to palette indices once, crests are drawn many times per frame
+            self._cache[path] = (width, height, [[None if a < 128 else nearest_colour(r, g, b)
+                                                 for r, g, b, a in row] for row in rows])
+        self.image = self._cache[path]
+
+    def get_width(self):
+        return self.image[0]
+
+    def get_height(self):
+        return self.image[1]
+
+    def decode(self, x, y, scale=1, mode=0):
+        _, _, rows = self.image
+        display = self.display
+        pen = display.pen
+        for row_index, row in enumerate(rows):
+            for col, index in enumerate(row):
+                if index is not None:
+                    display.pen = index
+                    display.pixel(x + col, y + row_index)
+        display.pen = pen
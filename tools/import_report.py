@@ -0,0 +1,110 @@
+# Import time and heap report, run on the pico itself
+#
+#   mpremote run tools/import_report.py
+#
+# Imports every frame module on the pico from scratch and reports how long it took
+# and how much heap it kept, and whether it came from a .mpy, a .py (compiled on the
+# spot) or the firmware (frozen). Run it before and after copying over the build from
+# tools/build_mpy.py to see the difference. Scripts that start running when imported
+# (footy_frame, the v9 fixtures...) are compiled instead of imported, which is the
+# cost a .mpy saves them at every boot. Works under CPython too, without the heap numbers.
+
+import gc
+import os
+import sys
+import time
+
+MODULES = ("perf", "results_archive", "form_guide", "time_sync", "api_client", "memory", "battery",
+           "wifi_manager", "layout", "player_stats", "footy_data", "footy_pages", "frame_client", "battery_smol")
+SCRIPTS = ("footy_frame", "2_api_football_fixtures_v9_postponed", "match_fixtures", "league_standings")
+
+if "" not in sys.path:
+    sys.path.insert(0, "")  # Modules from the current directory (the pico's root, or the repo)
+
+try:
+    ticks_us, ticks_diff = time.ticks_us, time.ticks_diff
+except AttributeError:  # CPython
+    def ticks_us():
+        return int(time.perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+
+def mem_free():
+    try:
+        return gc.mem_free()
+    except AttributeError:
+        return None
+
+
+def exists(path):
+    try:
+        os.stat(path)
+        return True
+    except OSError:
+        return False
+
+
+def unload():
+    for name in MODULES:
+        sys.modules.pop(name, None)
+
+
+def import_module(name):
+    unload()  # Each number includes the frame modules it pulls in
+    gc.collect()
+    free = mem_free()
+    start = ticks_us()
+    try:
+        module = __import__(name)
+    except ImportError as e:
+        return None, None, str(e)
+    elapsed = ticks_diff(ticks_us(), start)
+    gc.collect()
+    kept = free - mem_free() if free is not None else None
+    path = getattr(module, "__file__", "")
+    kind = ".mpy" if path.endswith(".mpy") else ".py" if path and exists(path) else "frozen"
+    return elapsed, kept, kind
+
+
+def compile_script(name):
+    if not exists(name + ".py"):
+        return None, None, ".mpy" if exists(name + ".mpy") else "missing"
+    with open(name + ".py") as f:
+        source = f.read()
+    gc.collect()
+    free = mem_free()
+    start = ticks_us()
+    try:
+        code = compile(source, name + ".py", "exec")
+    except MemoryError:
+        return None, None, "MemoryError compiling .py"
+    elapsed = ticks_diff(ticks_us(), start)
+    peak = free - mem_free() if free is not None else None
+    del code, source
+    gc.collect()
+    return elapsed, peak, ".py compiled"
+
+
+def row(name, elapsed, heap, note):
+    ms = "-" if elapsed is None else "%.1f" % (elapsed / 1000)
+    kb = "-" if heap is None else "%.1f" % (heap / 1024)
+    print("%-40s%10s%10s  %s" % (name, ms, kb, note))
+
+
+def main():
+    print("%-40s%10s%10s  %s" % ("module", "ms", "heap KB", "loaded from"))
+    total = 0
+    for name in MODULES:
+        elapsed, kept, kind = import_module(name)
+        total += elapsed or 0
+        row(name, elapsed, kept, kind)
+    unload()
+    print("%-40s%10.1f" % ("all modules", total / 1000))
+    print("\nscripts (the compile a .mpy saves at every boot; heap is what the compiled code takes)")
+    for name in SCRIPTS:
+        row(name, *compile_script(name))
+
+
+main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# Renders every page on every Inky Frame size with the host emulator and checks the layout
+#
+#   python3 tools/layout_check.py [--save DIR] [--verbose]
+#
+# For the 4.0", 5.7" and 7.3" profiles, draws each footy_pages page from the canned
+# frame_e2e dataset (real crests) and from payload_corpus leagues of 20 to 36 teams,
+# long and non-ASCII names included. Fails on text drawn off the panel, text boxes
+# overlapping, table rows that didn't make it onto the page, crests that weren't the
+# pre-scaled size the layout plan asked for, or a plan worked out more than once per
+# profile. The rows of the scripts that can't run here (match_fixtures, v9) are
+# checked in the plan itself: every column on the panel and none overlapping.
+# --save writes a PNG of every render for eyeballing.
+
+import argparse
+import json
+import os
+import sys
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, ".."))
+sys.path.insert(0, TOOLS_DIR)
+
+import footy_data  # noqa: E402
+import footy_pages  # noqa: E402
+import layout  # noqa: E402
+import payload_corpus  # noqa: E402
+from bench_payloads import hidden, overlaps, parse  # noqa: E402
+from frame_e2e import sample_dataset  # noqa: E402
+from frame_server import crest_root  # noqa: E402
+from host_display import PROFILES, HostDisplay, HostPNG  # noqa: E402
+
+CORPORA = [
+    ("20 teams", dict(teams=20, live=2, finished=10, upcoming=10, events_per_match=8)),
+    ("edge names", dict(teams=20, live=3, finished=10, upcoming=10, events_per_match=12, edge=True)),
+    ("24 teams", dict(teams=24, live=6, finished=12, upcoming=12, events_per_match=20)),
+    ("36 teams", dict(teams=36, live=12, finished=18, upcoming=18, events_per_match=40, scorers=20)),
+]
+
+
+# HostPNG that remembers which crest files were asked for
+class RecordingPNG(HostPNG):
+    def __init__(self, display, root):
+        super().__init__(display, root)
+        self.opened = []
+
+    def open_file(self, filename):
+        self.opened.append(filename)
+        super().open_file(filename)
+
+
+def datasets():
+    yield "sample", sample_dataset()
+    for label, step in CORPORA:
+        files = payload_corpus.corpus(1, **step)
+        yield label, parse({name: json.dumps(p).encode() for name, p in files.items()})
+
+
+# Columns of a solved row that run off a `width` px panel or into the next one
+def row_problems(row, width):
+    problems = []
+    columns = sorted(row.items(), key=lambda item: item[1][0])
+    for (name, (x, w, *_)), after in zip(columns, columns[1:] + [None]):
+        if x < 0 or x + w > width:
+            problems.append(f"{name} off panel")
+        if after is not None and x + w > after[1][0]:
+            problems.append(f"{name} overlaps {after[0]}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the page layouts on every Inky Frame size")
+    parser.add_argument("--save", help="write a PNG of every render here")
+    parser.add_argument("--verbose", action="store_true", help="list every problem text")
+    args = parser.parse_args()
+    if args.save:
+        os.makedirs(args.save, exist_ok=True)
+
+    crests = crest_root(os.path.join(TOOLS_DIR, "..", "footy_frame_crests.zip"))
+    computed = []
+    compute = layout._compute
+    layout._compute = lambda display: computed.append(display.get_bounds()) or compute(display)
+    layout.PLAN_FILE = os.devnull  # Nothing cached from earlier runs, nothing saved
+
+    failures = 0
+    print(f"{'profile':<22}{'dataset':<12}{'page':<10}{'off panel':>10}{'overlaps':>9}{'hidden':>8}  crests")
+    for profile in PROFILES:
+        for label, dataset in datasets():
+            standings = dataset['standings']
+            footy_data.FOCUS_TEAM_ID = standings[len(standings) // 2]['id']
+            for name in footy_pages.PAGES:
+                display = HostDisplay.for_profile(profile)
+                png = RecordingPNG(display, crests)
+                footy_pages.init(display, png)
+                footy_pages.draw_page(name, dataset)
+
+                plan = layout.plan(display, os.devnull)
+                sizes = sorted({os.path.basename(os.path.dirname(f)) if "/crests/" in f else str(layout.CREST_NATIVE)
+                                for f in png.opened})
+                wrong = [f for f in png.opened if not os.path.exists(png._host_path(f))] if label == "sample" else []
+                missing = hidden(name, dataset, display) if name == 'table' else 0
+                problems = len(display.overflow) + overlaps(display.texts) + missing + len(wrong)
+                failures += problems > 0
+                print(f"{profile:<22}{label:<12}{name:<10}{len(display.overflow):>10}{overlaps(display.texts):>9}"
+                      f"{missing:>8}  {','.join(sizes) or '-'}{'  MISSING ' + wrong[0] if wrong else ''}"
+                      f"{'  FAIL' if problems else ''}")
+                if args.verbose:
+                    for text, x, y, width in display.overflow:
+                        print(f"{'':>22}off panel: {text!r} at ({x}, {y}), {width} px wide")
+                if args.save:
+                    display.save_png(os.path.join(args.save, f"{profile}_{label.replace(' ', '_')}_{name}.png"))
+        width = plan['size'][0]
+        for name in ('fixture', 'day_fixture'):
+            problems = row_problems(plan[name], width)
+            failures += bool(problems)
+            print(f"{profile:<22}{'plan':<12}{name:<12}{', '.join(problems) or 'fits'}{'  FAIL' if problems else ''}")
+        print(f"{profile}: crest {plan['crest']} px, table rows {plan['table_pitch']} px apart, "
+              f"fixture details {plan['fixture'].get('details', [0, 0, 0])[2]} chars wide, "
+              f"match_fixtures details {plan['day_fixture'].get('details', [0, 0, 0])[2]}\n")
+
+    if len(computed) != len(set(computed)) or len(computed) != len(PROFILES):
+        print(f"layout plans computed {len(computed)} times for {len(PROFILES)} profiles")
+        failures += 1
+    print("OK" if not failures else f"{failures} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
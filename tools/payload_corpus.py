@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# Synthetic api-football payloads at any scale, for exercising the parsing and
+# layout code without spending API calls
+#
+#   python3 tools/payload_corpus.py --out corpus/ [--teams 24] [--live 12] [--events 30] [--edge]
+#
+# Writes standings.json, fixtures.json, events_<fixture id>.json, topscorers.json,
+# topyellowcards.json and topredcards.json
+# shaped like the real API responses (only the fields the scripts read, plus enough
+# of the rest to keep sizes realistic). --edge mixes in the awkward cases: long and
+# non-ASCII team and player names, null scores/names/minutes, postponed and
+# abandoned matches, stoppage time, extra time and penalty shoot-outs.
+
+import argparse
+import json
+import os
+import random
+import time
+
+TEAM_NAMES = [
+    "Arsenal", "Aston Villa", "Bournemouth", "Brentford", "Brighton", "Chelsea", "Crystal Palace",
+    "Everton", "Fulham", "Ipswich", "Leicester", "Liverpool", "Manchester City", "Manchester United",
+    "Newcastle", "Nottingham Forest", "Southampton", "Tottenham", "West Ham", "Wolves",
+]
+EDGE_TEAM_NAMES = [
+    "Borussia Mönchengladbach", "Wolverhampton Wanderers Football Club", "Atlético Madrid",
+    "Brighton & Hove Albion", "1. FC Köln", "Paris Saint-Germain", "Sporting Clube de Portugal",
+    "Fenerbahçe", "İstanbul Başakşehir", "Śląsk Wrocław", "Győri ETO", "Žalgiris", "FC København",
+    "Olympique Lyonnais", "Real Sociedad de Fútbol", "鹿島アントラーズ",
+]
+FIRST_NAMES = ["J.", "M.", "Mohamed", "Bruno", "Heung-min", "Martin", "Ollie", "Alexis", "Erling", "Bukayo"]
+LAST_NAMES = ["Smith", "Salah", "Fernandes", "Son", "Ødegaard", "Watkins", "Mac Allister", "Haaland", "Saka", "Van Dijk"]
+EDGE_PLAYER_NAMES = [
+    "Kepa Arrizabalaga Revuelta", "Ibrahima Konaté", "Dominik Szoboszlai", "Đorđe Petrović",
+    "Pierre-Emerick Aubameyang", "Ștefan Rădulescu", "Jean-Philippe Mateta-Nkounkou", None,
+]
+LIVE_STATUSES = [("1H", 30), ("HT", 45), ("2H", 70), ("2H", 90), ("ET", 105), ("P", 120)]
+FINISHED_STATUSES = [("FT", 90), ("FT", 90), ("FT", 90), ("AET", 120), ("PEN", 120)]
+OTHER_STATUSES = [("PST", None), ("TBD", None), ("CANC", None), ("ABD", 60), ("SUSP", 55)]
+
+
+def team_names(count, edge):
+    names = (EDGE_TEAM_NAMES + TEAM_NAMES) if edge else TEAM_NAMES[:]
+    while len(names) < count:
+        names += [f"{name} II" for name in names]
+    return names[:count]
+
+
+def player_name(rng, edge):
+    if edge and rng.random() < 0.3:
+        return rng.choice(EDGE_PLAYER_NAMES)
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _team(team_id, name):
+    return {"id": team_id, "name": name, "logo": f"https://media.api-sports.io/football/teams/{team_id}.png"}
+
+
+def standings(rng, teams=20, edge=False, league_id=39, season=2024):
+    rows = []
+    names = team_names(teams, edge)
+    points = sorted((rng.randint(0, 3 * (teams - 1) * 2) for _ in range(teams)), reverse=True)
+    for rank, (name, pts) in enumerate(zip(names, points), 1):
+        played = 2 * (teams - 1) - rng.randint(0, 3)
+        win = min(pts // 3, played)
+        draw = min(pts - win * 3, played - win)
+        lose = played - win - draw
+        goals_for = rng.randint(win, win * 3 + draw + 10)
+        goals_against = rng.randint(lose, lose * 3 + draw + 10)
+        record = {"played": played, "win": win, "draw": draw, "lose": lose,
+                  "goals": {"for": goals_for, "against": goals_against}}
+        rows.append({
+            "rank": rank, "team": _team(1000 + rank, name), "points": pts, "goalsDiff": goals_for - goals_against,
+            "group": "Premier League", "form": None if edge and rank % 7 == 0 else "".join(rng.choice("WDL") for _ in range(5)),
+            "status": "same", "description": "Promotion - Champions League (Group Stage)" if rank <= 4 else None,
+            "all": record, "home": record, "away": record, "update": "2024-10-19T00:00:00+00:00",
+        })
+    return {"get": "standings", "parameters": {"league": str(league_id), "season": str(season)}, "errors": [],
+            "results": 1, "response": [{"league": {
+                "id": league_id, "name": "Premier League", "country": "England", "season": season,
+                "standings": [rows]}}]}
+
+
+def fixture(rng, fixture_id, kick_off, status, elapsed, home, away, edge):
+    played = elapsed is not None and status not in ("PST", "TBD", "CANC")
+    home_goals = rng.randint(0, 5) if played else None
+    away_goals = rng.randint(0, 4) if played else None
+    if edge and played and rng.random() < 0.05:
+        home_goals = None  # The API does send null scores for matches in progress now and then
+    return {
+        "fixture": {
+            "id": fixture_id, "referee": None, "timezone": "UTC",
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(kick_off)), "timestamp": kick_off,
+            "periods": {"first": kick_off if played else None, "second": None},
+            "venue": {"id": None, "name": "Stadium", "city": "City"},
+            "status": {"long": status, "short": status, "elapsed": elapsed},
+        },
+        "league": {"id": 39, "name": "Premier League", "round": "Regular Season - 8"},
+        "teams": {"home": dict(_team(*home), winner=None), "away": dict(_team(*away), winner=None)},
+        "goals": {"home": home_goals, "away": away_goals},
+        "score": {"halftime": {"home": None, "away": None}, "fulltime": {"home": None, "away": None},
+                  "extratime": {"home": None, "away": None},
+                  "penalty": {"home": 4, "away": 3} if status == "PEN" else {"home": None, "away": None}},
+    }
+
+
+# `live` matches in progress, `finished` results and `upcoming` not started, spread over a few days
+def fixtures(rng, teams=20, live=1, finished=10, upcoming=10, edge=False, now=None):
+    now = now or int(time.time())
+    names = team_names(teams, edge)
+    ids = [(1000 + i + 1, name) for i, name in enumerate(names)]
+    found = []
+    fixture_id = 500000
+
+    def pair(n):
+        return ids[(2 * n) % teams], ids[(2 * n + 1) % teams]
+
+    n = 0
+    for i in range(live):
+        status, elapsed = LIVE_STATUSES[i % len(LIVE_STATUSES)]
+        found.append(fixture(rng, fixture_id + n, now - elapsed * 60, status, elapsed, *pair(n), edge))
+        n += 1
+    for i in range(finished):
+        status, elapsed = FINISHED_STATUSES[i % len(FINISHED_STATUSES)] if not edge or i % 4 else OTHER_STATUSES[i % 5]
+        found.append(fixture(rng, fixture_id + n, now - (i + 1) * 86400 // 3, status, elapsed, *pair(n), edge))
+        n += 1
+    for i in range(upcoming):
+        status = "NS" if not edge or i % 5 else OTHER_STATUSES[i % 2][0]
+        found.append(fixture(rng, fixture_id + n, now + (i + 1) * 86400 // 3, status, None, *pair(n), edge))
+        n += 1
+    return {"get": "fixtures", "parameters": {"league": "39", "season": "2024"}, "errors": [],
+            "results": len(found), "response": found}
+
+
+def events(rng, fixture_payload, count=6, edge=False):
+    home = fixture_payload["teams"]["home"]
+    away = fixture_payload["teams"]["away"]
+    found = []
+    for _ in range(count):
+        kind = rng.choice(("Goal", "Card", "Card", "subst", "Var"))
+        detail = {
+            "Goal": rng.choice(("Normal Goal", "Normal Goal", "Penalty", "Own Goal", "Missed Penalty")),
+            "Card": rng.choice(("Yellow Card", "Yellow Card", "Red Card", "Second Yellow card")),
+            "subst": "Substitution 1", "Var": "Goal cancelled",
+        }[kind]
+        team = rng.choice((home, away))
+        minute = rng.randint(1, 90)
+        extra = rng.choice((None, None, None, 2, 5, 11)) if minute in (45, 90) or (edge and rng.random() < 0.1) else None
+        found.append({
+            "time": {"elapsed": None if edge and rng.random() < 0.02 else minute, "extra": extra},
+            "team": {"id": team["id"], "name": team["name"], "logo": team["logo"]},
+            "player": {"id": rng.randint(1, 99999), "name": player_name(rng, edge)},
+            "assist": {"id": None, "name": player_name(rng, edge) if kind == "Goal" else None},
+            "type": kind, "detail": detail, "comments": None,
+        })
+    found.sort(key=lambda e: (e["time"]["elapsed"] or 0, e["time"]["extra"] or 0))
+    return {"get": "fixtures/events", "parameters": {"fixture": str(fixture_payload["fixture"]["id"])},
+            "errors": [], "results": len(found), "response": found}
+
+
+def topscorers(rng, count=20, teams=20, edge=False):
+    names = team_names(teams, edge)
+    found = []
+    for i in range(count):
+        team_no = rng.randrange(teams)
+        found.append({
+            "player": {"id": 2000 + i, "name": player_name(rng, edge) or "Unknown", "nationality": "England"},
+            "statistics": [{
+                "team": _team(1000 + team_no + 1, names[team_no]),
+                "games": {"appearences": rng.choice((None, rng.randint(1, 38))) if edge else rng.randint(1, 38)},
+                "goals": {"total": max(1, 25 - i), "assists": None if edge and i % 3 == 0 else rng.randint(0, 10)},
+                "cards": {"yellow": rng.randint(0, 8), "yellowred": 0, "red": rng.randint(0, 1)},
+            }],
+        })
+    return {"get": "players/topscorers", "parameters": {"league": "39", "season": "2024"}, "errors": [],
+            "results": len(found), "response": found}
+
+
+# players/topyellowcards, or players/topredcards given the yellow card payload: every
+# fourth red card player is also on the yellow card list, as happens for real
+def topcards(rng, endpoint, count=20, teams=20, edge=False, yellows=None):
+    names = team_names(teams, edge)
+    found = []
+    for i in range(count):
+        yellow, red = (max(1, 12 - i // 2), rng.randint(0, 1)) if endpoint == "topyellowcards" \
+            else (rng.randint(0, 8), max(1, 3 - i // 6))
+        team_no = rng.randrange(teams)
+        player = {"id": 3000 + i if endpoint == "topyellowcards" else 4000 + i,
+                  "name": player_name(rng, edge) or "Unknown", "nationality": "England"}
+        team = _team(1000 + team_no + 1, names[team_no])
+        if yellows and i % 4 == 0 and i < len(yellows["response"]):
+            shared = yellows["response"][i]
+            player, team = shared["player"], shared["statistics"][0]["team"]
+            yellow = shared["statistics"][0]["cards"]["yellow"]
+        found.append({
+            "player": player,
+            "statistics": [{
+                "team": team,
+                "games": {"appearences": rng.choice((None, rng.randint(1, 38))) if edge else rng.randint(1, 38)},
+                "goals": {"total": rng.randint(0, 5), "assists": None},
+                "cards": {"yellow": yellow, "yellowred": rng.choice((0, 0, 1)) if red else 0,
+                          "red": None if edge and i % 5 == 0 else red},
+            }],
+        })
+    return {"get": f"players/{endpoint}", "parameters": {"league": "39", "season": "2024"}, "errors": [],
+            "results": len(found), "response": found}
+
+
+# One whole corpus as {file name: payload dict}
+def corpus(seed=1, teams=20, live=1, finished=10, upcoming=10, events_per_match=6, scorers=20, edge=False):
+    rng = random.Random(seed)
+    files = {"standings.json": standings(rng, teams, edge)}
+    fixture_payload = fixtures(rng, teams, live, finished, upcoming, edge)
+    files["fixtures.json"] = fixture_payload
+    for f in fixture_payload["response"]:
+        if f["fixture"]["status"]["elapsed"] is not None:
+            files[f"events_{f['fixture']['id']}.json"] = events(rng, f, events_per_match, edge)
+    files["topscorers.json"] = topscorers(rng, scorers, teams, edge)
+    files["topyellowcards.json"] = topcards(rng, "topyellowcards", scorers, teams, edge)
+    files["topredcards.json"] = topcards(rng, "topredcards", scorers, teams, edge, files["topyellowcards.json"])
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic api-football payload corpus")
+    parser.add_argument("--out", required=True, help="directory to write the JSON files to")
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--live", type=int, default=1, help="matches in progress")
+    parser.add_argument("--finished", type=int, default=10)
+    parser.add_argument("--upcoming", type=int, default=10)
+    parser.add_argument("--events", type=int, default=6, help="events per started match")
+    parser.add_argument("--scorers", type=int, default=20)
+    parser.add_argument("--edge", action="store_true", help="mix in awkward names, nulls and statuses")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    files = corpus(args.seed, args.teams, args.live, args.finished, args.upcoming, args.events, args.scorers, args.edge)
+    total = 0
+    for name, payload in files.items():
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        with open(os.path.join(args.out, name), "wb") as f:
+            f.write(data)
+        total += len(data)
+    print(f"Wrote {len(files)} payloads ({total} bytes) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# Host-side tool: aggregate the per-refresh records written by perf.py into percentiles
+#
+#   python3 tools/perf_report.py /path/to/sd/perf.log [/path/to/sd/perf.log.1 ...]
+#
+# Copy perf.log off the SD card (or mount the card on the host) and point this at it.
+
+import argparse
+import json
+import sys
+
+
+def percentile(values, pct):
+    if not values:
+        return 0
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def load_records(paths):
+    records = []
+    for path in paths:
+        with open(path) as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A wake that lost power mid-write leaves a truncated last line
+                    print(f"{path}:{line_no}: skipping unreadable record", file=sys.stderr)
+    return records
+
+
+def aggregate(records):
+    # screen -> phase -> {"ms": [...], "mem": [...], "n": [...]}
+    screens = {}
+    for rec in records:
+        phases = screens.setdefault(rec.get("s", "?"), {})
+        total = phases.setdefault("TOTAL", {"ms": [], "mem": [], "n": []})
+        total["ms"].append(rec.get("ms", 0))
+        total["mem"].append(rec.get("low", 0))
+        total["n"].append(1)
+        for name, (ms, mem, count) in rec.get("p", {}).items():
+            phase = phases.setdefault(name, {"ms": [], "mem": [], "n": []})
+            phase["ms"].append(ms)
+            phase["mem"].append(mem)
+            phase["n"].append(count)
+    return screens
+
+
+def print_report(screens, pcts):
+    for screen in sorted(screens):
+        phases = screens[screen]
+        refreshes = len(phases["TOTAL"]["ms"])
+        print(f"\n== {screen} ({refreshes} refreshes) ==")
+        header = f"{'phase':<12}{'calls':>7}" + "".join(f"{'p' + str(p) + ' ms':>11}" for p in pcts)
+        header += f"{'max ms':>10}{'p50 mem':>10}{'max mem':>10}"
+        print(header)
+        # Slowest phases first, TOTAL last (its mem column is the low-water mark of free heap)
+        order = sorted((n for n in phases if n != "TOTAL"), key=lambda n: -percentile(phases[n]["ms"], 50))
+        for name in order + ["TOTAL"]:
+            p = phases[name]
+            calls = sum(p["n"]) / len(p["n"])
+            row = f"{name:<12}{calls:>7.1f}" + "".join(f"{percentile(p['ms'], pct):>11.0f}" for pct in pcts)
+            row += f"{max(p['ms']):>10}{percentile(p['mem'], 50):>10.0f}{max(p['mem']):>10}"
+            print(row)
+
+
+# Heap peak/fragmentation and degradation levels from memory.stats(), where recorded
+def print_memory(records):
+    screens = {}
+    for rec in records:
+        mem = rec.get("x", {}).get("mem")
+        if mem:
+            screens.setdefault(rec.get("s", "?"), []).append(mem)
+    if not screens:
+        return
+    print(f"\n{'screen':<20}{'peak p50':>10}{'peak max':>10}{'frag p50':>10}{'frag max':>10}"
+          f"{'degraded':>10}{'MemErrs':>9}")
+    for screen in sorted(screens):
+        mems = screens[screen]
+        peak = [m.get("peak", 0) for m in mems]
+        frag = [m.get("frag", 0) for m in mems]
+        degraded = sum(1 for m in mems if m.get("level"))
+        errors = sum(m.get("errors", 0) for m in mems)
+        print(f"{screen:<20}{percentile(peak, 50):>10.0f}{max(peak):>10}{percentile(frag, 50):>9.0f}%"
+              f"{max(frag):>9}%{degraded:>10}{errors:>9}")
+
+
+# Wi-Fi connect times by path (fast reconnect to the cached access point vs full scan + DHCP)
+def print_wifi(records):
+    paths = {}
+    for rec in records:
+        wifi = rec.get("x", {}).get("wifi")
+        if wifi:
+            paths.setdefault(wifi.get("path", "?"), []).append(wifi.get("ms", 0))
+    if not paths:
+        return
+    total = sum(len(times) for times in paths.values())
+    print(f"\n{'wifi path':<20}{'connects':>10}{'share':>8}{'p50 ms':>10}{'p90 ms':>10}{'max ms':>10}")
+    for path in sorted(paths):
+        times = paths[path]
+        print(f"{path:<20}{len(times):>10}{100 * len(times) / total:>7.0f}%{percentile(times, 50):>10.0f}"
+              f"{percentile(times, 90):>10.0f}{max(times):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise Inky footy frame perf.log records")
+    parser.add_argument("logs", nargs="+", help="perf.log files copied from the SD card")
+    parser.add_argument("--screen", help="only report this screen (standings, fixtures, ...)")
+    parser.add_argument("--pct", default="50,90,99", help="comma separated percentiles (default 50,90,99)")
+    args = parser.parse_args()
+
+    records = load_records(args.logs)
+    if args.screen:
+        records = [r for r in records if r.get("s") == args.screen]
+    if not records:
+        print("No records found.")
+        return 1
+    print_report(aggregate(records), [int(p) for p in args.pct.split(",")])
+    print_memory(records)
+    print_wifi(records)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
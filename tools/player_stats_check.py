@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# Checks the daily player leaderboards and the live goals and cards merged into them
+#
+#   python3 tools/player_stats_check.py [--verbose]
+#
+# Runs footy_data.get_dataset refresh after refresh against the fault_inject stub
+# (payload_corpus data), with made-up events in a live match and a finished one.
+# Checks that the players/topscorers, topyellowcards and topredcards endpoints are
+# only hit once per STATS_TTL, that a live match's goals and cards are added to the
+# leaderboards exactly once however many refreshes see them, that own goals and
+# matches the leaderboards already count are left out, and that the leaderboard
+# requests don't parse more at once than the standings and fixtures requests did
+# already (tracemalloc peak per request), so the frame's memory envelope holds.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import tracemalloc
+from http.server import ThreadingHTTPServer
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, ".."))
+sys.path.insert(0, TOOLS_DIR)
+
+import footy_data  # noqa: E402
+import player_stats  # noqa: E402
+from fault_inject import Stub, handler_for, reset_client  # noqa: E402
+
+LIVE_FIXTURE = 500000  # 1H in the seed 1 corpus
+FINISHED_FIXTURE = 500002  # FT, so counted by the leaderboards already
+ENDPOINTS = ("/players/topscorers", "/players/topyellowcards", "/players/topredcards")
+
+
+def event(kind, detail, player, minute):
+    return {"time": {"elapsed": minute, "extra": None}, "team": {"id": player["team_id"], "name": player["team"]},
+            "player": {"id": None, "name": player["name"]}, "assist": {"id": None, "name": None},
+            "type": kind, "detail": detail, "comments": None}
+
+
+def events_payload(found):
+    return json.dumps({"response": found}).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the player leaderboards' daily fetch and live merging")
+    parser.add_argument("--verbose", action="store_true", help="show the fetch output")
+    args = parser.parse_args()
+
+    stub = Stub()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_for(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    footy_data.API_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    footy_data.archive_results = lambda results: None  # Keep the host's results archive out of it
+    # The stub answers every fixtures query with the whole corpus, earliest (finished) first:
+    # keep them all so the live match is among the upcoming ones
+    footy_data.MAX_FIXTURES = 100
+    failures = []
+
+    def check(name, ok, detail):
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<44}{detail}")
+        if not ok:
+            failures.append(name)
+
+    # Peak Python memory of each request, parse included, by endpoint
+    peaks = {}
+    api_get = footy_data.api_get
+
+    def measured_get(path):
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        try:
+            return api_get(path)
+        finally:
+            endpoint = path.split("?")[0]
+            peaks[endpoint] = max(peaks.get(endpoint, 0), tracemalloc.get_traced_memory()[1] - start)
+
+    footy_data.api_get = measured_get
+    tracemalloc.start()
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "footy_cache.json")
+        stats_path = os.path.join(root, "footy_players.json")
+
+        def refresh():
+            reset_client()
+            cached = footy_data.load_cache(path)
+            if cached:
+                cached["fetched"] = 0  # Stale, so the refresh goes online
+                footy_data.save_cache(cached, path)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+                return footy_data.get_dataset(path=path, stats_path=stats_path)
+
+        def hits():
+            return [stub.hits.get(endpoint, 0) for endpoint in ENDPOINTS]
+
+        dataset = refresh()
+        check("first refresh fetches the leaderboards", hits() == [1, 1, 1] and dataset["scorers"] and dataset["cards"],
+              f"hits {hits()}, {len(dataset['scorers'])} scorers, {len(dataset['cards'])} booked")
+        stats = player_stats.load(stats_path)
+        names = [(p["name"], p["team_id"]) for p in stats["cards"]]
+        check("cards lists merged, no duplicates", len(names) == len(set(names)),
+              f"{len(names)} players from the yellow and red card lists")
+
+        refresh()
+        check("later refreshes reuse them", hits() == [1, 1, 1], f"hits {hits()}")
+
+        # A goal and a booking in the live match, and the same in a match they already count
+        scorer = dict(stats["scorers"][3])
+        booked = dict(stats["cards"][2])
+        stub.payloads[f"events_{LIVE_FIXTURE}.json"] = events_payload([
+            event("Goal", "Normal Goal", scorer, 12), event("Goal", "Own Goal", scorer, 30),
+            event("Goal", "Missed Penalty", scorer, 55), event("Card", "Yellow Card", booked, 60)])
+        stub.payloads[f"events_{FINISHED_FIXTURE}.json"] = events_payload([
+            event("Goal", "Normal Goal", scorer, 20), event("Card", "Red Card", booked, 80)])
+
+        def standing(dataset):
+            def find(players, player):
+                return next((p for p in players if (p["name"], p["team_id"]) == (player["name"], player["team_id"])),
+                            None)
+            goals = find(dataset["scorers"], scorer)
+            cards = find(dataset["cards"], booked)
+            return goals and goals["goals"], cards and (cards["yellow"], cards["red"])
+
+        want = (scorer["goals"] + 1, (booked["yellow"] + 1, booked["red"]))
+        for n in range(3):
+            found = standing(refresh())
+            check(f"live goal and card added once (refresh {n + 1})", found == want,
+                  f"goals, cards {found}, want {want}")
+        check("...without fetching the leaderboards", hits() == [1, 1, 1], f"hits {hits()}")
+
+        stats = player_stats.load(stats_path)
+        stats["fetched"] -= player_stats.STATS_TTL + 1
+        player_stats.save(stats, stats_path)
+        found = standing(refresh())
+        check("refetched once the day is up", hits() == [2, 2, 2], f"hits {hits()}")
+        check("live match still added after it", found == want, f"goals, cards {found}, want {want}")
+
+        cache = os.path.getsize(path)
+        players = os.path.getsize(stats_path)
+        print(f"     dataset cache {cache} bytes, player stats file {players} bytes")
+
+    tracemalloc.stop()
+    other = max(peak for endpoint, peak in peaks.items() if not endpoint.startswith("players/"))
+    players = max(peak for endpoint, peak in peaks.items() if endpoint.startswith("players/"))
+    for endpoint, peak in sorted(peaks.items()):
+        print(f"     {endpoint:<28}{peak / 1024:>8.1f} KB peak")
+    check("leaderboards within the memory envelope", players <= other,
+          f"{players / 1024:.1f} KB peak vs {other / 1024:.1f} KB for standings/fixtures")
+
+    stub.release.set()
+    server.shutdown()
+    print("OK" if not failures else f"{len(failures)} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# Pre-scaled crest variants for the smaller Inky Frames
+#
+#   python3 tools/scale_crests.py [footy_frame_crests.zip or dir] --out /path/to/sd
+#
+# layout.py picks a crest size per display from layout.CREST_SIZES to fit its row
+# height (16 px on the 4.0" and 5.7" tables, for example). pngdec can't shrink an
+# image while decoding, so every size is made here once: the 20 px originals go to
+# the root of the SD card as before and the others to crests/<size>/<team id>.png.
+# Pixels are area averaged with premultiplied alpha, so edges stay clean.
+
+import argparse
+import os
+import sys
+import zipfile
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, ".."))
+sys.path.insert(0, TOOLS_DIR)
+
+import layout  # noqa: E402
+from host_display import decode_png, write_png  # noqa: E402
+
+
+# Crest PNGs as {file name: bytes} from the zip or a directory
+def read_crests(source):
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as z:
+            return {os.path.basename(name): z.read(name) for name in z.namelist() if name.lower().endswith(".png")}
+    crests = {}
+    for name in os.listdir(source):
+        if name.lower().endswith(".png"):
+            with open(os.path.join(source, name), "rb") as f:
+                crests[name] = f.read()
+    return crests
+
+
+# Area average `rows` of (r, g, b, a) down to size x size
+def scale(width, height, rows, size):
+    out = bytearray()
+    for oy in range(size):
+        out.append(0)  # Filter type None
+        y0, y1 = oy * height / size, (oy + 1) * height / size
+        for ox in range(size):
+            x0, x1 = ox * width / size, (ox + 1) * width / size
+            total = [0.0, 0.0, 0.0, 0.0]
+            for y in range(int(y0), min(height, int(y1 + 0.999))):
+                wy = min(y + 1, y1) - max(y, y0)
+                for x in range(int(x0), min(width, int(x1 + 0.999))):
+                    weight = wy * (min(x + 1, x1) - max(x, x0))
+                    r, g, b, a = rows[y][x]
+                    total[0] += r * a * weight
+                    total[1] += g * a * weight
+                    total[2] += b * a * weight
+                    total[3] += a * weight
+            area = (x1 - x0) * (y1 - y0)
+            alpha = total[3] / area
+            if total[3]:
+                out.extend(round(c / total[3]) for c in total[:3])
+            else:
+                out.extend((0, 0, 0))
+            out.append(round(alpha))
+    return bytes(out)
+
+
+# Write every crest at every size under `out`, returns the number of files written
+def make_variants(crests, out, sizes=layout.CREST_SIZES):
+    written = 0
+    os.makedirs(out, exist_ok=True)
+    for name, data in crests.items():
+        width, height, rows = decode_png(data)
+        for size in sizes:
+            if size == layout.CREST_NATIVE:
+                path = os.path.join(out, name)
+                with open(path, "wb") as f:
+                    f.write(data)
+            else:
+                os.makedirs(os.path.join(out, "crests", str(size)), exist_ok=True)
+                path = os.path.join(out, "crests", str(size), name)
+                write_png(path, size, size, scale(width, height, rows, size), alpha=True)
+            written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write pre-scaled crest variants for every display size")
+    parser.add_argument("source", nargs="?", default=os.path.join(TOOLS_DIR, "..", "footy_frame_crests.zip"))
+    parser.add_argument("--out", required=True, help="where to write them, e.g. the SD card's root")
+    args = parser.parse_args()
+
+    crests = read_crests(args.source)
+    written = make_variants(crests, args.out)
+    print(f"Wrote {written} crests ({len(crests)} teams at {', '.join(map(str, layout.CREST_SIZES))} px) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# Simulated clock check for time_sync.py
+#
+#   python3 tools/sim_time_sync.py [--days 60] [--ppm 35] [--wake-minutes 15]
+#
+# Runs time_sync against a drifting RTC for a couple of months of wakes: most wakes
+# are offline (cached pages), some make an API call whose Date header is truncated to
+# the second and arrives a little late, there are power cycles that reset the RTC to
+# 2021 and a week with no network at all. After every wake the RTC must be within
+# MAX_ERROR_SECONDS (plus a second of slack) of the true time, and NTP should only
+# have been needed a handful of times.
+
+import argparse
+import email.utils
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import time_sync  # noqa: E402
+
+START = 1790000000  # Sept 2026
+RESET_TIME = 1609459200  # 2021-01-01, what the RTC comes back as after losing power
+
+
+# An RTC that gains/loses `ppm` parts per million against the true time
+class SimClock:
+    def __init__(self, ppm):
+        self.true = float(START)
+        self.rtc = float(RESET_TIME)
+        self.ppm = ppm
+        self.ntp_calls = 0
+        self.sets = 0
+
+    def advance(self, seconds):
+        self.true += seconds
+        self.rtc += seconds * (1 + self.ppm / 1e6)
+
+    def power_cycle(self):
+        self.rtc = float(RESET_TIME)
+
+    def now(self):
+        return int(self.rtc)
+
+    def set(self, unix_time):
+        self.rtc = float(unix_time)
+        self.sets += 1
+
+    def ntp(self):
+        self.ntp_calls += 1
+        return int(self.true)
+
+    def error(self):
+        return self.rtc - self.true
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check time_sync against a simulated drifting RTC")
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--ppm", type=float, default=35, help="RTC drift, + runs fast")
+    parser.add_argument("--wake-minutes", type=int, default=15)
+    parser.add_argument("--online-every", type=int, default=4, help="wakes per API fetch")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    failures = 0
+    for ts in (0, 951782400, START, 4102444799):
+        header = email.utils.formatdate(ts, usegmt=True)
+        if time_sync.parse_http_date(header) != ts:
+            print(f"parse_http_date: {header!r} parsed wrong")
+            failures += 1
+
+    rng = random.Random(args.seed)
+    clock = SimClock(args.ppm)
+    wakes = args.days * 24 * 60 // args.wake_minutes
+    power_cycles = {wakes // 5, wakes * 3 // 5}
+    offline_from, offline_to = wakes * 2 // 5, wakes * 2 // 5 + 7 * 24 * 60 // args.wake_minutes
+    worst = 0
+    with tempfile.TemporaryDirectory() as root:
+        state_path = os.path.join(root, "time_state.json")
+        time_sync._state_path = lambda: state_path
+        time_sync.clock = clock
+        for wake in range(wakes):
+            clock.advance(args.wake_minutes * 60)
+            if wake in power_cycles:
+                clock.power_cycle()
+            time_sync.reset()
+            time_sync._state = None  # Every wake starts from the persisted state, like a real boot
+            online = wake % args.online_every == 0 and not offline_from <= wake < offline_to
+            if not online:
+                continue
+            time_sync.sync_if_needed()
+            # The first API response: Date is the server time truncated to the second, read a bit later
+            sent = int(clock.true)
+            clock.advance(rng.uniform(0.2, 1.5))
+            time_sync.observe(email.utils.formatdate(sent, usegmt=True))
+            error = abs(clock.error())
+            worst = max(worst, error)
+            if error > time_sync.MAX_ERROR_SECONDS + 1:
+                print(f"wake {wake}: RTC {clock.error():+.1f} s off after syncing")
+                failures += 1
+        learnt = time_sync.load_state().get('ppm')  # The correction needed, so the opposite sign to the drift
+        learnt = learnt if learnt is None else -learnt
+
+    online_wakes = sum(1 for w in range(wakes) if w % args.online_every == 0 and not offline_from <= w < offline_to)
+    print(f"{wakes} wakes over {args.days} days, {online_wakes} online, RTC drift {args.ppm:+.0f} ppm")
+    print(f"NTP syncs: {clock.ntp_calls} (vs {online_wakes} syncing every online wake), RTC sets: {clock.sets}")
+    print(f"learnt drift: {learnt if learnt is None else f'{learnt:+.1f}'} ppm, worst error after a sync: {worst:.1f} s")
+    print("OK" if not failures else f"{failures} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import time
+import json
+import os
+import binascii
+import perf
+
+# Wi-Fi bring-up that remembers the last good connection. Every wake first tries a
+# fast reconnect straight to the cached access point (BSSID) on its cached channel
+# with the cached IP settings, which skips the channel sweep and the DHCP exchange. Only if that fails does it
+# fall back to a scan for the strongest access point and a normal DHCP connect.
+#
+# Timeouts adapt to how long connects have actually been taking: a bit over the
+# slowest recent connect of that kind, within [MIN, MAX]. Each connect's time and
+# path is kept in the state file and added to the perf record.
+
+STATE_FILE = "wifi_state.json"  # On the SD card if it's mounted, else in flash
+HISTORY_LENGTH = 20  # Connects remembered per path for the adaptive timeouts
+LEASE_SECONDS = 12 * 3600  # Re-run DHCP after this long, in case the router handed our address on
+FAST_TIMEOUT_MS = (1500, 8000)  # (min, max) for the cached BSSID + static IP attempt
+FULL_TIMEOUT_MS = (5000, 30000)  # (min, max) for a scan + DHCP attempt
+TIMEOUT_MARGIN = 1.5  # Timeout = slowest recent connect * this
+FULL_RETRIES = 3
+POLL_MS = 50
+
+try:
+    sleep_ms = time.sleep_ms
+except AttributeError:
+    def sleep_ms(ms):
+        time.sleep(ms / 1000)
+
+_state = None
+
+
+def _state_path():
+    try:
+        os.stat("/sd")
+        return "/sd/" + STATE_FILE
+    except OSError:
+        return "/" + STATE_FILE
+
+
+def load_state():
+    global _state
+    if _state is None:
+        try:
+            with open(_state_path()) as f:
+                _state = json.load(f)
+        except (OSError, ValueError):
+            _state = {}
+        _state.setdefault('fast', [])
+        _state.setdefault('full', [])
+    return _state
+
+
+def save_state():
+    try:
+        with open(_state_path(), 'w') as f:
+            json.dump(_state, f)
+    except OSError as e:
+        print(f"Failed to save Wi-Fi state: {e}")
+
+
+# Timeout for a connect path from its recent history, the max of the range until there is one
+def adaptive_timeout(path, limits):
+    history = load_state()[path]
+    if not history:
+        return limits[1]
+    return max(limits[0], min(limits[1], int(max(history) * TIMEOUT_MARGIN)))
+
+
+def _remember(path, elapsed):
+    history = load_state()[path]
+    history.append(elapsed)
+    del history[:-HISTORY_LENGTH]
+
+
+def _wait(wlan, timeout_ms):
+    start = perf.ticks_ms()
+    while not wlan.isconnected():
+        if perf.ticks_diff(perf.ticks_ms(), start) > timeout_ms:
+            return False
+        sleep_ms(POLL_MS)
+    return True
+
+
+# Strongest access point advertising our SSID as (bssid, channel), or None
+def _best_ap(wlan, ssid):
+    best = None
+    try:
+        for found_ssid, bssid, channel, rssi, _, _ in wlan.scan():
+            if found_ssid == ssid.encode() and (best is None or rssi > best[2]):
+                best = (bssid, channel, rssi)
+    except OSError as e:
+        print(f"Wi-Fi scan failed: {e}")
+    return best and best[:2]
+
+
+# Join one access point; given its channel, cyw43 goes straight to it instead of sweeping them all
+def _connect_to(wlan, ssid, password, bssid, channel=None):
+    if channel:
+        wlan.connect(ssid, password, bssid=bssid, channel=channel)
+    else:
+        wlan.connect(ssid, password, bssid=bssid)
+
+
+def _fast_connect(wlan, ssid, password, state):
+    if not state.get('bssid'):
+        return False
+    lease_ok = state.get('ip') and time.time() - state.get('leased', 0) < LEASE_SECONDS
+    if lease_ok:
+        wlan.ifconfig(tuple(state['ip']))  # Static config, no DHCP round trips
+    timeout = adaptive_timeout('fast', FAST_TIMEOUT_MS)
+    print(f"Fast reconnect to {state['bssid']} (channel {state.get('channel')}, {timeout} ms)")
+    _connect_to(wlan, ssid, password, binascii.unhexlify(state['bssid']), state.get('channel'))
+    if _wait(wlan, timeout):
+        if not lease_ok:  # Went through DHCP, keep the new lease for the next wakes
+            state['ip'] = list(wlan.ifconfig())
+            state['leased'] = time.time()
+        return True
+    # The access point moved or the address is gone, forget both and do it properly
+    wlan.disconnect()
+    if lease_ok:
+        wlan.ifconfig('dhcp')
+    state.pop('bssid', None)
+    state.pop('ip', None)
+    return False
+
+
+def _full_connect(wlan, ssid, password, state, retries):
+    timeout = adaptive_timeout('full', FULL_TIMEOUT_MS)
+    for attempt in range(retries):
+        print(f"Attempting to connect to Wi-Fi (Attempt {attempt + 1}/{retries}, {timeout} ms)")
+        ap = _best_ap(wlan, ssid)
+        if ap:
+            state['bssid'], state['channel'] = binascii.hexlify(ap[0]).decode(), ap[1]
+            _connect_to(wlan, ssid, password, ap[0], ap[1])
+        else:
+            wlan.connect(ssid, password)
+        if _wait(wlan, timeout):
+            state['ip'] = list(wlan.ifconfig())
+            state['leased'] = time.time()
+            return True
+        wlan.disconnect()
+        timeout = min(timeout * 2, FULL_TIMEOUT_MS[1])  # Give a slow network longer next attempt
+    return False
+
+
+# Connect (or stay connected) to `ssid`, returns True once connected
+def connect(ssid, password, retries=FULL_RETRIES):
+    import network
+    wlan = network.WLAN(network.STA_IF)
+    wlan.active(True)
+    if wlan.isconnected():
+        return True
+    state = load_state()
+    with perf.span("wifi"):
+        start = perf.ticks_ms()
+        path = 'fast'
+        connected = _fast_connect(wlan, ssid, password, state)
+        if not connected:
+            path = 'full'
+            start = perf.ticks_ms()  # The fallback's history shouldn't include the failed fast attempt
+            connected = _full_connect(wlan, ssid, password, state, retries)
+        elapsed = perf.ticks_diff(perf.ticks_ms(), start)
+    if connected:
+        print(f"Connected to Wi-Fi ({path}, {elapsed} ms)")
+        _remember(path, elapsed)
+    else:
+        print("Exceeded maximum retry attempts.")
+    perf.note("wifi", {"path": path if connected else "failed", "ms": elapsed})
+    save_state()
+    return connected